@@ -1,13 +1,21 @@
 import pandas as pd
 import numpy as np
 import joblib
+import json
+import os
+import sys
 from tensorflow.keras.models import load_model
 
+# Shared encoding with the API (AI/feature_pipeline.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import feature_pipeline
+
 # ====================================================
 # 1. SETUP
 # ====================================================
 MODEL_FILE = 'Lung_Cancer.keras'
 SCALER_FILE = 'lung_scaler.pkl'
+MAPPINGS_FILE = 'lung_mappings.json'
 THRESHOLD = 0.3  # The threshold we tuned for Lung Cancer
 
 # ====================================================
@@ -16,6 +24,8 @@ THRESHOLD = 0.3  # The threshold we tuned for Lung Cancer
 print(f"⏳ Loading {MODEL_FILE}...")
 model = load_model(MODEL_FILE)
 scaler = joblib.load(SCALER_FILE)
+with open(MAPPINGS_FILE, 'r') as f:
+    pipeline = feature_pipeline.build('lung', json.load(f))
 print("✅ Model & Scaler loaded!")
 
 # ====================================================
@@ -24,30 +34,31 @@ print("✅ Model & Scaler loaded!")
 
 # CASE A: 🔴 BAD / HIGH RISK
 # Older, heavy smoker, works in construction (asbestos), has COPD
+# Raw values, exactly as the app sends them (encoded via lung_mappings.json)
 patient_bad = {
     'age': [72],
-    'pack_years': [50.5],             # High smoking history
-    'gender': [1],                    # 1 = Male
-    'radon_exposure': [1],            # 1 = Yes
-    'asbestos_exposure': [1],         # 1 = Yes
-    'secondhand_smoke_exposure': [1], # 1 = Yes
-    'copd_diagnosis': [1],            # 1 = Yes (Critical Factor)
-    'alcohol_consumption': [1],       # 1 = Yes
-    'family_history': [1]             # 1 = Yes
+    'pack_years': [50.5],                 # High smoking history
+    'gender': ['Male'],
+    'radon_exposure': ['Medium'],         # Encodes to 1
+    'asbestos_exposure': ['Yes'],
+    'secondhand_smoke_exposure': ['Yes'],
+    'copd_diagnosis': ['Yes'],            # Critical Factor
+    'alcohol_consumption': ['Moderate'],  # Encodes to 1
+    'family_history': ['Yes']
 }
 
 # CASE B: 🟢 GOOD / LOW RISK
 # Young, never smoked, works in an office, healthy
 patient_good = {
     'age': [28],
-    'pack_years': [0.0],              # Non-smoker
-    'gender': [0],                    # 0 = Female
-    'radon_exposure': [0],            # 0 = No
-    'asbestos_exposure': [0],         # 0 = No
-    'secondhand_smoke_exposure': [0], # 0 = No
-    'copd_diagnosis': [0],            # 0 = No
-    'alcohol_consumption': [0],       # 0 = No
-    'family_history': [0]             # 0 = No
+    'pack_years': [0.0],                  # Non-smoker
+    'gender': ['Female'],
+    'radon_exposure': ['Low'],
+    'asbestos_exposure': ['No'],
+    'secondhand_smoke_exposure': ['No'],
+    'copd_diagnosis': ['No'],
+    'alcohol_consumption': ['None'],
+    'family_history': ['No']
 }
 
 # ⚠️ TOGGLE THIS TO TEST DIFFERENT PATIENTS
@@ -58,14 +69,14 @@ selected_data = patient_bad  # <--- Change to patient_good to see the healthy re
 # ====================================================
 new_patient_df = pd.DataFrame(selected_data)
 
-# CRITICAL STEP: Calculate the missing column (Model expects this!)
-new_patient_df['cumulative_smoking'] = new_patient_df['age'] * new_patient_df['pack_years']
+# Encodes categoricals and derives 'cumulative_smoking' (the model expects it!)
+new_patient_x = pipeline.transform(new_patient_df)
 
 # ====================================================
 # 5. PREDICT
 # ====================================================
 # Scale (Scaler expects 10 columns now)
-new_patient_scaled = scaler.transform(new_patient_df)
+new_patient_scaled = scaler.transform(new_patient_x)
 
 # Predict
 prediction_prob = model.predict(new_patient_scaled)[0][0]
@@ -83,7 +94,7 @@ print(f"🫁 LUNG CANCER REPORT")
 print("="*40)
 print(f"Input Age:         {selected_data['age'][0]}")
 print(f"Input Pack Years:  {selected_data['pack_years'][0]}")
-print(f"Calculated Score:  {new_patient_df['cumulative_smoking'].values[0]}")
+print(f"Calculated Score:  {new_patient_x[0, pipeline.columns.index('cumulative_smoking')]}")
 print("-" * 40)
 print(f"Probability Score: {prediction_prob:.4f} ({prediction_prob*100:.1f}%)")
 print(f"Final Diagnosis:   {result}")
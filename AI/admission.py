@@ -0,0 +1,223 @@
+"""
+Admission control for the API: per-pool concurrency limits, bounded
+priority queues and fast load shedding.
+
+    pool        endpoints                                   default limit / queue
+    inference   /predict, /predict/batch, /screen, /explain   ADMISSION_INFERENCE_LIMIT=32 / _QUEUE=64
+    document    /extract-pdf                                ADMISSION_DOCUMENT_LIMIT=4  / _QUEUE=8
+
+The two limits together stay below the threadpool size (40), so a burst of
+PDF uploads cannot take every thread from /predict, and the middleware runs
+before the body is read, so shed uploads never reach memory.
+
+A request runs at once while its pool has a free slot; otherwise it waits in
+the pool's queue, interactive requests ahead of bulk ones (/predict/batch, or
+any request sent with "X-Priority: bulk"). Requests are shed with
+
+    429  a bulk request while the queue is past ADMISSION_BULK_QUEUE_SHARE
+    503  the queue is full, or the request waited ADMISSION_QUEUE_TIMEOUT seconds
+
+Both carry Retry-After, estimated from the queue length and recent service
+times. Limits and counters are per worker process.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+INTERACTIVE, BULK = 0, 1
+PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+BULK_QUEUE_SHARE = float(os.environ.get("ADMISSION_BULK_QUEUE_SHARE", "0.5"))
+
+# path -> (pool, default priority)
+ROUTES = {
+    "/predict": ("inference", INTERACTIVE),
+    "/predict/batch": ("inference", BULK),
+    "/screen": ("inference", INTERACTIVE),
+    "/explain": ("inference", INTERACTIVE),
+    "/extract-pdf": ("document", INTERACTIVE),
+}
+
+
+class Rejected(Exception):
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Pool:
+    """A concurrency limit with a bounded priority queue in front of it (one event loop)."""
+
+    def __init__(self, name, limit, queue_depth, queue_timeout=QUEUE_TIMEOUT, bulk_share=BULK_QUEUE_SHARE):
+        self.name = name
+        self.limit = limit
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.bulk_depth = int(queue_depth * bulk_share)
+        self.running = 0
+        self._waiters = []             # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._service_ewma = 0.05      # seconds per request, for Retry-After
+        self.admitted = {"interactive": 0, "bulk": 0}
+        self.queued_total = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.peak_queued = 0
+        self.shed = {"queue_full": 0, "bulk_limit": 0, "timeout": 0}
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained (at least 1)."""
+        backlog = self.queued + self.running
+        return max(1, math.ceil(backlog * self._service_ewma / max(self.limit, 1)))
+
+    def _reject(self, reason, status_code):
+        self.shed[reason] += 1
+        raise Rejected(status_code, reason, self.retry_after())
+
+    async def acquire(self, priority=INTERACTIVE):
+        if self.running < self.limit and not self._waiters:
+            self.running += 1
+            self._count(priority)
+            return
+        if self.queued >= self.queue_depth:
+            self._reject("queue_full", 503)
+        if priority == BULK and self.queued >= self.bulk_depth:
+            self._reject("bulk_limit", 429)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.queued_total += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # A slot handed over just as the wait expired is kept
+            if not future.done():
+                future.cancel()
+                self._drop_cancelled()
+                self._reject("timeout", 503)
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if future.done() and not future.cancelled():
+                self.release(0.0)
+            else:
+                future.cancel()
+                self._drop_cancelled()
+            raise
+        self.wait_seconds += time.perf_counter() - start
+        self.waited += 1
+        self._count(priority)
+
+    def release(self, service_seconds):
+        if service_seconds:
+            self._service_ewma += 0.1 * (service_seconds - self._service_ewma)
+        # Hand the slot straight to the next live waiter (running stays the same)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def _drop_cancelled(self):
+        self._waiters = [w for w in self._waiters if not w[2].done()]
+        heapq.heapify(self._waiters)
+
+    def _count(self, priority):
+        self.admitted["bulk" if priority == BULK else "interactive"] += 1
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": dict(self.admitted),
+            "queued_total": self.queued_total,
+            "mean_queue_wait": self.wait_seconds / self.waited if self.waited else 0.0,
+            "shed": dict(self.shed),
+            "service_seconds_ewma": self._service_ewma,
+        }
+
+
+class AdmissionController:
+    def __init__(self, pools, routes=ROUTES, enabled=True):
+        self.pools = pools
+        self.routes = routes
+        self.enabled = enabled
+
+    def classify(self, scope):
+        """(pool, priority) for an HTTP scope, or (None, None) if it is not admission-controlled."""
+        route = self.routes.get(scope["path"].rstrip("/") or "/")
+        if route is None or scope["method"] != "POST":
+            return None, None
+        pool_name, priority = route
+        for name, value in scope["headers"]:
+            if name == b"x-priority":
+                priority = PRIORITIES.get(value.decode("latin-1").strip().lower(), priority)
+                break
+        return self.pools[pool_name], priority
+
+    def stats(self):
+        return {"enabled": self.enabled, **{name: pool.stats() for name, pool in self.pools.items()}}
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, str(default)))
+
+
+def controller_from_env():
+    """ADMISSION_CONTROL=0 disables limits (pools are still created for /metrics)."""
+    pools = {
+        "inference": Pool("inference", _env_int("ADMISSION_INFERENCE_LIMIT", 32), _env_int("ADMISSION_INFERENCE_QUEUE", 64)),
+        "document": Pool("document", _env_int("ADMISSION_DOCUMENT_LIMIT", 4), _env_int("ADMISSION_DOCUMENT_QUEUE", 8)),
+    }
+    return AdmissionController(pools, enabled=os.environ.get("ADMISSION_CONTROL", "1") != "0")
+
+
+class AdmissionMiddleware:
+    """Plain ASGI middleware: admits or sheds before the endpoint (and its body) is touched."""
+
+    def __init__(self, app, controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        pool, priority = self.controller.classify(scope)
+        if pool is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Arrival time for deadlines.py (request.state.arrived_at), before any queueing
+        scope.setdefault("state", {})["arrived_at"] = time.monotonic()
+        try:
+            await pool.acquire(priority)
+        except Rejected as e:
+            detail = f"{pool.name} pool over capacity ({e.reason}), retry in {e.retry_after}s"
+            response = JSONResponse({"detail": detail}, status_code=e.status_code,
+                                    headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release(time.perf_counter() - start)
@@ -0,0 +1,184 @@
+"""
+Hit rate of the /extract-pdf structured fast path (pdf_fields.py) on a
+generated corpus of lung and colorectal reports in four layouts:
+
+    colon      "Age: 54" lines
+    table      "Hemoglobin 13.5 g/dL 12.0 - 15.5" rows with reference ranges
+    form       filled AcroForm fields, labels only in the text layer
+    narrative  free-text sentences (no key/value structure)
+
+Every document is extracted twice, with PDF_FAST_PATH on and off (fuzzy scan
+only), and compared field by field with the values it was generated from.
+
+    python AI/benchmarks/pdf_fast_path.py [--docs 40]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.dirname(BENCH_DIR)
+for path in (AI_DIR, BENCH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pdf_fields
+import server
+from warmup import make_text_pdf
+
+SEED = 415
+LAYOUTS = ("colon", "table", "form", "narrative")
+HEADER = ["Medical Laboratory Report", "Patient Information"]
+
+
+def lung_record(rng):
+    return {
+        "age": float(rng.randint(30, 85)),
+        "packYears": round(rng.uniform(0, 60), 1),
+        "gender": rng.choice(["Male", "Female"]),
+        "radon_exposure": rng.choice(["High", "Medium", "Low"]),
+        "alcohol_consumption": rng.choice(["High", "Moderate", "None"]),
+        "family_history": rng.choice([True, False]),
+        "asbestos_exposure": rng.choice([True, False]),
+        "secondhand_smoke_exposure": rng.choice([True, False]),
+        "copd_diagnosis": rng.choice([True, False]),
+    }
+
+
+def colorectal_record(rng):
+    return {
+        "age": float(rng.randint(30, 85)),
+        "bmi": round(rng.uniform(17, 40), 1),
+        "gender": rng.choice(["Male", "Female"]),
+        "lifestyle": rng.choice(["Very Active", "Active", "Sedentary", "Smoker"]),
+        "family_history": rng.choice([True, False]),
+        "carbs": float(rng.randint(150, 400)),
+        "proteins": float(rng.randint(40, 150)),
+        "fats": float(rng.randint(30, 120)),
+        "vitA": float(rng.randint(300, 1200)),
+        "vitC": float(rng.randint(20, 150)),
+        "iron": round(rng.uniform(5, 25), 1),
+    }
+
+
+RECORDS = {"lung": lung_record, "colorectal": colorectal_record}
+
+# field -> (label, unit, reference range) for the rows of a report
+LABELS = {
+    "age": ("Age", "years", "18 - 99"),
+    "packYears": ("Pack Years", "pack-years", "0 - 20"),
+    "bmi": ("BMI", "kg/m2", "18.5 - 24.9"),
+    "carbs": ("Carbohydrates", "g/day", "225 - 325"),
+    "proteins": ("Proteins", "g/day", "46 - 56"),
+    "fats": ("Fats", "g/day", "44 - 77"),
+    "vitA": ("Vitamin A", "mcg/day", "700 - 900"),
+    "vitC": ("Vitamin C", "mg/day", "75 - 90"),
+    "iron": ("Iron", "mg/day", "8 - 18"),
+    "gender": ("Gender", "", ""),
+    "radon_exposure": ("Radon Exposure", "", ""),
+    "alcohol_consumption": ("Alcohol Consumption", "", ""),
+    "lifestyle": ("Lifestyle", "", ""),
+    "family_history": ("Family History", "", ""),
+    "asbestos_exposure": ("Asbestos Exposure", "", ""),
+    "secondhand_smoke_exposure": ("Secondhand Smoke", "", ""),
+    "copd_diagnosis": ("COPD", "", ""),
+}
+WORDS = {"High": "High", "Moderate": "Moderate", "None": "None"}
+
+
+def shown(field, value):
+    """How a report prints a value ("Heavy" alcohol, "Positive" family history, ...)."""
+    if isinstance(value, bool):
+        return "Positive" if value else "Negative"
+    if field == "alcohol_consumption":
+        return {"High": "Heavy", "Moderate": "Moderate", "None": "None"}[value]
+    if isinstance(value, float):
+        return f"{value:g}"
+    return value
+
+
+def render(layout, record, rng):
+    """(pages, form fields) of one generated report."""
+    lines, form = list(HEADER), None
+    if layout == "colon":
+        lines += [f"{LABELS[f][0]}: {shown(f, v)}" for f, v in record.items()]
+    elif layout == "table":
+        lines.append("Test Result Unit Reference Range")
+        for f, v in record.items():
+            label, unit, ref = LABELS[f]
+            lines.append(" ".join(part for part in (label, shown(f, v), unit, ref) if part))
+    elif layout == "form":
+        lines += [f"{LABELS[f][0]}:" for f in record]
+        form = {"patient." + f: shown(f, v) for f, v in record.items()}
+    else:
+        for f, v in record.items():
+            label = LABELS[f][0].lower()
+            lines.append(rng.choice([
+                f"On review the patient's {label} was noted as {shown(f, v)}.",
+                f"We recorded {shown(f, v)} for {label} during the visit.",
+            ]))
+    return [lines], form
+
+
+def correct(expected, got):
+    if isinstance(expected, bool) or not isinstance(expected, float):
+        return got == expected
+    return got is not None and abs(got - expected) < 1e-6
+
+
+def extract(model_key, pdf, fast_path):
+    server.PDF_FAST_PATH = fast_path
+    before = dict(server._field_stats.fields)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = server.process_pdf_logic(model_key, pdf)["data"]
+    elapsed = time.perf_counter() - start
+    sources = {s: server._field_stats.fields[s] - before.get(s, 0) for s in pdf_fields.SOURCES}
+    return data, sources, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=40, help="documents per model and layout")
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    rows = []
+    for model_key, make_record in RECORDS.items():
+        for layout in LAYOUTS:
+            totals = {"fields": 0, "fast": 0, "ok_fast": 0, "ok_fuzzy": 0, "t_fast": 0.0, "t_fuzzy": 0.0}
+            for _ in range(args.docs):
+                record = make_record(rng)
+                pages, form = render(layout, record, rng)
+                pdf = make_text_pdf(pages, form)
+                fast, sources, t_fast = extract(model_key, pdf, True)
+                fuzzy, _, t_fuzzy = extract(model_key, pdf, False)
+                totals["fields"] += len(record)
+                totals["fast"] += sources["form"] + sources["table"]
+                totals["ok_fast"] += sum(correct(v, fast.get(f)) for f, v in record.items())
+                totals["ok_fuzzy"] += sum(correct(v, fuzzy.get(f)) for f, v in record.items())
+                totals["t_fast"] += t_fast
+                totals["t_fuzzy"] += t_fuzzy
+            rows.append((model_key, layout, totals))
+
+    print(f"{'model':<11} {'layout':<10} {'fast hits':>9} {'correct (fast)':>15} {'correct (fuzzy)':>16} "
+          f"{'ms/doc fast':>12} {'ms/doc fuzzy':>13}")
+    grand = {"fields": 0, "fast": 0, "ok_fast": 0, "ok_fuzzy": 0}
+    for model_key, layout, t in rows:
+        n = t["fields"]
+        print(f"{model_key:<11} {layout:<10} {t['fast'] / n:>9.0%} {t['ok_fast'] / n:>15.0%} "
+              f"{t['ok_fuzzy'] / n:>16.0%} {t['t_fast'] / args.docs * 1e3:>12.2f} "
+              f"{t['t_fuzzy'] / args.docs * 1e3:>13.2f}")
+        for key in grand:
+            grand[key] += t[key]
+    n = grand["fields"]
+    print(f"\nAll {n} fields: fast path answered {grand['fast'] / n:.0%}, "
+          f"correct {grand['ok_fast'] / n:.0%} (fuzzy only: {grand['ok_fuzzy'] / n:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Reference side of the FeaturePipeline parity check: the original row-wise
+preprocess_features encoding (float64 lists per request), the sample
+payloads it is compared on and each scaler's fitted column order.
+
+The check itself is AI/tests/test_pipeline_parity.py (run by CI);
+run_benchmarks.py runs it before timing anything.
+"""
+import os
+import sys
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.dirname(BENCH_DIR)
+for path in (AI_DIR, BENCH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from model_config import MAPPING_PATHS, MODELS_INFO
+
+
+def _mapped(mappings, feature_name, raw_value, default_val):
+    if feature_name in mappings:
+        return mappings[feature_name].get(str(raw_value), default_val)
+    return default_val
+
+
+def legacy_preprocess(model_key, raw, mappings):
+    """The row-wise encoding /predict used before FeaturePipeline, kept as the reference."""
+    if model_key == "breast":
+        arr = []
+        for f in MODELS_INFO["breast"]["features"]:
+            val = raw.get(f)
+            if val is None:
+                raise ValueError(f"Missing feature: {f}")
+            arr.append(float(val))
+        return np.array(arr).reshape(1, -1)
+
+    if model_key == "lung":
+        age = float(raw.get("age", 0))
+        pack = float(raw.get("pack_years", 0))
+        arr = [
+            age, pack,
+            _mapped(mappings, "gender", raw.get("gender"), 0),
+            _mapped(mappings, "radon_exposure", raw.get("radon_exposure"), 0),
+            _mapped(mappings, "asbestos_exposure", raw.get("asbestos_exposure"), 0),
+            _mapped(mappings, "secondhand_smoke_exposure", raw.get("secondhand_smoke_exposure"), 0),
+            _mapped(mappings, "copd_diagnosis", raw.get("copd_diagnosis"), 0),
+            _mapped(mappings, "alcohol_consumption", raw.get("alcohol_consumption"), 0),
+            _mapped(mappings, "family_history", raw.get("family_history"), 1),
+            age * pack,
+        ]
+        return np.array(arr).reshape(1, -1)
+
+    if model_key == "colorectal":
+        history = 0 if str(raw.get("Family_History_CRC", "No")) == "Yes" else 1
+        arr = [
+            float(raw.get("Age", 0)),
+            _mapped(mappings, "Gender", raw.get("Gender"), 0),
+            float(raw.get("BMI", 0)),
+            _mapped(mappings, "Lifestyle", raw.get("Lifestyle"), 2),
+            _mapped(mappings, "Ethnicity", raw.get("Ethnicity"), 4),
+            history,
+            _mapped(mappings, "Pre-existing Conditions", raw.get("Pre-existing Conditions"), 1),
+            float(raw.get("Carbohydrates (g)", 0)),
+            float(raw.get("Proteins (g)", 0)),
+            float(raw.get("Fats (g)", 0)),
+            float(raw.get("Vitamin A (IU)", 0)),
+            float(raw.get("Vitamin C (mg)", 0)),
+            float(raw.get("Iron (mg)", 0)),
+        ]
+        return np.array(arr).reshape(1, -1)
+
+    raise ValueError("Invalid model key")
+
+
+def load_mappings():
+    import json
+
+    out = {}
+    for key in MODELS_INFO:
+        path = MAPPING_PATHS.get(key)
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                out[key] = json.load(f)
+        else:
+            out[key] = {}
+    return out
+
+
+def sample_payloads(model_key, n, seed):
+    from run_benchmarks import make_raw_features
+
+    rng = np.random.default_rng(seed)
+    rows = [make_raw_features(model_key, rng) for _ in range(n)]
+    if model_key != "breast":
+        # Exercise defaults and unknown categories too
+        for i, row in enumerate(rows):
+            if i % 7 == 0:
+                row.pop(next(iter(row)))
+            if i % 11 == 0:
+                for k, v in row.items():
+                    if isinstance(v, str):
+                        row[k] = "Unknown"
+                        break
+    return rows
+
+
+def scaler_columns(model_key):
+    import joblib
+
+    path = MODELS_INFO[model_key]["scaler_path"]
+    if not os.path.exists(path):
+        return None
+    names = getattr(joblib.load(path), "feature_names_in_", None)
+    return None if names is None else [str(c) for c in names]
+
@@ -0,0 +1,561 @@
+"""
+Microbenchmarks for the serving primitives in AI/server.py.
+
+Usage (from the repo root or from AI/):
+    python AI/benchmarks/run_benchmarks.py                 # run everything
+    python AI/benchmarks/run_benchmarks.py -k predict      # only names containing "predict"
+    python AI/benchmarks/run_benchmarks.py --threshold 0.15
+
+Every run is saved to AI/benchmarks/results/<commit>.json and compared
+against the most recent result recorded for a *different* commit (or the
+file passed with --baseline). Any benchmark that got slower than the
+threshold is reported and the script exits with status 1.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+PARITY_TESTS = os.path.join(AI_DIR, "tests", "test_pipeline_parity.py")
+
+if AI_DIR not in sys.path:
+    sys.path.insert(0, AI_DIR)
+
+SEED = 415
+# Stops background threads (result store writer, ...) the benchmarks started; run after timing
+TEARDOWN = []
+BATCH_SIZES = [1, 4, 16, 64, 256, 1024, 4096]
+
+# Raw category values as the app sends them (keys of the mapping JSON files)
+LUNG_CATEGORIES = {
+    "gender": ["Male", "Female"],
+    "radon_exposure": ["Low", "Medium", "High"],
+    "alcohol_consumption": ["None", "Moderate", "Heavy"],
+    "asbestos_exposure": ["Yes", "No"],
+    "secondhand_smoke_exposure": ["Yes", "No"],
+    "copd_diagnosis": ["Yes", "No"],
+    "family_history": ["Yes", "No"],
+}
+COLORECTAL_CATEGORIES = {
+    "Gender": ["Male", "Female"],
+    "Lifestyle": ["Active", "Moderate Exercise", "Sedentary", "Smoker"],
+    "Ethnicity": ["African American", "Asian", "Caucasian", "Hispanic"],
+    "Family_History_CRC": ["Yes", "No"],
+    "Pre-existing Conditions": ["Diabetes", "Hypertension", "Obesity", "nan"],
+}
+COLORECTAL_NUMERIC = {
+    "Age": (25, 80), "BMI": (18, 40),
+    "Carbohydrates (g)": (150, 400), "Proteins (g)": (40, 120), "Fats (g)": (30, 100),
+    "Vitamin A (IU)": (2000, 9000), "Vitamin C (mg)": (20, 150), "Iron (mg)": (5, 20),
+}
+
+
+# ---------------------------------------------------------
+# 🟦 INPUT GENERATORS (fixed seed)
+# ---------------------------------------------------------
+def make_raw_features(model_key, rng):
+    """One request payload (the `features` dict of PredictRequest)."""
+    from model_config import MODELS_INFO
+
+    if model_key == "breast":
+        return {f: float(rng.uniform(0.01, 30.0)) for f in MODELS_INFO["breast"]["features"]}
+    if model_key == "lung":
+        raw = {"age": int(rng.integers(20, 90)), "pack_years": float(rng.uniform(0, 80))}
+        for col, options in LUNG_CATEGORIES.items():
+            raw[col] = options[rng.integers(len(options))]
+        return raw
+    if model_key == "colorectal":
+        raw = {col: float(rng.uniform(lo, hi)) for col, (lo, hi) in COLORECTAL_NUMERIC.items()}
+        for col, options in COLORECTAL_CATEGORIES.items():
+            raw[col] = options[rng.integers(len(options))]
+        return raw
+    raise ValueError(f"Unknown model key: {model_key}")
+
+
+def make_report_text(rng, n_filler=60):
+    """Synthetic lab report text with the fields the lung/colorectal extractors look for."""
+    lines = [
+        "City Hospital - Medical Laboratory Report",
+        "Patient Name: Test Patient",
+        f"Patient Age: {int(rng.integers(25, 85))} years",
+        "Gender: Female",
+        f"Pack Years: {rng.uniform(0, 60):.1f}",
+        "Radon exposure: Moderate",
+        "Alcohol: Occasional",
+        "Family History: Mother diagnosed with cancer",
+        "Asbestos: No",
+        "COPD: Yes",
+        f"BMI: {rng.uniform(18, 35):.1f} kg/m2 (ref 18.5 - 24.9)",
+        "Lifestyle: Sedentary",
+        f"Carbohydrates: {int(rng.integers(150, 400))} g",
+        f"Proteins: {int(rng.integers(40, 120))} g",
+        f"Fats: {int(rng.integers(30, 100))} g",
+        f"Vitamin A: {int(rng.integers(2000, 9000))} IU",
+        f"Vitamin C: {int(rng.integers(20, 150))} mg",
+        f"Iron: {rng.uniform(5, 20):.1f} mg",
+    ]
+    for i in range(n_filler):
+        lines.append(f"Analyte {i:03d}: {rng.uniform(0, 200):.2f} units (ref {rng.uniform(0, 50):.1f} - {rng.uniform(50, 250):.1f})")
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------
+# 🟦 BENCHMARK REGISTRY
+# ---------------------------------------------------------
+def build_benchmarks():
+    """Returns {name: zero-arg callable}. Inputs are generated once, outside the timed region."""
+    import server
+    from warmup import make_text_pdf
+
+    if not server._bundles:
+        server.load_resources()
+    benches = {}
+
+    # preprocess_features / get_mapped_value
+    for key in server.MODELS_INFO:
+        raw = make_raw_features(key, np.random.default_rng(SEED))
+        benches[f"preprocess_features[{key}]"] = (lambda k=key, r=raw: server.preprocess_features(k, r))
+
+    # whole-batch encoding vs. the old per-row loop
+    import pandas as pd
+    from pipeline_parity import legacy_preprocess, sample_payloads
+
+    for key in server.MODELS_INFO:
+        rows = sample_payloads(key, 1024, SEED)
+        frame = pd.DataFrame(rows)
+        pipeline = server._bundles[key].pipeline
+        mappings = server._loaded_mappings.get(key, {})
+        benches[f"feature_pipeline[{key},records,n=1024]"] = (lambda p=pipeline, r=rows: p.transform(r))
+        benches[f"feature_pipeline[{key},frame,n=1024]"] = (lambda p=pipeline, f=frame: p.transform(f))
+        benches[f"legacy_rowwise[{key},n=1024]"] = (
+            lambda k=key, r=rows, m=mappings: [legacy_preprocess(k, row, m) for row in r])
+
+    benches["get_mapped_value[hit]"] = lambda: server.get_mapped_value("lung", "radon_exposure", "Medium", 0)
+    benches["get_mapped_value[miss]"] = lambda: server.get_mapped_value("lung", "radon_exposure", "Unknown", 0)
+    benches["get_mapped_value[no_map]"] = lambda: server.get_mapped_value("breast", "radius_mean", 1.0, 0)
+
+    # scaler.transform / model.predict at several batch sizes
+    import cascade
+    import explain
+    import inference
+
+    for key, model in server._loaded_models.items():
+        if model is None:
+            continue
+        scaler = server._loaded_scalers[key]
+        # Quantized variants built by quantize.py, if any
+        model_path = server.resolve_model_spec(key)["model_path"]
+        variants = {}
+        for v in inference.VARIANTS:
+            path = inference.variant_paths(model_path, v)[0]
+            if os.path.isfile(path):
+                variants[v] = inference.TFLiteRunner(path, scaler.n_features_in_)
+        # Cascade pre-screen fitted by cascade.py, if any
+        prescreen = (cascade.load(model_path, server._bundles[key].thresholds)
+                     if os.path.isfile(cascade.config_path(model_path)) else None)
+        rng = np.random.default_rng(SEED)
+        for n in BATCH_SIZES:
+            x = rng.normal(size=(n, scaler.n_features_in_))
+            x_scaled = scaler.transform(x)
+            benches[f"scaler.transform[{key},n={n}]"] = (lambda s=scaler, a=x: s.transform(a))
+            benches[f"model.predict[{key},n={n}]"] = (lambda m=model, a=x_scaled: m.predict(a, verbose=0))
+            x32 = np.ascontiguousarray(x_scaled, dtype=np.float32)
+            benches[f"runner[{key},n={n}]"] = (lambda b=server._bundles[key], a=x32: b.runner(a))
+            if prescreen is not None:
+                benches[f"prescreen[{key},n={n}]"] = (lambda p=prescreen, a=x32: p.split(a))
+            for v, r in variants.items():
+                benches[f"tflite[{key},{v},n={n}]"] = (lambda r=r, a=x32: r(a))
+            if n in (1, 16):
+                benches[f"explain[{key},n={n}]"] = (lambda b=server._bundles[key], a=x32: explain.explain_rows(b, a))
+
+    benches.update(wire_benchmarks(server))
+
+    # fuzzy extraction
+    text = make_report_text(np.random.default_rng(SEED))
+    benches["fuzzy_extract[numeric]"] = lambda: server.fuzzy_extract(text, ["Pack Years", "Smoking History", "Packs per day"])
+    benches["fuzzy_extract[missing]"] = lambda: server.fuzzy_extract(text, ["Hemoglobin A1c"])
+    benches["fuzzy_extract_category[gender]"] = lambda: server.fuzzy_extract_category(
+        text, ["Gender", "Sex"], {"Male": "Male", "M": "Male", "Female": "Female", "F": "Female"})
+    benches["fuzzy_extract_category[missing]"] = lambda: server.fuzzy_extract_category(
+        text, ["Ethnicity"], {"Asian": "Asian", "Hispanic": "Hispanic"})
+
+    # PDF text extraction
+    lines = text.split("\n")
+    for n_pages in (1, 10):
+        pdf = make_text_pdf([lines] * n_pages)
+        benches[f"extract_text_from_pdf_sync[pages={n_pages}]"] = (lambda b=pdf: server.extract_text_from_pdf_sync(b))
+
+    return benches
+
+
+def wire_benchmarks(server):
+    """Request decoding / response encoding per format (skips formats whose library is missing)."""
+    import io
+
+    import pandas as pd
+    import thresholds
+    import wire_formats
+
+    from pipeline_parity import sample_payloads
+
+    benches = {}
+    rows = sample_payloads("lung", 1024, SEED)
+    one = json.dumps({"model_name": "lung", "features": rows[0]}).encode()
+    benches["decode[pydantic,n=1]"] = lambda: server.PredictRequest(**json.loads(one))
+    benches["decode[json,n=1]"] = lambda: wire_formats.decode_record(wire_formats.JSON, one)
+
+    stream = server._drift.streams.get("lung")
+    if stream is not None:
+        x = server._bundles["lung"].pipeline.transform(rows)
+        benches["drift.record[lung,n=1]"] = lambda: stream.record(x[:1])
+        benches["drift.record[lung,n=1024]"] = lambda: stream.record(x)
+
+    # Request-path cost of shadow mode: route + non-blocking enqueue (the scorer here is a no-op)
+    import shadow
+
+    scorer = shadow.ShadowScorer(lambda bundle, batch: np.zeros(len(batch)))
+    primary = server._bundles["lung"]
+    scorer.set_candidate("lung", primary)
+    benches["shadow.submit[lung]"] = lambda: scorer.submit("lung", primary, scorer.route("lung", primary), rows[0], 0.5)
+
+    # Request-path cost of the result store: one non-blocking enqueue (SQLite is written by its own thread)
+    import tempfile
+
+    import result_store
+
+    store = result_store.ResultStore(os.path.join(tempfile.mkdtemp(), "results.db"), queue_size=1 << 20)
+    store.open()
+    TEARDOWN.append(lambda: (store.sync(), store.close()))
+    response = {"request_id": "bench", "model": "lung", "model_version": primary.version,
+                "prediction": {"class": "negative", "probability": 0.5, "risk_level": "low"}, "cached": False}
+    benches["results.submit[lung]"] = lambda: store.submit("bench", "lung", "predict", response, rows[0], "p1")
+
+    schema = server._bundles["lung"].schema
+    benches["validate[lung,n=1]"] = lambda: schema.validate_one(rows[0])
+    benches["validate[lung,n=1024]"] = lambda: schema.validate_many(rows)
+
+    records = json.dumps({"records": rows}).encode()
+    benches["decode[json,n=1024]"] = lambda: wire_formats.decode_batch(wire_formats.JSON, records)
+
+    x = server._bundles["lung"].pipeline.transform(rows)
+    npy = io.BytesIO()
+    np.save(npy, x)
+    npy = npy.getvalue()
+    benches["decode[npy,n=1024]"] = lambda: wire_formats.decode_batch(wire_formats.NPY, npy)
+
+    try:
+        import msgpack
+
+        packed = msgpack.packb({"model_name": "lung", "features": rows[0]})
+        benches["decode[msgpack,n=1]"] = lambda: wire_formats.decode_record(wire_formats.MSGPACK, packed)
+    except ImportError:
+        pass
+
+    try:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(pd.DataFrame(rows), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        arrow = sink.getvalue().to_pybytes()
+        benches["decode[arrow,n=1024]"] = lambda: wire_formats.decode_batch(wire_formats.ARROW_STREAM, arrow)
+    except ImportError:
+        pass
+
+    probs = np.random.default_rng(SEED).random(1024)
+    batch = {"model": "lung", "model_version": "v", **server.batch_summary(probs, thresholds.DEFAULT)}
+    benches["encode[json.dumps,n=1024]"] = lambda: json.dumps({**batch, "probability": probs.tolist()})
+    benches["encode[FastJSONResponse,n=1024]"] = lambda: wire_formats.FastJSONResponse(batch)
+    return benches
+
+
+# ---------------------------------------------------------
+# 🟦 ALLOCATION BENCHMARK (float32 path vs. the old float64 path)
+# ---------------------------------------------------------
+def peak_alloc_bytes(fn, repeat=20):
+    """Largest extra traced memory seen while running fn (Python objects + NumPy buffers)."""
+    fn()
+    worst = 0
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            worst = max(worst, peak - base)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def allocation_benchmarks():
+    """
+    Encode + scale for n rows, old path vs. new path. The new path writes
+    into a pooled buffer, so it must stay below one float64 copy of the batch
+    (the first of the old path's full-size intermediates); only per-column
+    temporaries are allowed.
+    Returns ({name: {...}}, [failure messages]).
+    """
+    import server
+    import tensorflow as tf
+    from pipeline_parity import legacy_preprocess, sample_payloads
+
+    results, failures = {}, []
+    for key, bundle in server._bundles.items():
+        mappings = server._loaded_mappings.get(key, {})
+        for n in (1, 1024):
+            rows = sample_payloads(key, n, SEED)
+            row = rows[0]
+
+            def old_path(k=key, r=rows, one=row, m=mappings, sc=bundle.scaler, size=n):
+                if size == 1:
+                    x = legacy_preprocess(k, one, m)
+                else:
+                    x = np.vstack([legacy_preprocess(k, rr, m) for rr in r])
+                # scaler copy + the float32 cast Keras did internally
+                return tf.convert_to_tensor(sc.transform(x), dtype=tf.float32)
+
+            def new_path(b=bundle, r=rows, one=row, size=n):
+                buf = b.buffers.acquire(size)
+                x = b.pipeline.transform(one if size == 1 else r, out=buf)
+                b.scaler_inplace(x)
+                b.buffers.release(buf)
+
+            old_bytes = peak_alloc_bytes(old_path)
+            new_bytes = peak_alloc_bytes(new_path)
+            batch_bytes = n * len(bundle.pipeline.columns) * 8
+            name = f"alloc[{key},n={n}]"
+            results[name] = {"old_peak_bytes": old_bytes, "new_peak_bytes": new_bytes, "batch_bytes": batch_bytes}
+            if n > 1 and new_bytes >= batch_bytes:
+                failures.append(f"{name}: new path allocated {new_bytes} B >= one float64 batch ({batch_bytes} B)")
+    return results, failures
+
+
+# ---------------------------------------------------------
+# 🟦 IMPORT TIME (fresh interpreter, python -X importtime)
+# ---------------------------------------------------------
+IMPORT_BUDGET_MS = 1000
+# Imported on first use / warm-up only; `import server` must not pull them in
+LAZY_MODULES = ("tensorflow", "keras", "pypdf", "thefuzz", "joblib", "pandas")
+
+
+def import_time_report(module="server", runs=3):
+    """
+    Best of `runs` fresh `import <module>` runs under -X importtime.
+    Returns ({"total_ms", "packages": {top-level package: self ms}, "lazy_loaded": [...]}).
+    """
+    code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=AI_DIR,
+                              capture_output=True, text=True, check=True)
+        total_us, packages = 0, {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + int(self_us)
+            if name == module:
+                total_us = int(cumulative_us)
+        if best is None or total_us < best["total_ms"] * 1e3:
+            lazy = [m for m in proc.stdout.strip().split(",") if m]
+            best = {
+                "total_ms": total_us / 1e3,
+                "packages": {k: v / 1e3 for k, v in sorted(packages.items(), key=lambda kv: -kv[1])},
+                "lazy_loaded": lazy,
+            }
+    return best
+
+
+def time_callable(fn, repeat, min_time):
+    """Median seconds per call over `repeat` rounds, each at least `min_time` long."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    rounds = timer.repeat(repeat=repeat, number=number)
+    per_call = sorted(r / number for r in rounds)
+    return {
+        "median_s": per_call[len(per_call) // 2],
+        "min_s": per_call[0],
+        "loops": number,
+        "rounds": repeat,
+    }
+
+
+# ---------------------------------------------------------
+# 🟦 RESULT STORAGE & REGRESSION CHECK
+# ---------------------------------------------------------
+def current_commit():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=AI_DIR, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=AI_DIR) != 0
+        return sha + ("-dirty" if dirty else "")
+    except Exception:
+        return "unknown"
+
+
+def latest_baseline(results_dir, commit):
+    """Most recent result file recorded for a different commit."""
+    candidates = []
+    for path in glob.glob(os.path.join(results_dir, "*.json")):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("commit") != commit:
+            candidates.append((data.get("timestamp", 0), path, data))
+    if not candidates:
+        return None, None
+    _, path, data = max(candidates)
+    return path, data
+
+
+def compare(current, baseline, threshold):
+    """Returns [(name, old_s, new_s, ratio)] for benchmarks slower than baseline * (1 + threshold)."""
+    regressions = []
+    for name, res in current["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if not old:
+            continue
+        ratio = res["median_s"] / old["median_s"]
+        if ratio > 1.0 + threshold:
+            regressions.append((name, old["median_s"], res["median_s"], ratio))
+    return regressions
+
+
+def fmt_time(seconds):
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:8.1f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.2f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.3f} s "
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serving microbenchmarks")
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed slowdown before flagging (0.20 = 20%%)")
+    parser.add_argument("--baseline", help="Result JSON to compare against (default: latest other commit)")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true", help="Do not write a result file")
+    parser.add_argument("--skip-alloc", action="store_true", help="Skip the allocation benchmark")
+    parser.add_argument("--skip-import", action="store_true", help="Skip the import-time budget")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help="Fail if `import server` takes longer (fresh interpreter)")
+    args = parser.parse_args(argv)
+
+    # Fast code is only worth timing if it still produces the same features
+    import pytest
+    if pytest.main(["-q", "-p", "no:cacheprovider", PARITY_TESTS]) != 0:
+        print("❌ Parity: FeaturePipeline no longer matches the row-wise preprocessing")
+        return 2
+
+    np.random.seed(SEED)
+    # The server logs with print(); keep that noise out of the report.
+    devnull = open(os.devnull, "w")
+    alloc_results, alloc_failures = None, []
+    with contextlib.redirect_stdout(devnull):
+        import server
+
+        server.load_resources()
+        # Measured before any benchmark starts a background thread, whose
+        # allocations tracemalloc would count against the request path
+        if not args.skip_alloc:
+            alloc_results, alloc_failures = allocation_benchmarks()
+        benches = build_benchmarks()
+    selected = {name: fn for name, fn in benches.items() if args.filter in name}
+
+    commit = current_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": {},
+    }
+
+    print(f"\n⏱️  Running {len(selected)} benchmarks @ {commit}")
+    for name, fn in selected.items():
+        with contextlib.redirect_stdout(devnull):
+            fn()  # warm-up call (lazy init, graph tracing)
+            res = time_callable(fn, args.repeat, args.min_time)
+        results["benchmarks"][name] = res
+        print(f"   {name:<45} {fmt_time(res['median_s'])}")
+    for teardown in TEARDOWN:
+        teardown()
+
+    if alloc_results is not None:
+        print("\n🧮 Peak extra allocation, encode + scale (old float64 path -> float32 buffers)")
+        results["allocations"] = alloc_results
+        for name, res in results["allocations"].items():
+            print(f"   {name:<45} {res['old_peak_bytes']:>9} B -> {res['new_peak_bytes']:>7} B")
+        for failure in alloc_failures:
+            print(f"❌ {failure}")
+    devnull.close()
+
+    import_failures = []
+    if not args.skip_import:
+        report = import_time_report()
+        results["imports"] = report
+        print(f"\n📦 import server: {report['total_ms']:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+        for package, ms in list(report["packages"].items())[:8]:
+            print(f"   {package:<45} {ms:8.1f} ms")
+        if report["total_ms"] > args.import_budget_ms:
+            import_failures.append(f"import server took {report['total_ms']:.0f} ms > {args.import_budget_ms:.0f} ms")
+        if report["lazy_loaded"]:
+            import_failures.append(f"import server loaded {', '.join(report['lazy_loaded'])} (should be lazy)")
+        for failure in import_failures:
+            print(f"❌ {failure}")
+
+    if args.baseline:
+        baseline_path = args.baseline
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)
+    else:
+        baseline_path, baseline = latest_baseline(args.results_dir, commit)
+
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        out_path = os.path.join(args.results_dir, f"{commit}.json")
+        with open(out_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved results to {out_path}")
+
+    status = 1 if alloc_failures or import_failures else 0
+    if baseline is None:
+        print("ℹ️  No baseline to compare against yet.")
+        return status
+
+    regressions = compare(results, baseline, args.threshold)
+    print(f"📊 Compared against {baseline.get('commit')} ({baseline_path})")
+    if not regressions:
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+        return status
+
+    print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+    for name, old, new, ratio in regressions:
+        print(f"   {name:<45} {fmt_time(old)} -> {fmt_time(new)}  (x{ratio:.2f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Offline bulk scoring over CSV / Parquet files, using the same
+FeaturePipeline, scaler and model as /predict.
+
+    python bulk_score.py lung Dataset/lung_cancer_dataset.csv lung_scores.csv
+    python bulk_score.py colorectal Dataset/crc_dataset.csv crc_scores.parquet --workers 4
+
+The input is streamed in chunks (--chunk-size rows). Chunks are scored in a
+pool of worker processes (each loads the model once) with at most
+2 x --workers chunks in flight, so memory stays bounded for any file size.
+Output rows keep the input order: id column (if any), probability,
+risk_level, class.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import model_store
+from model_config import MAPPING_PATHS, MODELS_INFO
+
+
+# ---------------------------------------------------------
+# 🟦 WORKER PROCESS
+# ---------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(model_key, version, threads, variant=None, with_cascade=False):
+    import joblib
+    import tensorflow as tf
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    spec = model_store.resolve(model_key, MODELS_INFO[model_key], MAPPING_PATHS.get(model_key), version)
+    _worker["bundle"] = model_store.load_bundle(
+        model_key, spec, lambda p: tf.keras.models.load_model(p, compile=False), joblib.load, variant,
+        with_cascade,
+    )
+
+
+def score_chunk(model_key, df):
+    """Returns probabilities for one chunk (same post-processing as /predict)."""
+    bundle = _worker["bundle"]
+    x = bundle.pipeline.transform(df)
+    bundle.scaler_inplace(x)
+    return bundle.predict(x)
+
+
+def _version_of_worker():
+    return _worker["bundle"].version
+
+
+def _thresholds_of_worker():
+    # Same cut-offs as /predict for this version
+    return _worker["bundle"].thresholds
+
+
+# ---------------------------------------------------------
+# 🟦 INPUT / OUTPUT
+# ---------------------------------------------------------
+def read_chunks(path, chunk_size):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq  # optional dependency for Parquet input
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # keep_default_na=False: "None" stays the string "None", as in a JSON request
+        yield from pd.read_csv(path, chunksize=chunk_size, keep_default_na=False, na_values=[""])
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def build_output(df, pred, id_column, cutoffs):
+    risk = np.where(np.isnan(pred), "", cutoffs.levels(pred))
+    out = pd.DataFrame({
+        "probability": pred,
+        "risk_level": risk,
+        "class": np.where(risk == "high", "positive", "negative"),
+    })
+    if id_column and id_column in df.columns:
+        out.insert(0, id_column, df[id_column].to_numpy())
+    return out
+
+
+def guess_id_column(path):
+    head = next(iter(read_chunks(path, 1)))
+    for col in head.columns:
+        if str(col).lower().endswith("id"):
+            return col
+    return None
+
+
+# ---------------------------------------------------------
+# 🟦 MAIN
+# ---------------------------------------------------------
+def run(model_key, input_path, output_path, chunk_size, workers, version=None, id_column=None, variant=None,
+        with_cascade=False):
+    id_column = id_column or guess_id_column(input_path)
+    writer = ResultWriter(output_path)
+    start = time.perf_counter()
+    rows = 0
+
+    if workers <= 1:
+        _init_worker(model_key, version, threads=0, variant=variant, with_cascade=with_cascade)
+        cutoffs = _thresholds_of_worker()
+        for chunk in read_chunks(input_path, chunk_size):
+            writer.write(build_output(chunk, score_chunk(model_key, chunk), id_column, cutoffs))
+            rows += len(chunk)
+        model_version = _version_of_worker()
+    else:
+        # spawn: TensorFlow is not fork-safe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(model_key, version, 1, variant, with_cascade)) as pool:
+            cutoffs = pool.submit(_thresholds_of_worker).result()
+            in_flight = deque()
+            for chunk in read_chunks(input_path, chunk_size):
+                in_flight.append((chunk, pool.submit(score_chunk, model_key, chunk)))
+                # Bounded memory: wait for the oldest chunk before reading further ahead
+                while len(in_flight) >= 2 * workers:
+                    done_chunk, fut = in_flight.popleft()
+                    writer.write(build_output(done_chunk, fut.result(), id_column, cutoffs))
+                    rows += len(done_chunk)
+            while in_flight:
+                done_chunk, fut = in_flight.popleft()
+                writer.write(build_output(done_chunk, fut.result(), id_column, cutoffs))
+                rows += len(done_chunk)
+            model_version = pool.submit(_version_of_worker).result()
+
+    writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {rows} rows with {model_key} ({model_version}) in {elapsed:.1f}s "
+          f"({rows / max(elapsed, 1e-9):.0f} rows/s) -> {output_path}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a whole CSV/Parquet file offline")
+    parser.add_argument("model_key", choices=sorted(MODELS_INFO))
+    parser.add_argument("input", help=".csv or .parquet")
+    parser.add_argument("output", help=".csv or .parquet")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--version", help="Model store version (default: active)")
+    parser.add_argument("--id-column", help="Column copied to the output (default: first *id column)")
+    parser.add_argument("--variant", choices=("float32", "float16", "int8"), default="float32",
+                        help="Quantized variant built by quantize.py (default: float32)")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Answer clear-cut rows with the cascade.py pre-screen")
+    args = parser.parse_args(argv)
+
+    run(args.model_key, args.input, args.output, args.chunk_size, args.workers, args.version,
+        args.id_column, args.variant, args.cascade)
+
+
+if __name__ == "__main__":
+    main()
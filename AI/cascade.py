@@ -0,0 +1,320 @@
+"""
+Two-stage inference: a linear pre-screen in NumPy in front of the network.
+
+    python cascade.py lung                          # fit, report, write <model>.cascade.json
+    python cascade.py all --max-disagreement 0.005
+    CASCADE_MODELS=lung,colorectal uvicorn server:app   # serve with the cascade ("all" for every model)
+
+The pre-screen is a logistic model over the same scaled float32 features the
+network sees, distilled from the network: it is fitted (IRLS, pure NumPy) to
+the served probability of the full model on the training rows, so it learns
+where the network puts its cut-offs rather than re-learning the labels.
+
+At serving time every row is scored by the pre-screen first (one small
+mat-vec). Rows whose pre-screen probability falls inside the uncertainty band
+[low, high] are escalated to the network; the rest are answered by the
+pre-screen. The band is the narrowest one whose answered rows disagree with
+the network's risk_level (the model's thresholds.py cut-offs) on at most
+--max-disagreement of the training rows. The clearly-low side takes the
+budget first, since that is where most screening traffic lands.
+
+The config records the model's sha256 and risk cut-offs like a quantize.py
+report; a config built for another model file, or under cut-offs other than
+the model's current thresholds, is ignored and the model serves without a
+cascade. The report inside it is measured on the held-out split:
+escalation rate, agreement with the full model, and latency / throughput of
+the cascade against the network alone. Turn the cascade on only for models
+whose report shows a gain: a wide band escalates nearly everything and then
+the pre-screen is pure overhead.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import inference
+
+L2 = 1e-3
+MAX_DISAGREEMENT = 0.01
+
+
+# ---------------------------------------------------------
+# 🟦 PRE-SCREEN (SERVING)
+# ---------------------------------------------------------
+class Prescreen:
+    """sigmoid(x @ weights + bias) over scaled rows, and the band escalated to the network."""
+
+    def __init__(self, weights, bias, low, high, source="cascade"):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.float32(bias)
+        self.low = float(low)
+        self.high = float(high)
+        self.source = source
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.escalated = 0
+
+    def __call__(self, x):
+        z = (x @ self.weights + self.bias).astype(np.float64)
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def split(self, x):
+        """(pre-screen probabilities, rows to escalate) for a (n, n_features) scaled batch."""
+        probs = self(x)
+        escalate = (probs >= self.low) & (probs <= self.high)
+        with self._lock:
+            self.rows += len(probs)
+            self.escalated += int(escalate.sum())
+        return probs, escalate
+
+    def describe(self):
+        return {"low": self.low, "high": self.high, "source": self.source}
+
+    def reset(self):
+        with self._lock:
+            self.rows = self.escalated = 0
+
+    def stats(self):
+        with self._lock:
+            rows, escalated = self.rows, self.escalated
+        return {
+            **self.describe(),
+            "rows": rows,
+            "escalated": escalated,
+            "escalation_rate": escalated / rows if rows else None,
+        }
+
+
+def config_path(model_path):
+    """<model>.cascade.json next to the model file."""
+    return f"{os.path.splitext(model_path)[0]}.cascade.json"
+
+
+def load(model_path, risk_thresholds=None):
+    """
+    Prescreen from the model's config, or None (with a warning) if there is no
+    usable one. Given the bundle's `risk_thresholds`, a band fitted under other
+    cut-offs is not usable either.
+    """
+    path = config_path(model_path)
+    try:
+        with open(path, "r") as f:
+            config = json.load(f)
+        # Content hash rather than mtime, so checked-in configs survive a fresh clone
+        if config.get("source_sha256") != inference.file_sha256(model_path):
+            raise ValueError(f"built for a different {os.path.basename(model_path)}")
+        # The band bounds disagreement with risk_level at the cut-offs it was fitted for
+        if risk_thresholds is not None and not risk_thresholds.matches(config["policy"]["cutoffs"]):
+            raise ValueError("fitted under other risk cut-offs, run cascade.py again")
+        band = config["band"]
+        return Prescreen(config["weights"], config["bias"], band["low"], band["high"],
+                         source=os.path.basename(path))
+    except FileNotFoundError:
+        print(f"   ⚠️ No cascade config next to {os.path.basename(model_path)}, run cascade.py first")
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"   ⚠️ Ignoring {os.path.basename(path)} ({e}), serving without a cascade")
+    return None
+
+
+# ---------------------------------------------------------
+# 🟦 FITTING
+# ---------------------------------------------------------
+def fit(x, target, l2=L2, iterations=50, tol=1e-8):
+    """
+    Logistic regression on soft targets (the network's served probabilities)
+    by iteratively reweighted least squares. Returns (weights, bias).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    a = np.hstack([x, np.ones((len(x), 1))])
+    penalty = np.full(a.shape[1], l2 * len(x))
+    penalty[-1] = 0.0   # intercept is not shrunk
+    w = np.zeros(a.shape[1])
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-(a @ w)))
+        grad = a.T @ (p - target) + penalty * w
+        hess = (a * (p * (1.0 - p))[:, None]).T @ a + np.diag(penalty)
+        step = np.linalg.solve(hess + 1e-9 * np.eye(len(w)), grad)
+        w -= step
+        if np.max(np.abs(step)) < tol:
+            break
+    return w[:-1], w[-1]
+
+
+def _answered_prefix(wrong, budget):
+    """Longest prefix of `wrong` (0/1 in scan order) with at most `budget` ones."""
+    return int(np.searchsorted(np.cumsum(wrong), budget, side="right"))
+
+
+def choose_band(pre, full_codes, cutoffs, max_disagreement=MAX_DISAGREEMENT):
+    """
+    (low, high) so that rows answered by the pre-screen (pre < low or pre > high)
+    change risk_level on at most max_disagreement of the rows; low side first.
+    """
+    wrong = (cutoffs.codes(pre) != full_codes).astype(np.int64)
+    budget = int(max_disagreement * len(pre))
+    order = np.argsort(pre, kind="mergesort")
+
+    n_low = _answered_prefix(wrong[order], budget)
+    low = float(pre[order[n_low]]) if n_low < len(pre) else 1.0
+    budget -= int(wrong[order[:n_low]].sum())
+
+    rest = order[n_low:][::-1]
+    n_high = _answered_prefix(wrong[rest], budget)
+    high = float(pre[rest[n_high]]) if n_high < len(rest) else low
+    return low, max(low, high)
+
+
+def _best_seconds(fn, repeat=5, min_time=0.05):
+    """Fastest per-call time of fn() over `repeat` timed loops of at least `min_time` each."""
+    best = float("inf")
+    for _ in range(repeat):
+        calls, start = 0, time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+
+def served_full(bundle, x):
+    probs = bundle.runner(x).astype(np.float64)
+    # Same post-processing as /predict
+    return 1.0 - probs if bundle.key == "colorectal" else probs
+
+
+def evaluate(bundle, prescreen, x, y, full):
+    """Held-out agreement, escalation rate and timings of the cascade vs the network alone."""
+    from sklearn.metrics import roc_auc_score
+
+    pre, escalate = prescreen.split(x)
+    cascade_probs = np.where(escalate, full, pre)
+    cutoffs = bundle.thresholds
+    full_codes, cascade_codes = cutoffs.codes(full), cutoffs.codes(cascade_probs)
+    answered = ~escalate
+
+    def cascade_batch():
+        probs, esc = prescreen.split(x)
+        if esc.any():
+            probs[esc] = served_full(bundle, x[esc])
+        return probs
+
+    one = x[:1]
+    row_low = x[np.argmin(pre)][None, :]
+    timings = {
+        "full_row_us": _best_seconds(lambda: served_full(bundle, one)) * 1e6,
+        "prescreen_row_us": _best_seconds(lambda: prescreen.split(row_low)) * 1e6,
+        "full_batch_rows_per_s": len(x) / _best_seconds(lambda: served_full(bundle, x)),
+        "cascade_batch_rows_per_s": len(x) / _best_seconds(cascade_batch),
+    }
+    rate = float(escalate.mean())
+    # Expected single-request latency: every row pays the pre-screen, escalated rows the network too
+    timings["cascade_row_us_expected"] = timings["prescreen_row_us"] + rate * timings["full_row_us"]
+    timings["row_latency_speedup"] = timings["full_row_us"] / timings["cascade_row_us_expected"]
+    timings["batch_throughput_speedup"] = timings["cascade_batch_rows_per_s"] / timings["full_batch_rows_per_s"]
+
+    return {
+        "samples": int(len(x)),
+        "escalation_rate": rate,
+        "answered_low": int(np.sum(answered & (pre < prescreen.low))),
+        "answered_high": int(np.sum(answered & (pre > prescreen.high))),
+        "risk_level_agreement": float(np.mean(full_codes == cascade_codes)),
+        "class_agreement": float(np.mean((full_codes == 2) == (cascade_codes == 2))),
+        "answered_risk_level_agreement": float(np.mean(full_codes[answered] == cascade_codes[answered]))
+        if answered.any() else None,
+        "mean_abs_diff": float(np.mean(np.abs(cascade_probs - full))),
+        "auc_full": float(roc_auc_score(y, full)),
+        "auc_cascade": float(roc_auc_score(y, cascade_probs)),
+        "auc_prescreen_alone": float(roc_auc_score(y, pre)),
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+    }
+
+
+def build_config(model_key, version=None, max_disagreement=MAX_DISAGREEMENT, l2=L2, dry_run=False):
+    """Fits the pre-screen, picks the band, measures it and (unless dry_run) writes the config."""
+    import joblib
+    import tensorflow as tf
+
+    import model_store
+    from dataset_io import load_labeled, split
+    from model_config import MAPPING_PATHS, MODELS_INFO
+
+    spec = model_store.resolve(model_key, MODELS_INFO[model_key], MAPPING_PATHS.get(model_key), version)
+    bundle = model_store.load_bundle(
+        model_key, spec, lambda p: tf.keras.models.load_model(p, compile=False), joblib.load
+    )
+
+    x, y = load_labeled(model_key, bundle.mappings)
+    bundle.scaler_inplace(x)
+    x_train, x_test, y_train, y_test = split(x, y)
+    full_train, full_test = served_full(bundle, x_train), served_full(bundle, x_test)
+
+    start = time.perf_counter()
+    weights, bias = fit(x_train, full_train, l2)
+    fit_seconds = time.perf_counter() - start
+    pre_train = Prescreen(weights, bias, 0.0, 1.0)(x_train)
+    low, high = choose_band(pre_train, bundle.thresholds.codes(full_train), bundle.thresholds, max_disagreement)
+    prescreen = Prescreen(weights, bias, low, high)
+
+    report = evaluate(bundle, prescreen, x_test, y_test, full_test)
+    config = {
+        "model_key": model_key,
+        "model_version": spec["version"],
+        "source_sha256": inference.file_sha256(spec["model_path"]),
+        "created_at": time.time(),
+        "features": bundle.pipeline.columns,
+        "weights": [float(w) for w in weights],
+        "bias": float(bias),
+        "band": {"low": low, "high": high},
+        "policy": {"max_disagreement": max_disagreement, "l2": l2,
+                   "cutoffs": bundle.thresholds.describe()},
+        "fit_seconds": round(fit_seconds, 3),
+        "held_out": report,
+    }
+
+    t = report["timings"]
+    print(f"{'🧪' if dry_run else '✅'} {model_key} ({spec['version']}): band [{low:.4f}, {high:.4f}], "
+          f"escalates {report['escalation_rate']:.1%} of held-out rows")
+    print(f"   risk_level agreement {report['risk_level_agreement']:.4f}, "
+          f"AUC {report['auc_cascade']:.4f} (full {report['auc_full']:.4f}, "
+          f"pre-screen alone {report['auc_prescreen_alone']:.4f})")
+    print(f"   ⏱️ row {t['full_row_us']:.0f} µs -> {t['cascade_row_us_expected']:.0f} µs expected "
+          f"(x{t['row_latency_speedup']:.1f}), batch {t['full_batch_rows_per_s']:.0f} -> "
+          f"{t['cascade_batch_rows_per_s']:.0f} rows/s (x{t['batch_throughput_speedup']:.1f})")
+    if not dry_run:
+        path = config_path(spec["model_path"])
+        with open(path, "w") as f:
+            json.dump(config, f, indent=2)
+        print(f"   -> {path}")
+    return config
+
+
+def main(argv=None):
+    from model_config import MODELS_INFO
+
+    parser = argparse.ArgumentParser(description="Fit the pre-screen stage of the inference cascade")
+    parser.add_argument("model_key", choices=sorted(MODELS_INFO) + ["all"])
+    parser.add_argument("--version", help="Model store version (default: active)")
+    parser.add_argument("--max-disagreement", type=float, default=MAX_DISAGREEMENT,
+                        help="Share of rows whose risk_level the pre-screen may change (default 0.01)")
+    parser.add_argument("--l2", type=float, default=L2)
+    parser.add_argument("--dry-run", action="store_true", help="Print the report, write nothing")
+    args = parser.parse_args(argv)
+
+    keys = sorted(MODELS_INFO) if args.model_key == "all" else [args.model_key]
+    for key in keys:
+        build_config(key, args.version, args.max_disagreement, args.l2, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Columnar cache for the CSVs in AI/Dataset.
+
+    df = load(DATASETS["lung"]["path"])                       # whole table
+    df = load(path, columns=["gender", "family_history"])     # only what you need
+
+The first load of a CSV parses it once (strings as written: "None" stays a
+category, only empty cells are NaN, exactly like dataset_io used to read it)
+and writes a Parquet copy with every text column stored as a categorical.
+The copy is keyed by the CSV's sha256, so editing or replacing the CSV
+simply produces a new cache file; stale ones are removed on the next write.
+
+Later loads read the Parquet file (only the requested columns), which skips
+CSV parsing and gives category dictionaries for free - generate_mappings
+takes its codes straight from them.
+
+DATASET_CACHE_DIR moves the cache (default AI/Dataset/.cache); DATASET_CACHE=0
+turns it off. Without pyarrow every load falls back to pandas.read_csv.
+"""
+import glob
+import os
+import threading
+
+import pandas as pd
+
+from inference import file_sha256
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", os.path.join(ROOT, "Dataset", ".cache"))
+ENABLED = os.environ.get("DATASET_CACHE", "1") != "0"
+
+_hashes = {}         # (path, size, mtime_ns) -> sha256, so a process hashes each file once
+_lock = threading.Lock()
+
+
+def source_hash(path):
+    """sha256 of the CSV, memoised on (size, mtime) for this process."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        digest = _hashes.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        with _lock:
+            _hashes[key] = digest
+    return digest
+
+
+def cache_path(path, digest=None):
+    stem = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    return os.path.join(CACHE_DIR, f"{stem}-{(digest or source_hash(path))[:16]}.parquet")
+
+
+def read_csv(path, columns=None):
+    """The CSV as written; text columns become categoricals."""
+    df = pd.read_csv(path, keep_default_na=False, na_values=[""], usecols=columns)
+    df = df.loc[:, ~df.columns.str.startswith("Unnamed")]
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _have_pyarrow():
+    try:
+        import pyarrow.parquet  # noqa: F401  (optional dependency)
+    except ImportError:
+        return False
+    return True
+
+
+def build(path):
+    """Writes the Parquet copy of `path` (if missing) and returns its path, or None without pyarrow."""
+    if not _have_pyarrow():
+        return None
+    target = cache_path(path)
+    if os.path.exists(target):
+        return target
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df = read_csv(path)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)   # atomic: concurrent builders (train.py workers) never see half a file
+    print(f"✅ Cached {os.path.basename(path)} ({len(df)} rows) -> {os.path.relpath(target, ROOT)}")
+
+    prefix = target.rsplit("-", 1)[0]
+    for stale in glob.glob(f"{prefix}-*.parquet"):
+        if stale != target:
+            os.remove(stale)
+    return target
+
+
+def load(path, columns=None):
+    """DataFrame for the CSV at `path` (optionally only `columns`), through the cache."""
+    cached = build(path) if ENABLED else None
+    if cached is None:
+        return read_csv(path, columns)
+    return pd.read_parquet(cached, columns=list(columns) if columns is not None else None)
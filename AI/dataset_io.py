@@ -0,0 +1,36 @@
+"""
+Labeled training data from AI/Dataset, encoded with the serving pipeline.
+
+    x, y = load_labeled("lung", mappings)      # float32 (unscaled) features in model order, 0/1 labels
+    x_train, x_test, y_train, y_test = split(x, y)
+
+split() reproduces the training notebooks' split (80/20, stratified,
+random_state=42), so "held-out" here means the rows the models never saw.
+"""
+import numpy as np
+
+import dataset_cache
+import feature_pipeline
+from model_config import DATASETS, SPLIT_SEED, TEST_SIZE
+
+
+def read_dataset(model_key):
+    """Raw dataset as strings-as-written ("None" stays a category, not NaN), via the columnar cache."""
+    return dataset_cache.load(DATASETS[model_key]["path"])
+
+
+def load_labeled(model_key, mappings):
+    """Encoded feature matrix (float32, unscaled) and 0/1 labels for the whole dataset."""
+    info = DATASETS[model_key]
+    df = read_dataset(model_key)
+    y = df[info["target"]]
+    if info["labels"] is not None:
+        y = y.map(info["labels"])
+    x = feature_pipeline.build(model_key, mappings).transform(df)
+    return x, y.to_numpy(dtype=np.int64)
+
+
+def split(x, y):
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(x, y, test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=y)
@@ -0,0 +1,127 @@
+"""
+Request deadlines and cooperative cancellation.
+
+Every predict / extract request gets a Deadline: the client's budget from the
+"X-Request-Timeout" header (seconds, capped at REQUEST_DEADLINE_MAX_SECONDS)
+or REQUEST_DEADLINE_SECONDS (default 30, what the mobile client waits). The
+work checks it between stages:
+
+    /extract-pdf      admission -> each PDF page -> field extraction
+    /predict(/batch)  admission -> preprocess -> inference
+    /screen           admission -> preprocess -> inference, per model
+    /explain          admission -> preprocess -> each chunk of explained rows
+
+A check raises Abandoned once the deadline has passed or the client has
+disconnected (watch_disconnect polls for it while a stage runs in the
+threadpool), so timed-out retries stop piling duplicate work onto a worker.
+Work already inside a stage (one page, one model call) still finishes.
+
+The server answers Abandoned with 504 (deadline) or 499 (client gone) and
+counts it here: per reason and stage, plus the seconds of work thrown away.
+"""
+import asyncio
+import os
+import threading
+import time
+
+HEADER = "x-request-timeout"
+DEFAULT_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "30"))
+MAX_SECONDS = float(os.environ.get("REQUEST_DEADLINE_MAX_SECONDS", "120"))
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+class Abandoned(Exception):
+    """Raised by Deadline.check; `reason` is "deadline" or "disconnected"."""
+
+    def __init__(self, reason, stage, elapsed):
+        super().__init__(f"Request abandoned at {stage} ({reason}) after {elapsed:.3f}s")
+        self.reason = reason
+        self.stage = stage
+        self.elapsed = elapsed
+
+
+class Deadline:
+    def __init__(self, seconds, started=None):
+        # Counted from arrival (admission.py stamps it) so time spent queued is included
+        self.started = time.monotonic() if started is None else started
+        self.expires_at = self.started + seconds
+        self.cancelled = None    # reason, set from another task / thread
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def cancel(self, reason="disconnected"):
+        self.cancelled = reason
+
+    def check(self, stage):
+        """Raises Abandoned if the request should stop before `stage`."""
+        reason = self.cancelled
+        if reason is None and time.monotonic() >= self.expires_at:
+            reason = "deadline"
+        if reason is not None:
+            raise Abandoned(reason, stage, time.monotonic() - self.started)
+
+
+def parse_timeout(value, default=DEFAULT_SECONDS, maximum=MAX_SECONDS):
+    """Header value -> seconds; missing or malformed values get the default."""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return default
+    if seconds != seconds or seconds <= 0:
+        return default
+    return min(seconds, maximum)
+
+
+class AbandonedWork:
+    """Counters for /metrics; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.by_reason = {}      # reason -> {stage: count}
+        self.by_endpoint = {}
+        self.seconds = 0.0
+
+    def start(self, request):
+        with self._lock:
+            self.started += 1
+        return Deadline(parse_timeout(request.headers.get(HEADER)), getattr(request.state, "arrived_at", None))
+
+    def record(self, endpoint, exc):
+        with self._lock:
+            stages = self.by_reason.setdefault(exc.reason, {})
+            stages[exc.stage] = stages.get(exc.stage, 0) + 1
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+            self.seconds += exc.elapsed
+
+    def stats(self):
+        with self._lock:
+            abandoned = sum(sum(s.values()) for s in self.by_reason.values())
+            return {
+                "requests": self.started,
+                "abandoned": abandoned,
+                "by_reason": {r: dict(s) for r, s in self.by_reason.items()},
+                "by_endpoint": dict(self.by_endpoint),
+                "abandoned_work_seconds": round(self.seconds, 3),
+            }
+
+
+async def watch_disconnect(request, deadline, interval=DISCONNECT_POLL_SECONDS):
+    """Cancels `deadline` when the client goes away; run as a task next to the work."""
+    while deadline.cancelled is None:
+        if await request.is_disconnected():
+            deadline.cancel("disconnected")
+            return
+        await asyncio.sleep(interval)
+
+
+async def run_stage(request, deadline, fn, *args):
+    """Runs fn(*args) in the threadpool while watching for a client disconnect."""
+    from fastapi.concurrency import run_in_threadpool
+
+    watcher = asyncio.create_task(watch_disconnect(request, deadline))
+    try:
+        return await run_in_threadpool(fn, *args)
+    finally:
+        watcher.cancel()
@@ -0,0 +1,249 @@
+"""
+Streaming input-drift monitoring for the encoded feature vectors /predict
+serves (before scaling, so numbers read like the request: pack_years,
+area_mean, mapped category codes, ...).
+
+Per model and feature the monitor keeps fixed-size state only:
+running count / mean / M2 (Welford, merged per batch) and a histogram over
+the reference profile's decile bins (+ under/overflow). Recording one row is
+a couple of vectorized NumPy ops.
+
+Reference profiles are precomputed from AI/Dataset and checked in under
+drift_profiles/<model>.json:
+
+    python drift_monitor.py build            # all models
+    python drift_monitor.py build lung
+
+Drift scores per feature:
+    psi          population stability index of the served histogram vs. the reference
+    mean_shift   (mean - ref_mean) / ref_std
+    std_ratio    std / ref_std
+PSI >= 0.1 is reported as "warning", >= 0.25 as "drift". Stats are per
+worker process and cumulative until reset.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from model_config import MAPPING_PATHS, MODELS_INFO
+
+PROFILE_DIR = os.path.join(ROOT, "drift_profiles")
+N_BINS = 10
+MIN_SAMPLES = int(os.environ.get("DRIFT_MIN_SAMPLES", "100"))
+PSI_WARNING, PSI_DRIFT = 0.1, 0.25
+_EPS = 1e-4
+
+
+# ---------------------------------------------------------
+# 🟦 REFERENCE PROFILES
+# ---------------------------------------------------------
+def build_profile(model_key, mappings, n_bins=N_BINS):
+    """Mean/std and decile bins per feature over the training rows of AI/Dataset."""
+    import feature_pipeline
+    from dataset_io import load_labeled, split
+
+    x, y = load_labeled(model_key, mappings)
+    x_train = split(x, y)[0].astype(np.float64)
+    columns = feature_pipeline.build(model_key, mappings).columns
+
+    features = []
+    for j, name in enumerate(columns):
+        col = x_train[:, j]
+        # Interior quantile edges; categorical columns collapse to their distinct values
+        edges = np.unique(np.quantile(col, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, col, side="right"), minlength=len(edges) + 1)
+        features.append({
+            "name": name,
+            "mean": float(col.mean()),
+            "std": float(col.std()),
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+        })
+    return {"model_key": model_key, "rows": int(len(x_train)), "created_at": time.time(), "features": features}
+
+
+def profile_path(model_key, profile_dir=PROFILE_DIR):
+    return os.path.join(profile_dir, f"{model_key}.json")
+
+
+def load_profile(model_key, profile_dir=PROFILE_DIR):
+    path = profile_path(model_key, profile_dir)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------
+# 🟦 STREAMING STATE
+# ---------------------------------------------------------
+class FeatureStream:
+    """O(features x bins) state for one model; thread-safe updates."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.columns = [f["name"] for f in profile["features"]]
+        n_features = len(self.columns)
+        width = max(len(f["edges"]) for f in profile["features"])
+        # Edges padded with +inf, so (x >= edges).sum() is the bin index for every feature at once
+        self._edges = np.full((n_features, max(width, 1)), np.inf)
+        for j, f in enumerate(profile["features"]):
+            self._edges[j, :len(f["edges"])] = f["edges"]
+        self._ref_mean = np.array([f["mean"] for f in profile["features"]])
+        self._ref_std = np.array([f["std"] for f in profile["features"]])
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            n_features, width = self._edges.shape
+            self.count = 0
+            self.mean = np.zeros(n_features)
+            self.m2 = np.zeros(n_features)
+            self.hist = np.zeros((n_features, width + 1), dtype=np.int64)
+            # Flat view + per-feature row offsets: one fancy-index add per single-row update
+            self._hist_flat = self.hist.reshape(-1)
+            self._offsets = np.arange(n_features) * (width + 1)
+            self.since = time.time()
+
+    def record(self, x):
+        """x: (n, n_features) encoded rows (any float dtype)."""
+        n = len(x)
+        if n == 0:
+            return
+        if n == 1:
+            self._record_one(x[0])
+            return
+        x = np.asarray(x, dtype=np.float64)
+        bins = (x[:, :, None] >= self._edges[None, :, :]).sum(axis=2)      # (n, F)
+        batch_mean = x.mean(axis=0)
+        batch_m2 = ((x - batch_mean) ** 2).sum(axis=0) if n > 1 else np.zeros_like(batch_mean)
+        with self._lock:
+            # Chan et al. parallel merge of (count, mean, M2)
+            total = self.count + n
+            delta = batch_mean - self.mean
+            self.mean += delta * (n / total)
+            self.m2 += batch_m2 + delta ** 2 * (self.count * n / total)
+            self.count = total
+            for j in range(bins.shape[1]):
+                self.hist[j] += np.bincount(bins[:, j], minlength=self.hist.shape[1])
+
+    def _record_one(self, row):
+        # The per-request path: plain Welford step, a handful of small NumPy ops
+        row = row.astype(np.float64)
+        idx = self._offsets + (row[:, None] >= self._edges).sum(axis=1)
+        with self._lock:
+            self.count += 1
+            delta = row - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (row - self.mean)
+            self._hist_flat[idx] += 1
+
+    def scores(self):
+        with self._lock:
+            count, mean, m2, hist = self.count, self.mean.copy(), self.m2.copy(), self.hist.copy()
+        result = {"samples": count, "since": self.since, "features": {}}
+        if count < MIN_SAMPLES:
+            result["status"] = "insufficient_data"
+            return result
+
+        std = np.sqrt(m2 / count)
+        worst = 0.0
+        for j, f in enumerate(self.profile["features"]):
+            expected = np.asarray(f["proportions"])
+            observed = hist[j, :len(expected)] / count
+            p = np.clip(observed, _EPS, None)
+            q = np.clip(expected, _EPS, None)
+            psi = float(np.sum((p - q) * np.log(p / q)))
+            ref_std = self._ref_std[j] or 1.0
+            worst = max(worst, psi)
+            result["features"][f["name"]] = {
+                "psi": psi,
+                "mean": float(mean[j]),
+                "ref_mean": float(self._ref_mean[j]),
+                "mean_shift": float((mean[j] - self._ref_mean[j]) / ref_std),
+                "std_ratio": float(std[j] / ref_std),
+                "status": _status(psi),
+            }
+        result["max_psi"] = worst
+        result["status"] = _status(worst)
+        return result
+
+
+def _status(psi):
+    return "drift" if psi >= PSI_DRIFT else "warning" if psi >= PSI_WARNING else "ok"
+
+
+class DriftMonitor:
+    """One FeatureStream per model key; models without a profile are not tracked."""
+
+    def __init__(self, profile_dir=PROFILE_DIR, enabled=True):
+        self.enabled = enabled
+        self.streams = {}
+        if not enabled:
+            return
+        for key in MODELS_INFO:
+            profile = load_profile(key, profile_dir)
+            if profile is None:
+                print(f"   ⚠️ No drift profile for {key} (python drift_monitor.py build {key})")
+                continue
+            self.streams[key] = FeatureStream(profile)
+
+    def record(self, model_key, x):
+        stream = self.streams.get(model_key)
+        if stream is not None and x.shape[-1] == len(stream.columns):
+            stream.record(x)
+
+    def reset(self, model_key=None):
+        for key, stream in self.streams.items():
+            if model_key in (None, key):
+                stream.reset()
+
+    def report(self):
+        return {key: stream.scores() for key, stream in self.streams.items()}
+
+    def summary(self):
+        """Compact view for /metrics."""
+        out = {}
+        for key, s in self.report().items():
+            out[key] = {"samples": s["samples"], "status": s["status"], "max_psi": s.get("max_psi")}
+        return out
+
+
+def monitor_from_env():
+    """DRIFT_MONITOR=0 disables recording."""
+    return DriftMonitor(enabled=os.environ.get("DRIFT_MONITOR", "1") != "0")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build drift reference profiles from AI/Dataset")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build")
+    p_build.add_argument("model_key", nargs="?", choices=sorted(MODELS_INFO))
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        for key in [args.model_key] if args.model_key else sorted(MODELS_INFO):
+            mappings = {}
+            path = MAPPING_PATHS.get(key)
+            if path and os.path.exists(path):
+                with open(path, "r") as f:
+                    mappings = json.load(f)
+            profile = build_profile(key, mappings)
+            with open(profile_path(key), "w") as f:
+                json.dump(profile, f, indent=4)
+            print(f"✅ {key}: profile over {profile['rows']} rows -> {profile_path(key)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Feature attributions for /explain: integrated gradients averaged over a
+background sample of training rows (expected gradients).
+
+For a scaled input x, background rows b_1..b_K and path points
+alpha_1..alpha_m, every (x, b_k, alpha_j) interpolation of every requested
+row is stacked into ONE tensor and pushed through a single traced
+forward + backward pass:
+
+    attr(x) = mean_k (x - b_k) * mean_j grad f(b_k + alpha_j (x - b_k))
+
+Attributions add up (approximately) to f(x) - mean_k f(b_k), i.e. how far
+this patient sits from an average training patient, split per feature.
+
+The background sample, its mean prediction and the traced function are built
+once per model version (the explainer is cached on the ModelBundle). The
+float Keras model is used even when a quantized variant serves /predict,
+because the variants have no gradients.
+
+The background rows are checked in next to the model as <model>.explain.json
+(with the model's sha256, like a thresholds.py config), so building an
+explainer at boot does not load the dataset:
+
+    python explain.py lung
+    python explain.py all
+
+Without a usable file the rows are sampled from AI/Dataset at build time.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import inference
+
+BACKGROUND_SIZE = int(os.environ.get("EXPLAIN_BACKGROUND", "16"))
+STEPS = int(os.environ.get("EXPLAIN_STEPS", "32"))
+# Rows per forward + backward pass; the request deadline is checked between chunks
+CHUNK_ROWS = int(os.environ.get("EXPLAIN_CHUNK_ROWS", "8"))
+SEED = 415
+
+_build_lock = threading.Lock()
+
+
+def config_path(model_path):
+    """<model>.explain.json next to the model file."""
+    return f"{os.path.splitext(model_path)[0]}.explain.json"
+
+
+def load_background(model_path, n_features, size=BACKGROUND_SIZE):
+    """Encoded (unscaled) background rows from the model's config, or None if there is no usable one."""
+    path = config_path(model_path)
+    try:
+        with open(path, "r") as f:
+            config = json.load(f)
+        # Content hash rather than mtime, so checked-in configs survive a fresh clone
+        if config.get("source_sha256") != inference.file_sha256(model_path):
+            raise ValueError(f"built for a different {os.path.basename(model_path)}")
+        if config["size"] != size:
+            raise ValueError(f"sampled for EXPLAIN_BACKGROUND={config['size']}, not {size}")
+        rows = np.asarray(config["rows"], dtype=np.float32)
+        if rows.ndim != 2 or len(rows) == 0 or rows.shape[1] != n_features:
+            raise ValueError(f"expected rows of {n_features} features, got shape {rows.shape}")
+        return rows
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"   ⚠️ Ignoring {os.path.basename(path)} ({e}), sampling the dataset")
+        return None
+
+
+def sample_rows(bundle, size=BACKGROUND_SIZE, seed=SEED):
+    """`size` encoded training rows (stratified by label) from AI/Dataset; raises OSError/KeyError without it."""
+    from dataset_io import load_labeled, split
+
+    x, y = load_labeled(bundle.key, bundle.mappings)
+    x_train, _, y_train, _ = split(x, y)
+    rng = np.random.default_rng(seed)
+    picks = []
+    for label in np.unique(y_train):
+        rows = np.flatnonzero(y_train == label)
+        share = max(1, round(size * len(rows) / len(y_train)))
+        picks.append(rng.choice(rows, min(share, len(rows)), replace=False))
+    return np.ascontiguousarray(x_train[np.concatenate(picks)], dtype=np.float32)
+
+
+def background_sample(bundle, size=BACKGROUND_SIZE, seed=SEED):
+    """
+    `size` scaled training rows: the checked-in sample, else a fresh one from
+    AI/Dataset, else the scaler's mean (a single all-zero scaled row).
+    """
+    n_features = bundle.buffers.n_features
+    sample = load_background(bundle.model_path, n_features, size) if bundle.model_path else None
+    if sample is None:
+        try:
+            sample = sample_rows(bundle, size, seed)
+        except (OSError, KeyError) as e:
+            print(f"   ⚠️ No dataset background for {bundle.key} ({e}), using the training mean")
+            return np.zeros((1, n_features), dtype=np.float32)
+    bundle.scaler_inplace(sample)
+    return sample
+
+
+class IntegratedGradients:
+    def __init__(self, model, background, steps=STEPS):
+        import tensorflow as tf
+
+        self.background = np.asarray(background, dtype=np.float32)
+        self.steps = steps
+        n_features = self.background.shape[1]
+        bg = tf.constant(self.background)
+        # Midpoint rule on [0, 1]
+        alphas = tf.constant((np.arange(steps, dtype=np.float32) + 0.5) / steps)
+
+        def attribute(x):
+            diff = x[:, None, :] - bg[None, :, :]                                  # (B, K, F)
+            path = bg[None, :, None, :] + alphas[None, None, :, None] * diff[:, :, None, :]
+            flat = tf.reshape(path, [-1, n_features])                             # (B*K*m, F)
+            with tf.GradientTape() as tape:
+                tape.watch(flat)
+                out = model(flat, training=False)[:, 0]
+            grads = tf.reshape(tape.gradient(out, flat), tf.shape(path))
+            attributions = tf.reduce_mean(tf.reduce_mean(grads, axis=2) * diff, axis=1)
+            return attributions, model(x, training=False)[:, 0]
+
+        self._fn = tf.function(attribute, input_signature=[tf.TensorSpec([None, n_features], tf.float32)])
+        self.baseline = float(np.mean(model(self.background, training=False).numpy()[:, 0]))
+
+    def __call__(self, x):
+        """(attributions (B, F), model outputs (B,)) for scaled float32 rows."""
+        attributions, outputs = self._fn(x)
+        return attributions.numpy(), outputs.numpy()
+
+
+def explainer_for(bundle):
+    """The bundle's explainer, built on first use (one per model version)."""
+    explainer = getattr(bundle, "explainer", None)
+    if explainer is None:
+        with _build_lock:
+            explainer = getattr(bundle, "explainer", None)
+            if explainer is None:
+                explainer = IntegratedGradients(bundle.model, background_sample(bundle))
+                bundle.explainer = explainer
+    return explainer
+
+
+def explain_rows(bundle, x, invert=False, top_k=None, deadline=None, chunk_rows=CHUNK_ROWS):
+    """
+    Per-row explanations for scaled rows `x`. `invert` flips the output
+    (colorectal serves 1 - p), so attributions keep pointing towards risk.
+    """
+    explainer = explainer_for(bundle)
+    parts = []
+    for start in range(0, len(x), chunk_rows):
+        if deadline is not None:
+            deadline.check("explain")
+        parts.append(explainer(x[start:start + chunk_rows]))
+    attributions = np.concatenate([a for a, _ in parts])
+    outputs = np.concatenate([o for _, o in parts])
+    baseline = explainer.baseline
+    if invert:
+        attributions, outputs, baseline = -attributions, 1.0 - outputs, 1.0 - baseline
+
+    columns = bundle.pipeline.columns
+    results = []
+    for row_attr, output in zip(attributions, outputs):
+        order = np.argsort(-np.abs(row_attr))
+        if top_k is not None:
+            order = order[:top_k]
+        results.append({
+            "probability": float(output),
+            "baseline_probability": baseline,
+            "attributions": [{"feature": columns[j], "attribution": float(row_attr[j])} for j in order],
+        })
+    return results
+
+
+def warm_up(bundle):
+    """Builds the explainer and traces it for a single row."""
+    explainer = explainer_for(bundle)
+    explainer(explainer.background[:1])
+
+
+# ---------------------------------------------------------
+# 🟦 CHECKED-IN BACKGROUND
+# ---------------------------------------------------------
+def build_config(model_key, version=None, size=BACKGROUND_SIZE, seed=SEED):
+    """Samples the background rows for one model and writes <model>.explain.json. Returns it."""
+    import joblib
+    import tensorflow as tf
+
+    import model_store
+    from model_config import MAPPING_PATHS, MODELS_INFO
+
+    spec = model_store.resolve(model_key, MODELS_INFO[model_key], MAPPING_PATHS.get(model_key), version)
+    bundle = model_store.load_bundle(
+        model_key, spec, lambda p: tf.keras.models.load_model(p, compile=False), joblib.load
+    )
+    rows = sample_rows(bundle, size, seed)
+    config = {
+        "model_key": model_key,
+        "model_version": spec["version"],
+        "source_sha256": inference.file_sha256(spec["model_path"]),
+        "created_at": time.time(),
+        "size": size,
+        "seed": seed,
+        "features": bundle.pipeline.columns,
+        # Encoded, not scaled: the bundle's scaler is applied at load
+        "rows": rows.tolist(),
+    }
+    path = config_path(spec["model_path"])
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+    print(f"✅ {model_key} ({spec['version']}): {len(rows)} background rows -> {path}")
+    return config
+
+
+def main(argv=None):
+    from model_config import MODELS_INFO
+
+    parser = argparse.ArgumentParser(description="Sample the /explain background rows for each model")
+    parser.add_argument("model_key", choices=sorted(MODELS_INFO) + ["all"])
+    parser.add_argument("--version", help="Model store version (default: active)")
+    args = parser.parse_args(argv)
+
+    keys = sorted(MODELS_INFO) if args.model_key == "all" else [args.model_key]
+    for key in keys:
+        build_config(key, args.version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Columnar feature encoding, one pipeline per model key.
+
+The same pipeline is used by /predict, bulk_score.py and the testing
+scripts, so encoding rules live in exactly one place:
+
+    pipeline = build("lung", mappings)          # mappings = contents of lung_mappings.json
+    x = pipeline.transform(df)                  # DataFrame | list[dict] | dict
+    x.shape == (len(df), len(pipeline.columns)) # float32, columns in model order
+
+Each column is encoded for the whole batch at once (pandas for DataFrames,
+one list comprehension per column for request dicts); a single dict takes a
+scalar fast path straight into the float32 row.
+
+pandas is only imported for DataFrame input: a request that never built a
+frame cannot hold one, so the server does not pay for importing it.
+"""
+import sys
+
+import numpy as np
+
+from model_config import MODELS_INFO
+
+
+class FeatureError(ValueError):
+    """Raised for missing or non-numeric input; the API turns it into a 400."""
+
+
+# ---------------------------------------------------------
+# 🟦 COLUMN ENCODERS
+# ---------------------------------------------------------
+class Numeric:
+    """float(raw.get(source, default)). Required columns must be present and not None/NaN."""
+
+    def __init__(self, source, default=0.0, required=False, aliases=()):
+        self.source = source
+        self.default = default
+        self.required = required
+        self.aliases = aliases
+
+    def _frame_column(self, df):
+        for name in (self.source,) + tuple(self.aliases):
+            if name in df.columns:
+                return df[name]
+        return None
+
+    def value(self, row, mappings, done):
+        if self.required:
+            v = row.get(self.source)
+            if v is None:
+                raise FeatureError(f"Missing feature: {self.source}")
+        else:
+            v = row.get(self.source, self.default)
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            raise FeatureError(f"Invalid numeric value for {self.source}")
+
+    def from_records(self, rows, mappings, done):
+        src, default = self.source, self.default
+        if self.required:
+            values = [r.get(src) for r in rows]
+            if any(v is None for v in values):
+                raise FeatureError(f"Missing feature: {src}")
+        else:
+            values = [r.get(src, default) for r in rows]
+        try:
+            return np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise FeatureError(f"Invalid numeric value for {src}")
+
+    def from_frame(self, df, mappings, done):
+        col = self._frame_column(df)
+        if col is None:
+            if self.required:
+                raise FeatureError(f"Missing feature: {self.source}")
+            return np.full(len(df), float(self.default))
+        import pandas as pd
+
+        try:
+            values = pd.to_numeric(col, errors="raise")
+        except (TypeError, ValueError):
+            raise FeatureError(f"Invalid numeric value for {self.source}")
+        if self.required:
+            if values.isna().any():
+                raise FeatureError(f"Missing feature: {self.source}")
+            return values.to_numpy(dtype=np.float64)
+        return values.fillna(self.default).to_numpy(dtype=np.float64)
+
+
+class Mapped:
+    """mappings[source].get(str(raw value), default): the JSON category maps."""
+
+    def __init__(self, source, default):
+        self.source = source
+        self.default = default
+
+    def value(self, row, mappings, done):
+        table = mappings.get(self.source)
+        if not table:
+            return self.default
+        # Convert raw_value to string because JSON keys are always strings
+        return table.get(str(row.get(self.source)), self.default)
+
+    def from_records(self, rows, mappings, done):
+        table = mappings.get(self.source)
+        if not table:
+            return np.full(len(rows), float(self.default))
+        src, default = self.source, self.default
+        # Convert raw values to str because JSON keys are always strings
+        return np.asarray([table.get(str(r.get(src)), default) for r in rows], dtype=np.float64)
+
+    def from_frame(self, df, mappings, done):
+        table = mappings.get(self.source)
+        if not table or self.source not in df.columns:
+            return np.full(len(df), float(self.default))
+        return df[self.source].astype(str).map(table).fillna(self.default).to_numpy(dtype=np.float64)
+
+
+class Flag:
+    """when_true if str(raw value) == equals else when_false (missing -> `missing`)."""
+
+    def __init__(self, source, equals, when_true, when_false, missing):
+        self.source = source
+        self.equals = equals
+        self.when_true = when_true
+        self.when_false = when_false
+        self.missing = missing
+
+    def value(self, row, mappings, done):
+        return self.when_true if str(row.get(self.source, self.missing)) == self.equals else self.when_false
+
+    def from_records(self, rows, mappings, done):
+        src, eq, missing = self.source, self.equals, self.missing
+        hits = np.asarray([str(r.get(src, missing)) == eq for r in rows], dtype=bool)
+        return np.where(hits, float(self.when_true), float(self.when_false))
+
+    def from_frame(self, df, mappings, done):
+        if self.source not in df.columns:
+            hit = str(self.missing) == self.equals
+            return np.full(len(df), float(self.when_true if hit else self.when_false))
+        hits = (df[self.source].astype(str) == self.equals).to_numpy()
+        return np.where(hits, float(self.when_true), float(self.when_false))
+
+
+class Product:
+    """Derived column: product of two already-encoded columns."""
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.depends_on = (left, right)
+
+    def value(self, row, mappings, done):
+        return done[self.left] * done[self.right]
+
+    def from_records(self, rows, mappings, done):
+        return done[self.left] * done[self.right]
+
+    def from_frame(self, df, mappings, done):
+        return done[self.left] * done[self.right]
+
+
+# ---------------------------------------------------------
+# 🟦 PIPELINES
+# ---------------------------------------------------------
+class FeaturePipeline:
+    def __init__(self, model_key, spec, mappings=None):
+        self.model_key = model_key
+        self.spec = spec                      # [(column name, encoder)] in model order
+        self.columns = [name for name, _ in spec]
+        self.mappings = mappings or {}
+        # Encoded columns that later encoders read back; the rest are dropped
+        # as soon as they are copied into the output.
+        self._keep = {dep for _, enc in spec for dep in getattr(enc, "depends_on", ())}
+        # Raw request fields this model reads (used to decide which models a payload applies to)
+        self.sources = {
+            name
+            for _, enc in spec
+            for name in ((getattr(enc, "source", None),) + tuple(getattr(enc, "aliases", ())))
+            if name
+        }
+        # One entry per input field: (field, every name it may arrive under)
+        self.inputs = [
+            (enc.source, (enc.source,) + tuple(getattr(enc, "aliases", ())))
+            for _, enc in spec
+            if getattr(enc, "source", None)
+        ]
+
+    def missing_inputs(self, row):
+        """Input fields absent (or null / empty) in a request dict; they would be encoded as defaults."""
+        return [
+            field for field, names in self.inputs
+            if all(row.get(name) in (None, "") for name in names)
+        ]
+
+    def transform(self, data, out=None):
+        """
+        DataFrame | list[dict] | dict -> float32 array of shape (n_rows, n_columns).
+        With `out` (a float32 array with at least n_rows rows, e.g. from a
+        BufferPool) the values are written into it and a view is returned.
+        """
+        if isinstance(data, dict):
+            return self._transform_one(data, out)
+        pd = sys.modules.get("pandas")
+        is_frame = pd is not None and isinstance(data, pd.DataFrame)
+        n = len(data)
+
+        out = np.empty((n, len(self.spec)), dtype=np.float32) if out is None else out[:n]
+        done = {}
+        for j, (name, encoder) in enumerate(self.spec):
+            if is_frame:
+                col = encoder.from_frame(data, self.mappings, done)
+            else:
+                col = encoder.from_records(data, self.mappings, done)
+            if name in self._keep:
+                done[name] = col
+            out[:, j] = col
+        return out
+
+    def _transform_one(self, row, out=None):
+        """Single request: plain Python floats, one write into the float32 row."""
+        done = {}
+        values = []
+        for name, encoder in self.spec:
+            v = encoder.value(row, self.mappings, done)
+            done[name] = v
+            values.append(v)
+        out = np.empty((1, len(self.spec)), dtype=np.float32) if out is None else out[:1]
+        out[0] = values
+        return out
+
+
+def _breast_spec():
+    # Dataset CSV headers use "concave points_*"; the API uses underscores
+    return [
+        (f, Numeric(f, required=True, aliases=(f.replace("concave_points", "concave points"),)))
+        for f in MODELS_INFO["breast"]["features"]
+    ]
+
+
+def _lung_spec():
+    # Order MUST match the training DataFrame columns
+    return [
+        ("age", Numeric("age")),
+        ("pack_years", Numeric("pack_years")),
+        ("gender", Mapped("gender", 0)),
+        ("radon_exposure", Mapped("radon_exposure", 0)),
+        ("asbestos_exposure", Mapped("asbestos_exposure", 0)),
+        ("secondhand_smoke_exposure", Mapped("secondhand_smoke_exposure", 0)),
+        ("copd_diagnosis", Mapped("copd_diagnosis", 0)),
+        ("alcohol_consumption", Mapped("alcohol_consumption", 0)),
+        ("family_history", Mapped("family_history", 1)),
+        ("cumulative_smoking", Product("age", "pack_years")),
+    ]
+
+
+def _colorectal_spec():
+    return [
+        ("Age", Numeric("Age")),
+        ("Gender", Mapped("Gender", 0)),
+        ("BMI", Numeric("BMI")),
+        ("Lifestyle", Mapped("Lifestyle", 2)),
+        ("Ethnicity", Mapped("Ethnicity", 4)),
+        # HISTORY INVERSION:
+        # Model treats 0 as Riskier (Raw 0.41) and 1 as Safer (Raw 0.45).
+        # We want "Yes" to be Riskier. So "Yes" must map to 0. "No" map to 1.
+        ("Family_History_CRC", Flag("Family_History_CRC", "Yes", 0, 1, missing="No")),
+        ("Pre-existing Conditions", Mapped("Pre-existing Conditions", 1)),
+        ("Carbohydrates (g)", Numeric("Carbohydrates (g)")),
+        ("Proteins (g)", Numeric("Proteins (g)")),
+        ("Fats (g)", Numeric("Fats (g)")),
+        ("Vitamin A (IU)", Numeric("Vitamin A (IU)")),
+        ("Vitamin C (mg)", Numeric("Vitamin C (mg)")),
+        ("Iron (mg)", Numeric("Iron (mg)")),
+    ]
+
+
+SPECS = {
+    "breast": _breast_spec,
+    "lung": _lung_spec,
+    "colorectal": _colorectal_spec,
+}
+
+
+def build(model_key, mappings=None):
+    if model_key not in SPECS:
+        raise FeatureError("Invalid model key")
+    return FeaturePipeline(model_key, SPECS[model_key](), mappings)
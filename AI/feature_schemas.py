@@ -0,0 +1,102 @@
+"""
+Typed request schemas, one per model key, generated from the FeaturePipeline
+spec (field names, required/optional, aliases) and the mapping files (known
+category values).
+
+    schema = build("lung", pipeline)           # once per model version, at load time
+    row = schema.validate_one(raw)             # dict with numeric fields already floats
+    rows = schema.validate_many(records)       # one pydantic-core pass for the whole batch
+
+Schemas are TypedDicts behind prebuilt TypeAdapters, so validation returns
+plain dicts the pipeline consumes directly. Unknown keys are dropped; unknown
+category values still pass and fall back to the pipeline's defaults, as before.
+Failures raise FeatureError with the same messages the pipeline used.
+"""
+from typing import Any, List
+
+from pydantic import AliasChoices, ConfigDict, Field, TypeAdapter, ValidationError
+from typing_extensions import Annotated, NotRequired, Required, TypedDict
+
+from feature_pipeline import Flag, FeatureError, Mapped, Numeric
+
+
+def _field(encoder, mappings):
+    """(annotation, required) for one encoder."""
+    if isinstance(encoder, Numeric):
+        extra = {}
+        if encoder.aliases:
+            extra["validation_alias"] = AliasChoices(encoder.source, *encoder.aliases)
+        if not encoder.required:
+            extra["description"] = f"Default {encoder.default}"
+        return Annotated[float, Field(**extra)], encoder.required
+
+    if isinstance(encoder, Mapped):
+        known = sorted((mappings.get(encoder.source) or {}).keys())
+        description = f"One of: {', '.join(known)}" if known else "Category"
+        return Annotated[Any, Field(description=description, json_schema_extra={"examples": known[:5]})], False
+
+    if isinstance(encoder, Flag):
+        return Annotated[Any, Field(description=f"'{encoder.equals}' or anything else")], False
+
+    return None, False
+
+
+class FeatureSchema:
+    def __init__(self, model_key, pipeline):
+        self.model_key = model_key
+        fields = {}
+        self.required = set()
+        for _, encoder in pipeline.spec:
+            source = getattr(encoder, "source", None)
+            if source is None or source in fields:
+                continue
+            annotation, required = _field(encoder, pipeline.mappings)
+            if annotation is not None:
+                fields[source] = Required[annotation] if required else NotRequired[annotation]
+                if required:
+                    self.required.add(source)
+
+        self.typed_dict = TypedDict(f"{model_key.capitalize()}Features", fields, total=False)
+        self.typed_dict.__pydantic_config__ = ConfigDict(extra="ignore")
+        self._one = TypeAdapter(self.typed_dict)
+        self._many = TypeAdapter(List[self.typed_dict])
+
+    def validate_one(self, raw):
+        try:
+            return self._one.validate_python(raw)
+        except ValidationError as e:
+            raise FeatureError(describe_errors(e.errors(include_url=False), self.required))
+
+    def validate_many(self, rows):
+        try:
+            return self._many.validate_python(rows)
+        except ValidationError as e:
+            raise FeatureError(describe_errors(e.errors(include_url=False), self.required, batch=True))
+
+    def json_schema(self):
+        return self._one.json_schema()
+
+
+MAX_REPORTED_ERRORS = 10
+
+
+def describe_errors(errors, required=(), batch=False):
+    """pydantic errors -> the pipeline's wording ("Missing feature: x; Invalid numeric value for y")."""
+    messages = []
+    for err in errors[:MAX_REPORTED_ERRORS]:
+        loc = list(err["loc"])
+        row = loc.pop(0) if batch and loc and isinstance(loc[0], int) else None
+        name = str(loc[0]) if loc else "features"
+        # Required fields sent as null read as missing, like the pipeline's check
+        if err["type"] == "missing" or (name in required and err.get("input", ...) is None):
+            msg = f"Missing feature: {name}"
+        else:
+            msg = f"Invalid numeric value for {name}"
+        messages.append(msg if row is None else f"row {row}: {msg}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        messages.append(f"... {len(errors) - MAX_REPORTED_ERRORS} more")
+    return "; ".join(messages)
+
+
+def build(model_key, pipeline):
+    return FeatureSchema(model_key, pipeline)
@@ -1,85 +1,97 @@
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
+"""
+Category maps (*_mappings.json) for the lung and colorectal models.
+
+    python generate_mappings.py            # rewrites a file only if its dataset changed
+    python generate_mappings.py --force
+
+Codes are the notebooks' LabelEncoder codes (categories in sorted order),
+taken straight from the categorical columns of the dataset cache
+(dataset_cache.py), so only the mapped columns are read.
+"""
+import argparse
 import json
 import os
 
-# ==========================================
-# 1. LUNG CANCER MAPPINGS (Hybrid Logic)
-# ==========================================
-print("🫁 Generating Lung Mappings...")
-df_lung = pd.read_csv(os.path.join(os.path.dirname(__file__), 'Dataset', 'lung_cancer_dataset.csv')) # <--- CHECK FILENAME
+import dataset_cache
+from inference import file_sha256
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STAMP_PATH = os.path.join(dataset_cache.CACHE_DIR, "mappings.json")
+
+# read_csv's default na_values: the notebooks read the CSVs with these as NaN,
+# which LabelEncoder then saw as the string 'nan' (e.g. "None" in crc_dataset.csv)
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+def read_raw(filename, columns=None):
+    return dataset_cache.load(os.path.join(ROOT, 'Dataset', filename), columns)
+
 
-lung_maps = {}
+def label_maps(df, cols):
+    """{column: {category: code}} with LabelEncoder's (sorted) codes, as python ints."""
+    maps = {}
+    for col in cols:
+        if col in df.columns:
+            # The category dictionary is all LabelEncoder needs: sort, then number.
+            # Missing values (NaN or a default NA string) become 'nan', as in the notebooks.
+            values = df[col].astype("category")
+            labels = {"nan" if str(c) in NA_STRINGS else str(c) for c in values.cat.categories}
+            if values.isna().any():
+                labels.add("nan")
 
-# A. The Manual Map (Ordinal) - EXACTLY AS YOU WROTE
-ord_mapping_radon = {'Low': 0, 'Medium': 1, 'High': 2}
-ord_mapping_alcohol = {'None': 0, 'Moderate': 1, 'Heavy': 2}
+            # Create map: {'Female': 0, 'Male': 1}
+            col_map = {label: code for code, label in enumerate(sorted(labels))}
+            maps[col] = col_map
+            print(f"   Encoded {col}: {col_map}")
+    return maps
 
-# Save these immediately
-lung_maps['radon_exposure'] = ord_mapping_radon
-lung_maps['alcohol_consumption'] = ord_mapping_alcohol
 
-# B. The Automatic Map (LabelEncoder) - EXACTLY AS YOU WROTE
-# We loop through object columns EXCLUDING the ones we just did manually
-# Note: In your code, you mapped them first, so they became numbers. 
+# ==========================================
+# 1. LUNG CANCER MAPPINGS (Hybrid Logic)
+# ==========================================
+# B. The Automatic Map (LabelEncoder) columns - EXACTLY AS YOU WROTE
+# We pick the columns EXCLUDING the ones done manually below
+# Note: In your code, you mapped them first, so they became numbers.
 # Here, we just pick the columns that need LabelEncoding.
-auto_cols = [
-    'gender', 
-    'asbestos_exposure', 
-    'secondhand_smoke_exposure', 
-    'copd_diagnosis', 
+LUNG_LABEL_COLUMNS = [
+    'gender',
+    'asbestos_exposure',
+    'secondhand_smoke_exposure',
+    'copd_diagnosis',
     'family_history',
     'lung_cancer' # Optional, if you want to save target map
 ]
 
-for col in auto_cols:
-    if col in df_lung.columns:
-        le = LabelEncoder()
-        le.fit(df_lung[col].astype(str))
-        
-        # Create map: {'Female': 0, 'Male': 1}
-        col_map = dict(zip(le.classes_, le.transform(le.classes_)))
-        
-        # Ensure python int format
-        col_map = {k: int(v) for k, v in col_map.items()}
-        lung_maps[col] = col_map
-        print(f"   Encoded {col}: {col_map}")
-
-# Save Lung JSON
-# Save Lung JSON
-lung_json_path = os.path.join(os.path.dirname(__file__), 'Lung Cancer', 'lung_mappings.json')
-with open(lung_json_path, 'w') as f:
-    json.dump(lung_maps, f, indent=4)
-print(f"✅ lung_mappings.json saved to {lung_json_path}")
+
+def lung_mappings(df_lung):
+    lung_maps = {}
+
+    # A. The Manual Map (Ordinal) - EXACTLY AS YOU WROTE
+    ord_mapping_radon = {'Low': 0, 'Medium': 1, 'High': 2}
+    ord_mapping_alcohol = {'None': 0, 'Moderate': 1, 'Heavy': 2}
+
+    # Save these immediately
+    lung_maps['radon_exposure'] = ord_mapping_radon
+    lung_maps['alcohol_consumption'] = ord_mapping_alcohol
+
+    lung_maps.update(label_maps(df_lung, LUNG_LABEL_COLUMNS))
+    return lung_maps
 
 
 # ==========================================
 # 2. COLORECTAL MAPPINGS (Pure LabelEncoder)
 # ==========================================
-print("\n🍎 Generating Colorectal Mappings...")
-df_colon = pd.read_csv(os.path.join(os.path.dirname(__file__), 'Dataset', 'crc_dataset.csv')) # <--- CHECK FILENAME
-
-colon_maps = {}
-
-colon_cols = [
-    'Gender', 'Lifestyle', 'Ethnicity', 
+COLON_LABEL_COLUMNS = [
+    'Gender', 'Lifestyle', 'Ethnicity',
     'Family_History_CRC', 'Pre-existing Conditions'
 ]
 
-for col in colon_cols:
-    if col in df_colon.columns:
-        le = LabelEncoder()
-        le.fit(df_colon[col].astype(str))
-        col_map = dict(zip(le.classes_, le.transform(le.classes_)))
-        col_map = {k: int(v) for k, v in col_map.items()}
-        colon_maps[col] = col_map
-        print(f"   Encoded {col}: {col_map}")
 
-# Save Colon JSON
-colon_json_path = os.path.join(os.path.dirname(__file__), 'Colorectal Cancer', 'colon_mappings.json')
-with open(colon_json_path, 'w') as f:
-    json.dump(colon_maps, f, indent=4)
-print(f"✅ colon_mappings.json saved to {colon_json_path}")
+def colon_mappings(df_colon):
+    return label_maps(df_colon, COLON_LABEL_COLUMNS)
 
 
 # ==========================================
@@ -87,11 +99,86 @@ print(f"✅ colon_mappings.json saved to {colon_json_path}")
 # ==========================================
 # You don't need input mappings for breast, but we can save the target info
 # just for documentation.
-breast_maps = {
-    "diagnosis": {"B": 0, "M": 1}
+def breast_mappings(df=None):
+    return {
+        "diagnosis": {"B": 0, "M": 1}
+    }
+
+
+# model key -> (dataset file, columns read, builder); used by train.py for new model versions
+BUILDERS = {
+    "lung": ('lung_cancer_dataset.csv', LUNG_LABEL_COLUMNS, lung_mappings),
+    "colorectal": ('crc_dataset.csv', COLON_LABEL_COLUMNS, colon_mappings),
+    "breast": (None, None, breast_mappings),
 }
-with open('breast_mappings.json', 'w') as f:
-    json.dump(breast_maps, f, indent=4)
-print("\n✅ breast_mappings.json saved.")
 
-print("\n👉 ACTION: Move 'lung_mappings.json' and 'colon_mappings.json' to your Backend folder.")
\ No newline at end of file
+OUTPUTS = {
+    "lung": os.path.join(ROOT, 'Lung Cancer', 'lung_mappings.json'),
+    "colorectal": os.path.join(ROOT, 'Colorectal Cancer', 'colon_mappings.json'),
+}
+
+
+def build(model_key):
+    filename, columns, builder = BUILDERS[model_key]
+    return builder(read_raw(filename, columns) if filename else None)
+
+
+# ==========================================
+# REGENERATE ONLY WHEN INPUTS CHANGE
+# ==========================================
+def input_hash(model_key):
+    """Dataset sha256 + this script's sha256: either changing means the maps may change."""
+    filename = BUILDERS[model_key][0]
+    return f"{dataset_cache.source_hash(os.path.join(ROOT, 'Dataset', filename))}:{file_sha256(__file__)}"
+
+
+def _read_stamps():
+    try:
+        with open(STAMP_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def generate(model_key, force=False):
+    """Writes OUTPUTS[model_key] unless it is already built from the current inputs; True if written."""
+    path = OUTPUTS[model_key]
+    stamps = _read_stamps()
+    current = input_hash(model_key)
+    if not force and os.path.exists(path) and stamps.get(model_key) == current:
+        print(f"✅ {os.path.basename(path)} is up to date")
+        return False
+
+    maps = build(model_key)
+    with open(path, 'w') as f:
+        json.dump(maps, f, indent=4)
+    print(f"✅ {os.path.basename(path)} saved to {path}")
+
+    stamps[model_key] = current
+    os.makedirs(os.path.dirname(STAMP_PATH), exist_ok=True)
+    with open(STAMP_PATH, 'w') as f:
+        json.dump(stamps, f, indent=2)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate the *_mappings.json category maps")
+    parser.add_argument("--force", action="store_true", help="Rewrite even if the datasets did not change")
+    args = parser.parse_args(argv)
+
+    print("🫁 Generating Lung Mappings...")
+    generate("lung", args.force)
+
+    print("\n🍎 Generating Colorectal Mappings...")
+    generate("colorectal", args.force)
+
+    if args.force or not os.path.exists('breast_mappings.json'):
+        with open('breast_mappings.json', 'w') as f:
+            json.dump(breast_mappings(), f, indent=4)
+        print("\n✅ breast_mappings.json saved.")
+
+    print("\n👉 ACTION: Move 'lung_mappings.json' and 'colon_mappings.json' to your Backend folder.")
+
+
+if __name__ == "__main__":
+    main()
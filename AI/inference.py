@@ -0,0 +1,183 @@
+"""
+Float32 numeric path: pooled input buffers, in-place scaling and a traced
+model function.
+
+    buf = bundle.buffers.acquire(n)            # float32 (n, n_features), reused
+    x = bundle.pipeline.transform(rows, out=buf)
+    bundle.scaler_inplace(x)                   # (x - mean_) / scale_, written into x
+    probs = bundle.runner(x)                   # one traced call, no dtype cast
+    bundle.buffers.release(buf)
+
+Compared with scaler.transform + model.predict this removes the float64
+feature array, the scaler's output copy, Keras' float32 cast and predict()'s
+per-call setup.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# Quantized variants written by quantize.py next to the float model
+VARIANTS = ("float16", "int8")
+
+
+class BufferPool:
+    """Reusable float32 input buffers, bucketed by power-of-two row capacity."""
+
+    def __init__(self, n_features, max_per_bucket=8):
+        self.n_features = n_features
+        self.max_per_bucket = max_per_bucket
+        self._free = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _capacity(n):
+        return 1 << max(0, int(n) - 1).bit_length()
+
+    def acquire(self, n):
+        """Returns a (n, n_features) float32 view of a pooled buffer."""
+        cap = self._capacity(n)
+        with self._lock:
+            bucket = self._free.get(cap)
+            base = bucket.pop() if bucket else None
+        if base is None:
+            base = np.empty((cap, self.n_features), dtype=np.float32)
+        return base[:n]
+
+    def release(self, view):
+        base = view.base if view.base is not None else view
+        cap = base.shape[0]
+        with self._lock:
+            bucket = self._free.setdefault(cap, [])
+            if len(bucket) < self.max_per_bucket:
+                bucket.append(base)
+
+
+class InplaceScaler:
+    """
+    Applies a fitted StandardScaler / MinMaxScaler to a float32 array in
+    place. Other scalers fall back to scaler.transform (one copy).
+    """
+
+    def __init__(self, scaler):
+        self.scaler = scaler
+        self._mode = None
+        if hasattr(scaler, "mean_") or hasattr(scaler, "with_mean"):
+            # StandardScaler: mean_/scale_ are None when with_mean/with_std is off
+            self._mode = "standard"
+            mean = getattr(scaler, "mean_", None) if getattr(scaler, "with_mean", True) else None
+            scale = getattr(scaler, "scale_", None) if getattr(scaler, "with_std", True) else None
+            self._sub = None if mean is None else np.asarray(mean, dtype=np.float32)
+            self._div = None if scale is None else np.asarray(scale, dtype=np.float32)
+        elif hasattr(scaler, "min_") and hasattr(scaler, "scale_") and not getattr(scaler, "clip", False):
+            self._mode = "minmax"
+            self._mul = np.asarray(scaler.scale_, dtype=np.float32)
+            self._add = np.asarray(scaler.min_, dtype=np.float32)
+
+    def __call__(self, x):
+        if self._mode == "standard":
+            if self._sub is not None:
+                np.subtract(x, self._sub, out=x)
+            if self._div is not None:
+                np.divide(x, self._div, out=x)
+            return x
+        if self._mode == "minmax":
+            np.multiply(x, self._mul, out=x)
+            np.add(x, self._add, out=x)
+            return x
+        x[...] = self.scaler.transform(x)
+        return x
+
+
+class KerasRunner:
+    """
+    model(x) traced once for float32 (None, n_features) inputs. Returns the
+    first output column as a 1-D float32 array.
+    """
+
+    def __init__(self, model, n_features):
+        import tensorflow as tf
+
+        self.model = model
+        self.n_features = n_features
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, n_features], tf.float32)],
+        )
+
+    def __call__(self, x):
+        return self._fn(x).numpy().reshape(len(x), -1)[:, 0]
+
+
+class TFLiteRunner:
+    """
+    Same interface as KerasRunner for a quantized .tflite variant. The
+    interpreter is not thread-safe, so calls are serialized; it is only
+    re-allocated when the batch size changes.
+    """
+
+    def __init__(self, path, n_features, num_threads=None):
+        import tensorflow as tf
+
+        self.path = path
+        self.n_features = n_features
+        self._interp = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self._in = self._interp.get_input_details()[0]["index"]
+        self._out = self._interp.get_output_details()[0]["index"]
+        self._rows = None
+        self._lock = threading.Lock()
+
+    def __call__(self, x):
+        n = len(x)
+        with self._lock:
+            if n != self._rows:
+                self._interp.resize_tensor_input(self._in, [n, self.n_features])
+                self._interp.allocate_tensors()
+                self._rows = n
+            self._interp.set_tensor(self._in, x)
+            self._interp.invoke()
+            return self._interp.get_tensor(self._out).reshape(n, -1)[:, 0].copy()
+
+
+def variant_paths(model_path, variant):
+    """(<model>.<variant>.tflite, <model>.<variant>.json) next to the float model."""
+    stem = os.path.splitext(model_path)[0]
+    return f"{stem}.{variant}.tflite", f"{stem}.{variant}.json"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_variant_report(model_path, variant, risk_thresholds=None):
+    """
+    The quantize.py report for `variant`, or raises ValueError if the variant
+    is missing, was built from a different model file, failed its gates, or
+    (given the bundle's `risk_thresholds`) was gated under other cut-offs.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"unknown variant {variant!r} (expected one of {', '.join(VARIANTS)})")
+    tflite_path, report_path = variant_paths(model_path, variant)
+    if not (os.path.isfile(tflite_path) and os.path.isfile(report_path)):
+        raise ValueError(f"no {variant} variant next to {model_path}, run quantize.py first")
+    with open(report_path, "r") as f:
+        report = json.load(f)
+    # Content hash rather than mtime, so checked-in variants survive a fresh clone
+    if report.get("source_sha256") != file_sha256(model_path):
+        raise ValueError(f"{variant} variant was built from a different {os.path.basename(model_path)}")
+    if not report.get("passed"):
+        raise ValueError(f"{variant} variant did not pass its accuracy gates")
+    # The risk_level gate only holds for the cut-offs it was measured with
+    if risk_thresholds is not None and not risk_thresholds.matches(report.get("cutoffs")):
+        raise ValueError(f"{variant} variant was checked under other risk cut-offs, run quantize.py again")
+    return report
+
+
+def n_features_of(scaler, pipeline):
+    return int(getattr(scaler, "n_features_in_", len(pipeline.columns)))
@@ -0,0 +1,68 @@
+"""
+Model artifact paths and feature lists, shared by the server and the offline tools.
+"""
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Define paths to your NEW mapping files
+MAPPING_PATHS = {
+    "colorectal": os.path.join(ROOT, "Colorectal Cancer/colon_mappings.json"),
+    "lung": os.path.join(ROOT, "Lung Cancer/lung_mappings.json"),
+}
+
+MODELS_INFO = {
+    "breast": {
+        "model_path": os.path.join(ROOT, "Breast Cancer/Breast_Cancer.keras"),
+        "scaler_path": os.path.join(ROOT, "Breast Cancer/breast_cancer_scaler.pkl"),
+        "features": [
+            "radius_mean", "texture_mean", "perimeter_mean", "area_mean",
+            "smoothness_mean", "compactness_mean", "concavity_mean",
+            "concave_points_mean", "symmetry_mean", "fractal_dimension_mean",
+            "radius_se", "texture_se", "perimeter_se", "area_se",
+            "smoothness_se", "compactness_se", "concavity_se",
+            "concave_points_se", "symmetry_se", "fractal_dimension_se",
+            "radius_worst", "texture_worst", "perimeter_worst", "area_worst",
+            "smoothness_worst", "compactness_worst", "concavity_worst",
+            "concave_points_worst", "symmetry_worst", "fractal_dimension_worst"
+        ]
+    },
+    "lung": {
+        "model_path": os.path.join(ROOT, "Lung Cancer/Lung_Cancer.keras"),
+        "scaler_path": os.path.join(ROOT, "Lung Cancer/lung_scaler.pkl"),
+        "features": [] 
+    },
+    "colorectal": {
+        "model_path": os.path.join(ROOT, "Colorectal Cancer/colon_risk_model.keras"),
+        "scaler_path": os.path.join(ROOT, "Colorectal Cancer/colon_scaler.pkl"),
+        "features": [] 
+    }
+}
+
+# Training data per model key: CSV path and target column -> {raw label: 0/1}
+# (None when the column is already 0/1)
+DATASETS = {
+    "breast": {
+        "path": os.path.join(ROOT, "Dataset/Breast cancer data.csv"),
+        "target": "diagnosis",
+        "labels": {"M": 1, "B": 0},
+    },
+    "lung": {
+        "path": os.path.join(ROOT, "Dataset/lung_cancer_dataset.csv"),
+        "target": "lung_cancer",
+        "labels": {"Yes": 1, "No": 0},
+    },
+    "colorectal": {
+        "path": os.path.join(ROOT, "Dataset/crc_dataset.csv"),
+        "target": "CRC_Risk",
+        "labels": None,
+    },
+}
+
+# Same split as the training notebooks: 80/20, stratified, random_state=42
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+# Default risk_level cut-offs on the served probability (high >= 0.7, medium >= 0.4),
+# used for a model without a thresholds.py config next to it
+HIGH_RISK, MEDIUM_RISK = 0.7, 0.4
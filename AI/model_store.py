@@ -0,0 +1,336 @@
+"""
+Versioned model store.
+
+Layout (MODEL_STORE_DIR, default AI/model_store):
+
+    <model_key>/
+        CURRENT                  # optional: name of the active version
+        <version>/
+            manifest.json        # {"model": "model.keras", "scaler": "scaler.pkl", "mappings": "mappings.json", ...}
+            model.keras
+            scaler.pkl
+            mappings.json        # optional
+            model.thresholds.json  # optional: risk cut-offs from thresholds.py
+            model.cascade.json     # optional: pre-screen from cascade.py
+            model.explain.json     # optional: /explain background rows from explain.py
+
+Without CURRENT the highest version (natural sort) is active. A model key with
+no versions in the store falls back to the legacy paths in MODELS_INFO /
+MAPPING_PATHS, versioned by the model file's fingerprint.
+
+Publish a new version from the command line:
+    python model_store.py publish lung --model "Lung Cancer/Lung_Cancer.keras" \\
+        --scaler "Lung Cancer/lung_scaler.pkl" --mappings "Lung Cancer/lung_mappings.json" --activate
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+import cascade
+import explain
+import feature_pipeline
+import feature_schemas
+import inference
+import thresholds
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.environ.get("MODEL_STORE_DIR", os.path.join(ROOT, "model_store"))
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+
+
+class ModelBundle:
+    """Everything one model version needs to serve a request, swapped in as a unit."""
+
+    def __init__(self, key, version, model, scaler, mappings, manifest, source, load_seconds,
+                 variant=None, variant_path=None, variant_report=None, risk_thresholds=None,
+                 prescreen=None, model_path=None):
+        self.key = key
+        self.version = version
+        # Where the model file was loaded from; per-model configs sit next to it
+        self.model_path = model_path
+        self.model = model
+        self.scaler = scaler
+        self.mappings = mappings
+        self.pipeline = feature_pipeline.build(key, mappings)
+        # Request validator for this version's fields and categories, compiled once here
+        self.schema = feature_schemas.build(key, self.pipeline)
+        # Float32 serving path (see inference.py)
+        n_features = inference.n_features_of(scaler, self.pipeline)
+        self.buffers = inference.BufferPool(n_features)
+        self.scaler_inplace = inference.InplaceScaler(scaler)
+        # A quantized variant (quantize.py) replaces the runner only; the
+        # float model stays loaded as the reference
+        self.variant = variant or "float32"
+        self.variant_report = variant_report
+        if variant:
+            self.runner = inference.TFLiteRunner(variant_path, n_features)
+        else:
+            self.runner = inference.KerasRunner(model, n_features)
+        # risk_level cut-offs (thresholds.py); HIGH_RISK / MEDIUM_RISK without a config
+        self.thresholds = risk_thresholds or thresholds.DEFAULT
+        # Optional pre-screen stage (cascade.py) in front of the runner
+        self.cascade = prescreen
+        self.manifest = manifest
+        self.source = source
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.weights_bytes = weights_nbytes(model)
+
+    @property
+    def cache_tag(self):
+        """Everything besides the input that decides predict()'s output, for prediction cache keys."""
+        tag = f"{self.version}:{self.variant}"
+        if self.cascade is not None:
+            tag += f":cascade[{self.cascade.low:.6g},{self.cascade.high:.6g}]"
+        return tag
+
+    def predict(self, x):
+        """
+        Served probabilities (float64) for scaled float32 rows. With a cascade
+        the pre-screen answers what it can and only the rest reach the runner.
+        """
+        if self.cascade is None:
+            return self._served(self.runner(x))
+        probs, escalate = self.cascade.split(x)
+        if escalate.all():
+            return self._served(self.runner(x))
+        if escalate.any():
+            probs[escalate] = self._served(self.runner(x[escalate]))
+        return probs
+
+    def _served(self, raw):
+        probs = raw.astype(np.float64)
+        # Colorectal Inversion Logic
+        return 1.0 - probs if self.key == "colorectal" else probs
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "variant": self.variant,
+            "thresholds": self.thresholds.describe(),
+            "cascade": self.cascade.describe() if self.cascade is not None else None,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3),
+            "weights_bytes": self.weights_bytes,
+        }
+
+
+def weights_nbytes(model):
+    """Size of the model's weight tensors, or None if the model does not expose them."""
+    get_weights = getattr(model, "get_weights", None)
+    if get_weights is None:
+        return None
+    return int(sum(w.nbytes for w in get_weights()))
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def file_version(path):
+    """Cheap fingerprint of a model file; changes whenever the file is replaced."""
+    st = os.stat(path)
+    return f"{int(st.st_mtime)}-{st.st_size}"
+
+
+def list_versions(key, store_dir=STORE_DIR):
+    key_dir = os.path.join(store_dir, key)
+    if not os.path.isdir(key_dir):
+        return []
+    versions = [
+        name for name in os.listdir(key_dir)
+        if os.path.isfile(os.path.join(key_dir, name, MANIFEST))
+    ]
+    return sorted(versions, key=_natural_key)
+
+
+def active_version(key, store_dir=STORE_DIR):
+    """Version named in CURRENT, else the highest published version, else None."""
+    pointer = os.path.join(store_dir, key, CURRENT)
+    if os.path.isfile(pointer):
+        with open(pointer, "r") as f:
+            name = f.read().strip()
+        if name:
+            return name
+    versions = list_versions(key, store_dir)
+    return versions[-1] if versions else None
+
+
+def resolve(key, legacy_info, legacy_mappings_path=None, version=None, store_dir=STORE_DIR):
+    """
+    Returns the file spec for `version` (or the active one):
+    {"version", "model_path", "scaler_path", "mappings_path", "manifest", "source"}
+    """
+    version = version or active_version(key, store_dir)
+
+    if version is None:
+        if not os.path.exists(legacy_info["model_path"]):
+            raise FileNotFoundError(legacy_info["model_path"])
+        return {
+            "version": f"legacy-{file_version(legacy_info['model_path'])}",
+            "model_path": legacy_info["model_path"],
+            "scaler_path": legacy_info["scaler_path"],
+            "mappings_path": legacy_mappings_path,
+            "manifest": {},
+            "source": "legacy",
+        }
+
+    version_dir = os.path.join(store_dir, key, version)
+    manifest_path = os.path.join(version_dir, MANIFEST)
+    if not os.path.isfile(manifest_path):
+        raise FileNotFoundError(f"No manifest for {key} version {version}: {manifest_path}")
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    mappings = manifest.get("mappings")
+    return {
+        "version": version,
+        "model_path": os.path.join(version_dir, manifest["model"]),
+        "scaler_path": os.path.join(version_dir, manifest["scaler"]),
+        "mappings_path": os.path.join(version_dir, mappings) if mappings else legacy_mappings_path,
+        "manifest": manifest,
+        "source": "store",
+    }
+
+
+def load_bundle(key, spec, load_model, load_scaler, variant=None, with_cascade=False):
+    """
+    Loads model, scaler and mappings for a resolved spec. `variant` ("int8",
+    "float16") serves the quantized model built by quantize.py instead; an
+    unusable variant falls back to float32 with a warning. `with_cascade`
+    puts the cascade.py pre-screen in front of it (if one was fitted for
+    this model file). Raises on any other failure.
+    """
+    start = time.perf_counter()
+    risk_thresholds = thresholds.load(spec["model_path"])
+    variant_path = variant_report = None
+    if variant and variant != "float32":
+        try:
+            variant_report = inference.load_variant_report(spec["model_path"], variant, risk_thresholds)
+            variant_path = inference.variant_paths(spec["model_path"], variant)[0]
+        except ValueError as e:
+            print(f"   ⚠️ {key}: not using {variant} variant ({e}), serving float32")
+            variant = None
+    else:
+        variant = None
+
+    model = load_model(spec["model_path"])
+    scaler = load_scaler(spec["scaler_path"])
+
+    mappings = {}
+    if spec["mappings_path"] and os.path.exists(spec["mappings_path"]):
+        with open(spec["mappings_path"], "r") as f:
+            mappings = json.load(f)
+
+    return ModelBundle(
+        key=key,
+        version=spec["version"],
+        model=model,
+        scaler=scaler,
+        mappings=mappings,
+        manifest=spec["manifest"],
+        source=spec["source"],
+        load_seconds=time.perf_counter() - start,
+        variant=variant,
+        variant_path=variant_path,
+        variant_report=variant_report,
+        risk_thresholds=risk_thresholds,
+        prescreen=cascade.load(spec["model_path"], risk_thresholds) if with_cascade else None,
+        model_path=spec["model_path"],
+    )
+
+
+def publish(key, model_path, scaler_path, mappings_path=None, version=None,
+            activate=False, extra=None, store_dir=STORE_DIR):
+    """Copies artifacts into <store>/<key>/<version>/ and writes the manifest."""
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(store_dir, key, version)
+    if os.path.exists(version_dir):
+        raise FileExistsError(f"{key} version {version} already exists")
+    os.makedirs(version_dir)
+
+    manifest = {"model_key": key, "version": version, "created_at": time.time()}
+    for field, src in (("model", model_path), ("scaler", scaler_path), ("mappings", mappings_path)):
+        if src:
+            name = field + os.path.splitext(src)[1]
+            shutil.copy2(src, os.path.join(version_dir, name))
+            manifest[field] = name
+    # Cut-offs, pre-screen and /explain background built for this exact model file travel with it
+    for config_path in (thresholds.config_path, cascade.config_path, explain.config_path):
+        if os.path.isfile(config_path(model_path)):
+            shutil.copy2(config_path(model_path), config_path(os.path.join(version_dir, manifest["model"])))
+    # So are the quantize.py variants (.tflite + report); load_bundle looks for them next to the model
+    for variant in inference.VARIANTS:
+        sources = inference.variant_paths(model_path, variant)
+        if all(os.path.isfile(src) for src in sources):
+            targets = inference.variant_paths(os.path.join(version_dir, manifest["model"]), variant)
+            for src, dst in zip(sources, targets):
+                shutil.copy2(src, dst)
+            manifest.setdefault("variants", []).append(variant)
+    manifest.update(extra or {})
+
+    with open(os.path.join(version_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    if activate:
+        set_active(key, version, store_dir)
+    return version_dir
+
+
+def set_active(key, version, store_dir=STORE_DIR):
+    """Atomically repoints CURRENT (write temp file + rename)."""
+    if version not in list_versions(key, store_dir):
+        raise FileNotFoundError(f"{key} has no version {version}")
+    pointer = os.path.join(store_dir, key, CURRENT)
+    tmp = pointer + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, pointer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the versioned model store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_pub = sub.add_parser("publish", help="Copy artifacts in as a new version")
+    p_pub.add_argument("model_key")
+    p_pub.add_argument("--model", required=True)
+    p_pub.add_argument("--scaler", required=True)
+    p_pub.add_argument("--mappings")
+    p_pub.add_argument("--version")
+    p_pub.add_argument("--activate", action="store_true")
+
+    p_act = sub.add_parser("activate", help="Point CURRENT at an existing version")
+    p_act.add_argument("model_key")
+    p_act.add_argument("version")
+
+    p_ls = sub.add_parser("list", help="Show versions per model")
+    p_ls.add_argument("model_key", nargs="?")
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "publish":
+        path = publish(args.model_key, args.model, args.scaler, args.mappings, args.version, args.activate)
+        print(f"✅ Published {args.model_key} -> {path}")
+    elif args.cmd == "activate":
+        set_active(args.model_key, args.version)
+        print(f"✅ {args.model_key} now points at {args.version}")
+    elif args.cmd == "list":
+        keys = [args.model_key] if args.model_key else sorted(
+            d for d in os.listdir(STORE_DIR) if os.path.isdir(os.path.join(STORE_DIR, d))
+        ) if os.path.isdir(STORE_DIR) else []
+        for key in keys:
+            active = active_version(key)
+            for v in list_versions(key):
+                print(f"{key:<12} {v} {'(active)' if v == active else ''}")
+
+
+if __name__ == "__main__":
+    main()
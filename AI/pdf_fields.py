@@ -0,0 +1,189 @@
+"""
+Structured fast path for /extract-pdf: AcroForm fields and key/value table
+rows, indexed once per document so every schema field is a dict lookup.
+
+    index = build_index(reader, text)
+    index.number(["Age", "Patient Age"])            # 54.0 or None
+    index.category(["Gender", "Sex"], {"Male": "Male", "F": "Female"})
+
+Sources, in order of precedence:
+
+    form    AcroForm fields (reader.get_fields()); names are normalized, so
+            "packYears", "pack_years" and "Pack Years" are the same key
+    table   one entry per text line: "Key: value", "Key | value", tab or
+            multi-space columns, or "Key 13.5 g/dL 12.0 - 15.5" (key = the
+            words before the first number)
+
+Numbers come from the first number of the value cell, so a reference range
+after the value is never picked up (fuzzy_extract takes the last number on
+the line). Lookups that miss return None and the caller falls back to the
+fuzzy text scan for that field only. FieldStats counts which path answered
+each field, for /metrics.
+"""
+import re
+import threading
+
+_NUMBER = re.compile(r"[-+]?\d*\.\d+|[-+]?\d+")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_SEPARATOR = re.compile(r"\s*(?::|\||\t|\s{2,})\s*")
+# Words before the value on a separator-less line ("Radon exposure High")
+MAX_KEY_WORDS = 4
+MAX_VALUE_WORDS = 3
+
+SOURCES = ("form", "table", "fuzzy", "missing")
+
+
+def normalize(name):
+    """'Pack_Years', 'packYears', 'PACK YEARS:' -> 'pack years'."""
+    return _NON_ALNUM.sub(" ", _CAMEL.sub(" ", str(name)).lower()).strip()
+
+
+def first_number(value):
+    match = _NUMBER.search(str(value))
+    return float(match.group()) if match else None
+
+
+def _form_value(value):
+    value = getattr(value, "get_object", lambda: value)()
+    if isinstance(value, list):
+        value = " ".join(str(v) for v in value)
+    value = str(value)
+    # Check boxes / radio buttons hold names such as /Yes and /Off
+    if value.startswith("/"):
+        value = {"/Off": "No", "/On": "Yes"}.get(value, value[1:])
+    return value.strip()
+
+
+def with_partial_keys(entries):
+    """
+    Adds every leading and trailing word run of a multi-word key ("radon
+    exposure" also answers "radon" and "exposure", "patient age" answers
+    "age"), below the full keys; the first entry to claim a partial key keeps it.
+    """
+    out = dict(entries)
+    partial = {}
+    for key, value in entries.items():
+        words = key.split()
+        for k in range(1, min(len(words), MAX_KEY_WORDS)):
+            partial.setdefault(" ".join(words[k:]), value)
+            partial.setdefault(" ".join(words[:k]), value)
+    for key, value in partial.items():
+        out.setdefault(key, value)
+    return out
+
+
+def form_fields(reader):
+    """{normalized field name: value} of the filled AcroForm fields, {} without a form."""
+    try:
+        fields = reader.get_fields() or {}
+    except Exception:
+        return {}
+    out = {}
+    for name, field in fields.items():
+        value = field.get("/V") if hasattr(field, "get") else None
+        if value in (None, ""):
+            continue
+        value = _form_value(value)
+        if value:
+            # Fully qualified names ("patient.age") are also indexed by their last part
+            out.setdefault(normalize(name), value)
+            out.setdefault(normalize(str(name).rsplit(".", 1)[-1]), value)
+    return with_partial_keys(out)
+
+
+def _line_entries(line):
+    """(key, value) pairs one report line contributes to the table index."""
+    line = line.strip()
+    if not line:
+        return []
+    parts = _SEPARATOR.split(line, maxsplit=1)
+    if len(parts) == 2 and parts[0] and parts[1]:
+        return [(normalize(parts[0]), parts[1])]
+
+    words = line.split()
+    for i, word in enumerate(words[:MAX_KEY_WORDS + 1]):
+        if _NUMBER.match(word):
+            # "Hemoglobin 13.5 g/dL 12.0 - 15.5": the key is everything before the first number
+            return [(normalize(" ".join(words[:i])), " ".join(words[i:]))] if i else []
+    if len(words) - 1 > MAX_KEY_WORDS + MAX_VALUE_WORDS:
+        return []
+    # "Radon exposure High": every short prefix is a candidate key for the rest
+    return [(normalize(" ".join(words[:k])), " ".join(words[k:]))
+            for k in range(1, min(MAX_KEY_WORDS, len(words) - 1) + 1)
+            if len(words) - k <= MAX_VALUE_WORDS]
+
+
+def table_index(text):
+    """
+    {normalized key: raw value} over the document's lines; the first
+    occurrence of a key wins. Partial keys come from with_partial_keys.
+    """
+    index = {}
+    for line in text.split("\n"):
+        for key, value in _line_entries(line):
+            if key:
+                index.setdefault(key, value)
+    return with_partial_keys(index)
+
+
+class FieldIndex:
+    def __init__(self, form=None, table=None):
+        self.form = form or {}
+        self.table = table or {}
+
+    def _values(self, keys):
+        """(raw value, source) for every alias present, form before table."""
+        for source, entries in (("form", self.form), ("table", self.table)):
+            for key in keys:
+                value = entries.get(normalize(key))
+                if value is not None:
+                    yield value, source
+
+    def number(self, keys):
+        """(number, source) or (None, None)."""
+        for value, source in self._values(keys):
+            number = first_number(value)
+            if number is not None:
+                return number, source
+        return None, None
+
+    def category(self, keys, options_map):
+        """(mapped option, source) for the first alias whose value names an option, or (None, None)."""
+        for value, source in self._values(keys):
+            value = value.lower()
+            for option_text, return_val in options_map.items():
+                # Same word-boundary rule as fuzzy_extract_category
+                pattern = r"(?<!\w)" + re.escape(option_text.lower()) + r"(?!\w)"
+                if re.search(pattern, value):
+                    return return_val, source
+        return None, None
+
+
+def build_index(reader, text):
+    return FieldIndex(form_fields(reader) if reader is not None else {}, table_index(text))
+
+
+class FieldStats:
+    """Which path answered each extracted field (form / table / fuzzy / missing); thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.fields = {s: 0 for s in SOURCES}
+
+    def record(self, sources):
+        with self._lock:
+            self.documents += 1
+            for source in sources:
+                self.fields[source] = self.fields.get(source, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.fields.values())
+            fast = self.fields["form"] + self.fields["table"]
+            return {
+                "documents": self.documents,
+                "fields": dict(self.fields),
+                "fast_path_hit_rate": fast / total if total else None,
+            }
@@ -0,0 +1,163 @@
+"""
+First-page triage for /extract-pdf uploads.
+
+Before any page-by-page text extraction or fuzzy matching, the document's
+metadata and its first PDF_TRIAGE_PAGES pages (default 2) are inspected:
+
+    report?      valid_keywords found in metadata + first pages (at least
+                 PDF_TRIAGE_MIN_KEYWORDS, default 2)
+    text layer   "text" when the first pages have extractable text,
+                 "image_only" when they carry only images (a scan that
+                 would need OCR), "empty" when they carry neither
+    fields       which model's fields the first pages mention (lung,
+                 colorectal, breast), to flag an upload sent to the wrong model
+
+and the upload gets one decision:
+
+    extract             continue with the full extraction
+    reject_unreadable   pypdf could not open it
+    reject_image_only   no text layer; this server has no OCR, so the client
+                        is told to re-upload a text PDF or enter the values
+    reject_not_report   too few report keywords (or nothing on the first pages at all)
+
+The first pages' text is handed back to the caller so it is not extracted
+twice. Counters per decision are kept for /metrics (per worker process).
+"""
+import os
+import threading
+
+import deadlines
+
+MAX_PAGES = int(os.environ.get("PDF_TRIAGE_PAGES", "2"))
+MIN_KEYWORDS = int(os.environ.get("PDF_TRIAGE_MIN_KEYWORDS", "2"))
+# Fewer extractable characters than this on the first pages means "no text layer"
+MIN_TEXT_CHARS = 20
+
+VALID_KEYWORDS = ["report", "lab", "analysis", "patient", "medical", "blood", "scan", "diagnosis"]
+
+# Lower-case fragments of each model's fields, as they appear in reports
+FIELD_HINTS = {
+    "lung": ["pack year", "smok", "radon", "asbestos", "copd", "secondhand", "alcohol"],
+    "colorectal": ["bmi", "body mass", "colorectal", "crc", "lifestyle", "carbohydrate", "protein",
+                   "vitamin", "iron"],
+    "breast": ["radius", "texture", "perimeter", "smoothness", "compactness", "concav", "symmetry",
+               "fractal"],
+}
+
+DECISIONS = ("extract", "reject_unreadable", "reject_image_only", "reject_not_report")
+
+
+class Triage:
+    def __init__(self, decision, reader=None, pages=0, page_texts=(), text_layer="empty", keywords=(),
+                 fields=None, metadata=None, error=None):
+        self.decision = decision
+        self.reader = reader                   # kept so accepted uploads are not parsed twice
+        self.pages = pages
+        self.page_texts = list(page_texts)     # extracted text of the inspected pages
+        self.text_layer = text_layer
+        self.keywords = list(keywords)
+        self.fields = fields or {}
+        self.metadata = metadata or {}
+        self.error = error
+
+    @property
+    def accepted(self):
+        return self.decision == "extract"
+
+    def likely_types(self):
+        """Model keys whose fields the first pages mention, most hits first."""
+        return [key for key, hits in sorted(self.fields.items(), key=lambda kv: -kv[1]) if hits]
+
+    def summary(self):
+        return {
+            "decision": self.decision,
+            "pages": self.pages,
+            "inspected_pages": len(self.page_texts),
+            "text_layer": self.text_layer,
+            "keywords": self.keywords,
+            "likely_types": self.likely_types(),
+            "metadata": self.metadata,
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+def _metadata(reader):
+    try:
+        info = reader.metadata or {}
+    except Exception:
+        return {}
+    out = {}
+    for key in ("/Title", "/Subject", "/Author", "/Creator", "/Producer"):
+        value = info.get(key)
+        if value:
+            out[key[1:].lower()] = str(value)[:200]
+    return out
+
+
+def _has_images(page):
+    """True if the page's resources hold an image XObject (dictionary lookups only, nothing decoded)."""
+    try:
+        resources = page.get("/Resources")
+        resources = resources.get_object() if resources is not None else {}
+        xobjects = resources.get("/XObject")
+        if xobjects is None:
+            return False
+        xobjects = xobjects.get_object()
+        return any(xobjects[name].get_object().get("/Subtype") == "/Image" for name in xobjects)
+    except Exception:
+        return False
+
+
+def triage(reader, max_pages=MAX_PAGES, min_keywords=MIN_KEYWORDS, deadline=None):
+    """Triage for an open pypdf reader, or for None when the PDF could not be opened."""
+    if reader is None:
+        return Triage("reject_unreadable", error="could not open PDF")
+    try:
+        n_pages = len(reader.pages)
+        metadata = _metadata(reader)
+        page_texts, images = [], False
+        for page in reader.pages[:max_pages]:
+            if deadline is not None:
+                deadline.check("triage")
+            page_texts.append(page.extract_text() or "")
+            images = images or _has_images(page)
+    except deadlines.Abandoned:
+        raise
+    except Exception as e:
+        return Triage("reject_unreadable", error=str(e))
+
+    sample = " ".join(page_texts).lower()
+    if len(sample.strip()) >= MIN_TEXT_CHARS:
+        text_layer = "text"
+    else:
+        text_layer = "image_only" if images else "empty"
+    haystack = sample + " " + " ".join(metadata.values()).lower()
+    keywords = [kw for kw in VALID_KEYWORDS if kw in haystack]
+    fields = {key: sum(hint in sample for hint in hints) for key, hints in FIELD_HINTS.items()}
+
+    if text_layer == "image_only":
+        decision = "reject_image_only"
+    elif text_layer == "empty" or len(keywords) < min_keywords:
+        decision = "reject_not_report"
+    else:
+        decision = "extract"
+    return Triage(decision, reader, n_pages, page_texts, text_layer, keywords, fields, metadata)
+
+
+class TriageStats:
+    """Decision counters for /metrics; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decisions = {d: 0 for d in DECISIONS}
+        self.pages_skipped = 0     # pages never extracted because the upload was rejected
+
+    def record(self, result):
+        with self._lock:
+            self.decisions[result.decision] = self.decisions.get(result.decision, 0) + 1
+            if not result.accepted:
+                self.pages_skipped += max(result.pages - len(result.page_texts), 0)
+
+    def stats(self):
+        with self._lock:
+            return {"decisions": dict(self.decisions), "pages_skipped": self.pages_skipped}
@@ -0,0 +1,195 @@
+"""
+Prediction cache for /predict.
+
+Entries are keyed on (model key, bundle cache tag, encoded feature vector),
+so two payloads that encode to the same numbers ("Male" vs "Male", 60 vs
+60.0) share one entry. The tag (ModelBundle.cache_tag) names the version,
+the quantized variant and the cascade band, so neither a reloaded model nor
+a worker serving another variant (shared Redis tier) returns stale results.
+
+Two tiers:
+  * LocalLRUBackend  - per-worker, bounded size, TTL + LRU eviction.
+  * RedisBackend     - optional, shared by all gunicorn workers.
+Any object with the same get/set/stats interface can stand in for the shared
+backend (e.g. LocalLRUBackend in development).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def make_cache_key(model_key, cache_tag, x):
+    """Canonical key: the encoded float32 vector, so int/float/str inputs that encode alike collide."""
+    vec = np.ascontiguousarray(x, dtype=np.float32).tobytes()
+    digest = hashlib.blake2b(vec, digest_size=16).hexdigest()
+    return f"{model_key}:{cache_tag}:{digest}"
+
+
+class LocalLRUBackend:
+    """Thread-safe in-process LRU with per-entry TTL."""
+
+    def __init__(self, maxsize=4096, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            "backend": "local",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisBackend:
+    """Shared backend; values are stored as text with a server-side TTL."""
+
+    def __init__(self, url, ttl=300.0, prefix="cancerdet:pred:"):
+        import redis  # optional dependency, only needed when PREDICTION_CACHE_URL is set
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.url = url
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else float(raw)
+
+    def set(self, key, value):
+        self._client.set(self.prefix + key, repr(float(value)), ex=max(1, int(self.ttl)))
+
+    def clear(self):
+        for k in self._client.scan_iter(self.prefix + "*"):
+            self._client.delete(k)
+
+    def stats(self):
+        return {"backend": "redis", "url": self.url, "ttl_s": self.ttl}
+
+
+class PredictionCache:
+    """Local LRU in front of an optional shared backend, with hit/miss counters."""
+
+    def __init__(self, maxsize=4096, ttl=300.0, shared=None, enabled=True):
+        self.enabled = enabled
+        self.local = LocalLRUBackend(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                # A flaky shared cache must never fail a prediction
+                with self._lock:
+                    self.shared_errors += 1
+                print(f"   ⚠️ Shared cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except Exception as e:
+                with self._lock:
+                    self.shared_errors += 1
+                print(f"   ⚠️ Shared cache write failed: {e}")
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "shared_errors": self.shared_errors,
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+def cache_from_env():
+    """
+    PREDICTION_CACHE_SIZE   max entries per worker (0 disables the cache), default 4096
+    PREDICTION_CACHE_TTL    seconds, default 300
+    PREDICTION_CACHE_URL    redis://... to share entries across workers (optional)
+    """
+    size = int(os.environ.get("PREDICTION_CACHE_SIZE", "4096"))
+    ttl = float(os.environ.get("PREDICTION_CACHE_TTL", "300"))
+    url = os.environ.get("PREDICTION_CACHE_URL")
+
+    shared = None
+    if url and size > 0:
+        try:
+            shared = RedisBackend(url, ttl=ttl)
+            print(f"   ✅ Shared prediction cache: {url}")
+        except Exception as e:
+            print(f"   ⚠️ Shared prediction cache unavailable ({e}), using local cache only")
+
+    return PredictionCache(maxsize=max(size, 1), ttl=ttl, shared=shared, enabled=size > 0)
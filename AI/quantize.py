@@ -0,0 +1,196 @@
+"""
+Post-training quantization of the serving models into TFLite variants.
+
+    python quantize.py lung --mode int8
+    python quantize.py all --mode float16 --version 20250101-120000
+
+For each model the dataset in AI/Dataset is split exactly like the training
+notebooks (80/20, stratified, random_state=42). Training rows calibrate the
+int8 ranges; held-out rows compare the variant with the float model:
+
+    AUC drop            <= --max-auc-drop          (default 0.005)
+    accuracy drop       <= --max-accuracy-drop     (default 0.01, at 0.5)
+    risk_level changes  <= --max-risk-changes      (default 0.02 of rows)
+
+The variant is written next to the float model as <model>.<mode>.tflite with
+a <model>.<mode>.json report. Only variants that pass their gates can be
+served (MODEL_VARIANTS="lung=int8" or {"variant": "int8"} in a manifest).
+The report records the risk cut-offs the risk_level gate was measured at;
+once thresholds.py changes them the variant is not served until it is
+quantized again.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import inference
+import model_store
+from dataset_io import load_labeled, split
+from model_config import MAPPING_PATHS, MODELS_INFO, SPLIT_SEED
+
+CALIBRATION_ROWS = 500
+
+
+# ---------------------------------------------------------
+# 🟦 CONVERSION & GATES
+# ---------------------------------------------------------
+def convert(model, mode, calibration):
+    """TFLite flatbuffer for `mode`; inputs and outputs stay float32."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        def representative():
+            for row in calibration:
+                yield [row.reshape(1, -1)]
+        converter.representative_dataset = representative
+    else:
+        raise ValueError(f"Unknown mode {mode}")
+    return converter.convert()
+
+
+def metrics(y, probs):
+    from sklearn.metrics import roc_auc_score
+
+    return {
+        "auc": float(roc_auc_score(y, probs)),
+        "accuracy": float(np.mean((probs >= 0.5) == y)),
+        "samples": int(len(y)),
+    }
+
+
+def served_probability(model_key, probs):
+    # Same post-processing as /predict
+    return 1.0 - probs if model_key == "colorectal" else probs
+
+
+def agreement(reference, candidate, cutoffs):
+    """Per-row drift of the served probabilities and the share of rows whose risk_level flips."""
+    diff = np.abs(candidate - reference)
+    return {
+        "mean_abs_diff": float(diff.mean()),
+        "max_abs_diff": float(diff.max()),
+        "risk_level_changes": float(np.mean(cutoffs.codes(candidate) != cutoffs.codes(reference))),
+    }
+
+
+def quantize_model(model_key, mode, version=None, max_auc_drop=0.005, max_accuracy_drop=0.01,
+                   max_risk_changes=0.02):
+    """Builds, evaluates and (if it passes) writes one variant. Returns the report."""
+    import joblib
+    import tensorflow as tf
+
+    spec = model_store.resolve(model_key, MODELS_INFO[model_key], MAPPING_PATHS.get(model_key), version)
+    bundle = model_store.load_bundle(
+        model_key, spec, lambda p: tf.keras.models.load_model(p, compile=False), joblib.load
+    )
+
+    x, y = load_labeled(model_key, bundle.mappings)
+    bundle.scaler_inplace(x)
+    x_train, x_test, y_train, y_test = split(x, y)
+
+    rng = np.random.default_rng(SPLIT_SEED)
+    calibration = x_train[rng.choice(len(x_train), min(CALIBRATION_ROWS, len(x_train)), replace=False)]
+
+    start = time.perf_counter()
+    flatbuffer = convert(bundle.model, mode, calibration)
+    convert_seconds = time.perf_counter() - start
+
+    tflite_path, report_path = inference.variant_paths(spec["model_path"], mode)
+    tmp_path = tflite_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(flatbuffer)
+
+    float_probs = served_probability(model_key, bundle.runner(x_test))
+    runner = inference.TFLiteRunner(tmp_path, x_test.shape[1])
+    variant_probs = served_probability(model_key, runner(x_test))
+    reference = metrics(y_test, float_probs)
+    candidate = metrics(y_test, variant_probs)
+    drift = agreement(float_probs, variant_probs, bundle.thresholds)
+
+    auc_drop = reference["auc"] - candidate["auc"]
+    accuracy_drop = reference["accuracy"] - candidate["accuracy"]
+    passed = (
+        auc_drop <= max_auc_drop
+        and accuracy_drop <= max_accuracy_drop
+        and drift["risk_level_changes"] <= max_risk_changes
+    )
+
+    report = {
+        "model_key": model_key,
+        "mode": mode,
+        "source_sha256": inference.file_sha256(spec["model_path"]),
+        "model_version": spec["version"],
+        "created_at": time.time(),
+        "convert_seconds": round(convert_seconds, 3),
+        "float_bytes": os.path.getsize(spec["model_path"]),
+        "variant_bytes": len(flatbuffer),
+        "calibration_rows": int(len(calibration)),
+        "float": reference,
+        "variant": candidate,
+        "auc_drop": auc_drop,
+        "accuracy_drop": accuracy_drop,
+        "agreement": drift,
+        "gates": {
+            "max_auc_drop": max_auc_drop,
+            "max_accuracy_drop": max_accuracy_drop,
+            "max_risk_changes": max_risk_changes,
+        },
+        # risk_level_changes was measured at these; the server rejects the report under others
+        "cutoffs": bundle.thresholds.describe(),
+        "passed": passed,
+    }
+
+    if passed:
+        os.replace(tmp_path, tflite_path)
+    else:
+        os.remove(tmp_path)
+    # The report is written either way so a failed gate is visible next to the model
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=4)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build quantized TFLite variants of the serving models")
+    parser.add_argument("model_key", choices=sorted(MODELS_INFO) + ["all"])
+    parser.add_argument("--mode", choices=inference.VARIANTS, default="int8")
+    parser.add_argument("--version", help="Model store version (default: active)")
+    parser.add_argument("--max-auc-drop", type=float, default=0.005)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    parser.add_argument("--max-risk-changes", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    keys = sorted(MODELS_INFO) if args.model_key == "all" else [args.model_key]
+    failed = False
+    for key in keys:
+        print(f"⏳ Quantizing {key} ({args.mode})...")
+        r = quantize_model(key, args.mode, args.version, args.max_auc_drop,
+                           args.max_accuracy_drop, args.max_risk_changes)
+        print(
+            f"   AUC {r['float']['auc']:.4f} -> {r['variant']['auc']:.4f}, "
+            f"accuracy {r['float']['accuracy']:.4f} -> {r['variant']['accuracy']:.4f}, "
+            f"risk_level changes {r['agreement']['risk_level_changes']:.2%}, "
+            f"size {r['float_bytes']} -> {r['variant_bytes']} bytes"
+        )
+        if r["passed"]:
+            print(f"   ✅ {key} {args.mode} variant written")
+        else:
+            failed = True
+            print(f"   ❌ {key} {args.mode} variant failed its gates, not written")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
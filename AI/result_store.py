@@ -0,0 +1,316 @@
+"""
+Persistent store of /predict, /screen and /extract-pdf results, for the
+app's pending-reports and patient-profile screens.
+
+Each answered request becomes one row per model (a /screen call gives one
+per scored model) in a local SQLite database, WAL journal by default so
+readers never wait for the writer and several gunicorn workers can share
+the file:
+
+    results(request_id, model, kind, patient_id, created_at, model_version,
+            probability, risk_level, class, reviewed_at, payload)
+
+payload is the JSON the client received plus its input (features, or the
+extracted fields of a PDF). Indexes (each also ends in the rowid):
+
+    (patient_id, created_at)                      patient profile
+    (model, created_at)                           per-model history
+    (created_at)                                  everything, newest first
+    (created_at) WHERE reviewed_at IS NULL        pending reports
+
+Write-behind: the request path only does a non-blocking put on a bounded
+queue. A background thread commits everything queued, up to
+RESULT_STORE_BATCH_MAX rows per transaction, at most every
+RESULT_STORE_FLUSH_SECONDS. When the queue is full the row is dropped (and
+counted), never the request. Reads call sync() first, so a client that
+just got a result back also finds it in the listings.
+
+The read endpoints in server.py take the X-Admin-Token header, like /admin/*.
+
+Listings are newest first with keyset pagination: next_cursor is
+"<created_at>:<rowid>" of the last row, so every page is one index range
+scan however deep the client pages.
+
+    RESULT_STORE=0                 disable (nothing is written, reads 503)
+    RESULT_STORE_PATH              database file, default AI/results/results.db
+    RESULT_STORE_JOURNAL           SQLite journal mode, default WAL
+    RESULT_STORE_FLUSH_SECONDS     default 0.5
+    RESULT_STORE_BATCH_MAX         default 500
+    RESULT_STORE_QUEUE_SIZE        default 10000
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(ROOT, "results", "results.db")
+KINDS = ("predict", "screen", "extract")
+MAX_PAGE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    request_id    TEXT NOT NULL,
+    model         TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    patient_id    TEXT,
+    created_at    REAL NOT NULL,
+    model_version TEXT,
+    probability   REAL,
+    risk_level    TEXT,
+    class         TEXT,
+    reviewed_at   REAL,
+    payload       TEXT NOT NULL,
+    PRIMARY KEY (request_id, model)
+);
+CREATE INDEX IF NOT EXISTS results_patient ON results (patient_id, created_at);
+CREATE INDEX IF NOT EXISTS results_model ON results (model, created_at);
+CREATE INDEX IF NOT EXISTS results_created ON results (created_at);
+CREATE INDEX IF NOT EXISTS results_pending ON results (created_at) WHERE reviewed_at IS NULL;
+"""
+COLUMNS = ("request_id", "model", "kind", "patient_id", "created_at", "model_version",
+           "probability", "risk_level", "class", "reviewed_at", "payload")
+INSERT = (f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) "
+          f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+
+
+class BadCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    return f"{row['created_at']!r}:{row['rowid']}"
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, rowid = cursor.rsplit(":", 1)
+        return float(created_at), int(rowid)
+    except (AttributeError, ValueError):
+        raise BadCursor(f"Invalid cursor: {cursor!r}")
+
+
+def _json(value):
+    return json.dumps(value, separators=(",", ":"), default=_to_builtin)
+
+
+def _to_builtin(value):
+    # NumPy scalars / arrays from the scoring path
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def _row_dict(row):
+    out = {k: row[k] for k in COLUMNS if k != "payload"}
+    out["result"] = json.loads(row["payload"])
+    return out
+
+
+class ResultStore:
+    """SQLite-backed result rows with a write-behind queue; thread-safe."""
+
+    def __init__(self, path=DEFAULT_PATH, journal="WAL", flush_seconds=0.5, batch_max=500,
+                 queue_size=10000, enabled=True):
+        self.path = path
+        self.journal = journal
+        self.flush_seconds = flush_seconds
+        self.batch_max = batch_max
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()    # one read connection per threadpool thread
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_flush_ms = None
+
+    # ---- connections --------------------------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA journal_mode={self.journal}")
+        # WAL + NORMAL: a commit is an append to the log, fsync'd at checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def open(self):
+        """Creates the database and starts the writer; no-op when disabled."""
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        self._ensure_thread()
+        print(f"   ✅ Result store: {os.path.relpath(self.path, ROOT)} ({self.journal})")
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---- request path -------------------------------------------------
+    def submit(self, request_id, model, kind, result, inputs=None, patient_id=None):
+        """Queues one result row; never blocks. `result` is the response entry the client got."""
+        if not self.enabled:
+            return
+        prediction = result.get("prediction") or {}
+        row = (
+            request_id, model, kind, patient_id, time.time(), result.get("model_version"),
+            prediction.get("probability"), prediction.get("risk_level"), prediction.get("class"),
+            None, {"response": result, "input": inputs},
+        )
+        try:
+            self._queue.put_nowait(row)
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    # ---- background writer --------------------------------------------
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="result-store", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            # Collect until the batch is full or the flush interval is up
+            while len(items) < self.batch_max and isinstance(items[-1], tuple):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            rows = [item for item in items if isinstance(item, tuple)]
+            if rows:
+                self._write(conn, rows)
+            for item in items:
+                if item is None:
+                    conn.close()
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, conn, rows):
+        start = time.perf_counter()
+        try:
+            # JSON is rendered here, off the request path
+            with conn:
+                conn.executemany(INSERT, [row[:-1] + (_json(row[-1]),) for row in rows])
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            self.errors += len(rows)
+            print(f"   ❌ Result store write failed ({len(rows)} rows): {e}")
+        self.last_flush_ms = round((time.perf_counter() - start) * 1e3, 3)
+
+    def sync(self, timeout=2.0):
+        """Waits (up to `timeout`) until every result queued before the call is committed."""
+        if not self.enabled or self._thread is None:
+            return False
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flushes what is queued and stops the writer."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    # ---- reads --------------------------------------------------------
+    def _page(self, index, where, params, limit, cursor):
+        limit = max(1, min(int(limit), MAX_PAGE))
+        if cursor:
+            created_at, rowid = decode_cursor(cursor)
+            # Row-value comparison: a range scan on the index's (created_at, rowid) tail
+            where = where + ["(created_at, rowid) < (?, ?)"]
+            params = params + [created_at, rowid]
+        sql = (f"SELECT rowid, * FROM results INDEXED BY {index} WHERE {' AND '.join(where) or '1'} "
+               f"ORDER BY created_at DESC, rowid DESC LIMIT ?")
+        rows = self._reader().execute(sql, params + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [_row_dict(r) for r in rows],
+            "next_cursor": encode_cursor(rows[-1]) if more else None,
+        }
+
+    def list(self, patient_id=None, model=None, kind=None, pending=False, limit=20, cursor=None):
+        """Newest-first page of results; the filters pick the index (patient, model, pending, else time)."""
+        where, params, index = [], [], None
+        if patient_id is not None:
+            where.append("patient_id = ?")
+            params.append(patient_id)
+            index = "results_patient"
+        if model is not None:
+            where.append("model = ?")
+            params.append(model)
+            index = index or "results_model"
+        if kind is not None:
+            where.append("kind = ?")
+            params.append(kind)
+        if pending:
+            where.append("reviewed_at IS NULL")
+            index = index or "results_pending"
+        return self._page(index or "results_created", where, params, limit, cursor)
+
+    def get(self, request_id):
+        """Every row of one request (several for /screen), or []."""
+        rows = self._reader().execute(
+            "SELECT rowid, * FROM results WHERE request_id = ? ORDER BY model", (request_id,)).fetchall()
+        return [_row_dict(r) for r in rows]
+
+    def mark_reviewed(self, request_id, reviewed=True):
+        """Sets (or clears) reviewed_at on a request's rows; returns how many rows changed."""
+        conn = self._reader()
+        with conn:
+            cur = conn.execute("UPDATE results SET reviewed_at = ? WHERE request_id = ?",
+                               (time.time() if reviewed else None, request_id))
+        return cur.rowcount
+
+    # ---- reporting ----------------------------------------------------
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+def store_from_env():
+    return ResultStore(
+        path=os.environ.get("RESULT_STORE_PATH", DEFAULT_PATH),
+        journal=os.environ.get("RESULT_STORE_JOURNAL", "WAL"),
+        flush_seconds=float(os.environ.get("RESULT_STORE_FLUSH_SECONDS", "0.5")),
+        batch_max=int(os.environ.get("RESULT_STORE_BATCH_MAX", "500")),
+        queue_size=int(os.environ.get("RESULT_STORE_QUEUE_SIZE", "10000")),
+        enabled=os.environ.get("RESULT_STORE", "1") != "0",
+    )
@@ -1,12 +1,16 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Any, Dict, Optional
+from fastapi import FastAPI, HTTPException, Header, Query
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 import numpy as np
-import joblib
-import tensorflow as tf
 import uuid
+import io
 import os
+import re
+import sys
 import json
+import time
+import asyncio
+import threading
 from contextlib import asynccontextmanager
 
 # ---------------------------------------------------------
@@ -14,39 +18,25 @@ from contextlib import asynccontextmanager
 # ---------------------------------------------------------
 ROOT = os.path.dirname(__file__)
 
-# Define paths to your NEW mapping files
-MAPPING_PATHS = {
-    "colorectal": os.path.join(ROOT, "Colorectal Cancer/colon_mappings.json"),
-    "lung": os.path.join(ROOT, "Lung Cancer/lung_mappings.json"),
-}
-
-MODELS_INFO = {
-    "breast": {
-        "model_path": os.path.join(ROOT, "Breast Cancer/Breast_Cancer.keras"),
-        "scaler_path": os.path.join(ROOT, "Breast Cancer/breast_cancer_scaler.pkl"),
-        "features": [
-            "radius_mean", "texture_mean", "perimeter_mean", "area_mean",
-            "smoothness_mean", "compactness_mean", "concavity_mean",
-            "concave_points_mean", "symmetry_mean", "fractal_dimension_mean",
-            "radius_se", "texture_se", "perimeter_se", "area_se",
-            "smoothness_se", "compactness_se", "concavity_se",
-            "concave_points_se", "symmetry_se", "fractal_dimension_se",
-            "radius_worst", "texture_worst", "perimeter_worst", "area_worst",
-            "smoothness_worst", "compactness_worst", "concavity_worst",
-            "concave_points_worst", "symmetry_worst", "fractal_dimension_worst"
-        ]
-    },
-    "lung": {
-        "model_path": os.path.join(ROOT, "Lung Cancer/Lung_Cancer.keras"),
-        "scaler_path": os.path.join(ROOT, "Lung Cancer/lung_scaler.pkl"),
-        "features": [] 
-    },
-    "colorectal": {
-        "model_path": os.path.join(ROOT, "Colorectal Cancer/colon_risk_model.keras"),
-        "scaler_path": os.path.join(ROOT, "Colorectal Cancer/colon_scaler.pkl"),
-        "features": [] 
-    }
-}
+# Sibling modules (prediction_cache, ...) must import both as `server` and `AI.server`
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import admission
+import deadlines
+import drift_monitor
+import explain
+import feature_pipeline
+import model_store
+import pdf_fields
+import pdf_triage
+import result_store
+import shadow
+import warmup
+import wire_formats
+from feature_pipeline import FeatureError
+from model_config import MAPPING_PATHS, MODELS_INFO
+from prediction_cache import cache_from_env, make_cache_key
 
 # ---------------------------------------------------------
 # 🟦 GLOBAL STORAGE
@@ -54,134 +44,196 @@ MODELS_INFO = {
 _loaded_models = {}
 _loaded_scalers = {}
 _loaded_mappings = {}
+_bundles = {}          # model_key -> active model_store.ModelBundle
+_reload_status = {}    # model_key -> last hot-reload state
+_load_errors = {}      # model_key -> why the startup load failed
+_reload_lock = threading.Lock()
+_prediction_cache = cache_from_env()
+_drift = drift_monitor.monitor_from_env()
+_admission = admission.controller_from_env()
+_abandoned = deadlines.AbandonedWork()
+# Past results for the app's history screens, written behind the request path
+_results = result_store.store_from_env()
+# Candidate versions scored off the request path (shadow) or on a share of it (canary)
+_shadow = shadow.ShadowScorer(lambda bundle, rows: score_batch(bundle, "records", rows, track_drift=False))
+
+_warmup_state = {"state": "pending"}
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+WARMUP_ENABLED = os.environ.get("WARMUP", "1") != "0"
+WARMUP_PDF = os.environ.get("WARMUP_PDF", "1") != "0"
+WARMUP_BATCH_SIZES = warmup.batch_sizes_from_env()
+WARMUP_EXPLAIN = os.environ.get("WARMUP_EXPLAIN", "1") != "0"
+MODEL_STORE_WATCH_SECONDS = float(os.environ.get("MODEL_STORE_WATCH_SECONDS", "0"))
+# Quantized variant per model, e.g. MODEL_VARIANTS="lung=int8,breast=float16" (see quantize.py)
+MODEL_VARIANTS = dict(
+    item.strip().split("=", 1) for item in os.environ.get("MODEL_VARIANTS", "").split(",") if "=" in item
+)
+# Candidate version per model, e.g. CANDIDATE_MODELS="lung=20250301-090000" (see shadow.py)
+CANDIDATE_MODELS = dict(
+    item.strip().split("=", 1) for item in os.environ.get("CANDIDATE_MODELS", "").split(",") if "=" in item
+)
+CANDIDATE_MODE = os.environ.get("CANDIDATE_MODE", "shadow")
+# Pre-screen cascade per model, e.g. CASCADE_MODELS="lung,colorectal" or "all" (see cascade.py)
+CASCADE_MODELS = {item.strip() for item in os.environ.get("CASCADE_MODELS", "").split(",") if item.strip()}
+CANARY_PERCENT = float(os.environ.get("CANARY_PERCENT", "5"))
 
 # ---------------------------------------------------------
 # 🟦 HELPERS
 # ---------------------------------------------------------
+# TensorFlow, joblib, pypdf and thefuzz are imported on first use (model load,
+# warm-up, first PDF), so importing this module stays cheap; see
+# benchmarks/run_benchmarks.py for the import-time budget.
+def load_keras_model(path):
+    import tensorflow as tf
+
+    try:
+        return tf.keras.models.load_model(path)
+    except Exception as e:
+        # Common deserialization issues can crash startup inside Docker.
+        print(f"   ❌ Failed loading {path}: {e}")
+        # Try a non-compiled load as a fallback.
+        print("   ⏳ Retrying load with compile=False...")
+        return tf.keras.models.load_model(path, compile=False)
+
+def load_scaler(path):
+    import joblib
+
+    return joblib.load(path)
+
+def resolve_model_spec(model_key, version=None):
+    return model_store.resolve(model_key, MODELS_INFO[model_key], MAPPING_PATHS.get(model_key), version)
+
+def variant_for(model_key, spec):
+    """MODEL_VARIANTS wins; otherwise a store manifest may pin {"variant": "int8"}."""
+    return MODEL_VARIANTS.get(model_key) or spec["manifest"].get("variant")
+
+def cascade_for(model_key):
+    return "all" in CASCADE_MODELS or model_key in CASCADE_MODELS
+
+def load_model_bundle(model_key, spec):
+    return model_store.load_bundle(model_key, spec, load_keras_model, load_scaler,
+                                   variant_for(model_key, spec), cascade_for(model_key))
+
+def activate_bundle(bundle):
+    """
+    Swaps a loaded bundle in. Requests that already picked up the previous
+    bundle keep their references and finish on the old version.
+    """
+    _bundles[bundle.key] = bundle
+    _loaded_models[bundle.key] = bundle.model
+    _loaded_scalers[bundle.key] = bundle.scaler
+    _loaded_mappings[bundle.key] = bundle.mappings
+
+def load_candidate(model_key, version, mode="shadow", percent=0.0):
+    """Loads and warms a store version as the shadow / canary candidate for `model_key`."""
+    spec = resolve_model_spec(model_key, version)
+    bundle = load_model_bundle(model_key, spec)
+    warmup.warm_up_model(bundle, WARMUP_BATCH_SIZES)
+    return _shadow.set_candidate(model_key, bundle, mode, percent)
+
 def load_resources():
     print("⏳ Loading resources...")
-    
-    # 1. Load Models & Scalers
-    for key, info in MODELS_INFO.items():
-        if os.path.exists(info["model_path"]):
-            try:
-                _loaded_models[key] = tf.keras.models.load_model(info["model_path"])
-                _loaded_scalers[key] = joblib.load(info["scaler_path"])
-                print(f"   ✅ Loaded {key} model")
-            except Exception as e:
-                # Common deserialization issues can crash startup inside Docker.
-                print(f"   ❌ Failed loading {key} model: {e}")
-                # Try a non-compiled load as a fallback, then continue without blocking startup.
-                try:
-                    print(f"   ⏳ Retrying {key} load with compile=False...")
-                    _loaded_models[key] = tf.keras.models.load_model(info["model_path"], compile=False)
-                    _loaded_scalers[key] = joblib.load(info["scaler_path"])
-                    print(f"   ✅ Loaded {key} model (compile=False)")
-                except Exception as e2:
-                    print(f"   ❌ Could not load {key} model after retry: {e2}")
-                    _loaded_models[key] = None
-        else:
+
+    for key in MODELS_INFO:
+        # 1. Resolve the active version (model store, else legacy paths)
+        try:
+            spec = resolve_model_spec(key)
+        except FileNotFoundError as e:
             print(f"   ❌ Missing file for {key}")
+            _load_errors[key] = f"missing file: {e}"
+            continue
 
-    # 2. Load JSON Mappings
-    for key, path in MAPPING_PATHS.items():
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                _loaded_mappings[key] = json.load(f)
-            print(f"   ✅ Loaded mappings for {key}")
-        else:
-            print(f"   ⚠️ No mapping file found for {key}")
-            _loaded_mappings[key] = {}
+        # 2. Load Model, Scaler & JSON Mappings; continue without blocking startup on failure
+        try:
+            bundle = load_model_bundle(key, spec)
+        except Exception as e:
+            print(f"   ❌ Could not load {key} model after retry: {e}")
+            _loaded_models[key] = None
+            _load_errors[key] = str(e)
+            continue
+
+        _load_errors.pop(key, None)
+        activate_bundle(bundle)
+        print(f"   ✅ Loaded {key} model ({bundle.version}, {bundle.variant})")
+        if spec["mappings_path"]:
+            if bundle.mappings:
+                print(f"   ✅ Loaded mappings for {key}")
+            else:
+                print(f"   ⚠️ No mapping file found for {key}")
+
+    for key, version in CANDIDATE_MODELS.items():
+        if key not in _bundles:
+            print(f"   ⚠️ Not shadowing {key}: no primary model loaded")
+            continue
+        try:
+            candidate = load_candidate(key, version, CANDIDATE_MODE, CANARY_PERCENT)
+            print(f"   ✅ {key} candidate {version} loaded ({candidate.mode})")
+        except Exception as e:
+            print(f"   ❌ Could not load {key} candidate {version}: {e}")
 
-def get_mapped_value(cancer_type, feature_name, raw_value, default_val=0):
+def reload_model(model_key, version=None):
     """
-    Looks up the value in the loaded JSON maps.
+    Loads `version` (default: the store's active version) next to the serving
+    one, warms it up and swaps it in. Runs in a worker thread.
+    """
+    started = time.time()
+    _reload_status[model_key] = {"state": "loading", "version": version, "started_at": started}
+    try:
+        spec = resolve_model_spec(model_key, version)
+        bundle = load_model_bundle(model_key, spec)
+        warmup.warm_up_model(bundle, WARMUP_BATCH_SIZES)
+        if WARMUP_EXPLAIN:
+            explain.warm_up(bundle)
+        activate_bundle(bundle)
+    except Exception as e:
+        print(f"   ❌ Reload of {model_key} failed: {e}")
+        _reload_status[model_key] = {"state": "failed", "version": version, "started_at": started, "error": str(e)}
+        return None
+
+    print(f"   🔄 {model_key} now serving {bundle.version}")
+    _reload_status[model_key] = {"state": "active", "version": bundle.version, "started_at": started, "finished_at": time.time()}
+    return bundle
+
+def get_mapped_value(cancer_type, feature_name, raw_value, default_val=0, mappings=None):
+    """
+    Looks up the value in the loaded JSON maps (or `mappings`, when the caller
+    holds a specific model version's maps).
     Example: get_mapped_value("lung", "gender", "Male") -> 1
     """
-    if cancer_type in _loaded_mappings:
-        if feature_name in _loaded_mappings[cancer_type]:
-            # Convert raw_value to string because JSON keys are always strings
-            return _loaded_mappings[cancer_type][feature_name].get(str(raw_value), default_val)
+    if mappings is None:
+        mappings = _loaded_mappings.get(cancer_type, {})
+    if feature_name in mappings:
+        # Convert raw_value to string because JSON keys are always strings
+        return mappings[feature_name].get(str(raw_value), default_val)
     return default_val
 
 # ---------------------------------------------------------
 # 🟦 PREPROCESSING LOGIC
 # ---------------------------------------------------------
-def preprocess_features(model_key: str, raw: Dict[str, Any]):
-    
-    # --- BREAST (Numeric Only) ---
-    if model_key == "breast":
-        info = MODELS_INFO["breast"]
-        arr = []
-        for f in info["features"]:
-            val = raw.get(f)
-            if val is None:
-                raise HTTPException(status_code=400, detail=f"Missing feature: {f}")
-            arr.append(float(val))
-        return np.array(arr).reshape(1, -1), raw
-
-    # --- LUNG (Hybrid Mapping) ---
-    if model_key == "lung":
-        # 1. Numeric Calculation
-        age = float(raw.get("age", 0))
-        pack = float(raw.get("pack_years", 0))
-        cumulative = age * pack
-        
-        # 2. Map Categoricals using the JSON file
-        # We use the keys exactly as they appear in 'lung_mappings.json'
-        
-        # Note: 'default_val' handles cases where input is missing or misspelled
-        gender = get_mapped_value("lung", "gender", raw.get("gender"), 0)
-        
-        # Ordinal mappings (Low/Med/High) are inside the JSON now too!
-        radon = get_mapped_value("lung", "radon_exposure", raw.get("radon_exposure"), 0)
-        alcohol = get_mapped_value("lung", "alcohol_consumption", raw.get("alcohol_consumption"), 0)
-        
-        # Yes/No mappings (LabelEncoded in training, so alphabetical: No=0, Yes=1)
-        asbestos = get_mapped_value("lung", "asbestos_exposure", raw.get("asbestos_exposure"), 0)
-        secondhand = get_mapped_value("lung", "secondhand_smoke_exposure", raw.get("secondhand_smoke_exposure"), 0)
-        copd = get_mapped_value("lung", "copd_diagnosis", raw.get("copd_diagnosis"), 0)
-        family = get_mapped_value("lung", "family_history", raw.get("family_history"), 1)
-
-        # 3. Assemble Array (Order MUST match training DataFrame columns)
-        arr = [age, pack, gender, radon, asbestos, secondhand, copd, alcohol, family, cumulative]
-        
-        return np.array(arr).reshape(1, -1), raw
-
-    # --- COLORECTAL (LabelEncoder Mapping) ---
-    if model_key == "colorectal":
-        
-        age = float(raw.get("Age", 0))
-        bmi = float(raw.get("BMI", 0))
-        
-        # Use JSON maps
-        gender = get_mapped_value("colorectal", "Gender", raw.get("Gender"), 0)
-        lifestyle = get_mapped_value("colorectal", "Lifestyle", raw.get("Lifestyle"), 2) 
-        ethnicity = get_mapped_value("colorectal", "Ethnicity", raw.get("Ethnicity"), 4) 
-        # HISTORY INVERSION:
-        # Model treats 0 as Riskier (Raw 0.41) and 1 as Safer (Raw 0.45).
-        # We want "Yes" to be Riskier. So "Yes" must map to 0. "No" map to 1.
-        hist_input = str(raw.get("Family_History_CRC", "No"))
-        history = 0 if hist_input == "Yes" else 1 
-        conditions = get_mapped_value("colorectal", "Pre-existing Conditions", raw.get("Pre-existing Conditions"), 1) 
-
-        # Nutrition
-        carbs = float(raw.get("Carbohydrates (g)", 0))
-        prot = float(raw.get("Proteins (g)", 0))
-        fats = float(raw.get("Fats (g)", 0))
-        vit_a = float(raw.get("Vitamin A (IU)", 0))
-        vit_c = float(raw.get("Vitamin C (mg)", 0))
-        iron = float(raw.get("Iron (mg)", 0))
-
-        arr = [
-            age, gender, bmi, lifestyle, ethnicity, 
-            history, conditions, 
-            carbs, prot, fats, vit_a, vit_c, iron
-        ]
-        
-        return np.array(arr).reshape(1, -1), raw
+def preprocess_features(model_key: str, raw: Dict[str, Any], pipeline=None, out=None, schema=None):
+    """
+    Encodes one request's features with the model's FeaturePipeline
+    (the active bundle's, unless the caller passes its own snapshot).
+    `schema` (bundle.schema) validates and coerces the raw dict first.
+    `out` is an optional float32 buffer to write into.
+    """
+    if pipeline is None:
+        bundle = _bundles.get(model_key)
+        if bundle is not None:
+            pipeline = bundle.pipeline
+        else:
+            try:
+                pipeline = feature_pipeline.build(model_key, _loaded_mappings.get(model_key))
+            except FeatureError as e:
+                raise HTTPException(status_code=400, detail=str(e))
 
-    raise HTTPException(status_code=400, detail="Invalid model key")
+    try:
+        if schema is not None:
+            raw = schema.validate_one(raw)
+        return pipeline.transform(raw, out=out), raw
+    except FeatureError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # ---------------------------------------------------------
 # 🟦 LIFESPAN & APP INIT
@@ -190,18 +242,95 @@ def preprocess_features(model_key: str, raw: Dict[str, Any]):
 async def lifespan(app: FastAPI):
     # Reload resources on startup
     load_resources()
+    # Pay graph tracing / lazy imports now, not on the first user request
+    run_warmup()
+    try:
+        _results.open()
+    except Exception as e:
+        # Serve without history rather than queueing rows nobody writes
+        _results.enabled = False
+        print(f"   ❌ Result store unavailable: {e}")
+
+    watcher = None
+    if MODEL_STORE_WATCH_SECONDS > 0:
+        watcher = asyncio.create_task(watch_model_store(MODEL_STORE_WATCH_SECONDS))
     yield
+    if watcher is not None:
+        watcher.cancel()
+    # Commit the results still queued
+    _results.close()
+
+def run_warmup():
+    if not WARMUP_ENABLED:
+        _warmup_state.update({"state": "skipped"})
+        return
+
+    print(f"🔥 Warming up (batch sizes {WARMUP_BATCH_SIZES})...")
+    _warmup_state.update({"state": "running", "started_at": time.time()})
+    report = {}
+    for key, bundle in list(_bundles.items()):
+        try:
+            report[key] = round(warmup.warm_up_model(bundle, WARMUP_BATCH_SIZES), 3)
+            print(f"   ✅ {key} warm ({report[key]}s)")
+        except Exception as e:
+            report[key] = f"failed: {e}"
+            print(f"   ❌ Warm-up failed for {key}: {e}")
+
+    if WARMUP_EXPLAIN:
+        for key, bundle in list(_bundles.items()):
+            start = time.perf_counter()
+            try:
+                explain.warm_up(bundle)
+                report[f"explain:{key}"] = round(time.perf_counter() - start, 3)
+                print(f"   ✅ {key} explainer ready ({report[f'explain:{key}']}s)")
+            except Exception as e:
+                # /explain builds it lazily on first use instead
+                report[f"explain:{key}"] = f"failed: {e}"
+                print(f"   ⚠️ Explainer warm-up failed for {key}: {e}")
+
+    if WARMUP_PDF:
+        try:
+            report["pdf"] = round(warmup.warm_up_pdf(
+                lambda t, pdf: process_pdf_logic(t, pdf, record_stats=False)), 3)
+            print(f"   ✅ PDF extraction warm ({report['pdf']}s)")
+        except Exception as e:
+            report["pdf"] = f"failed: {e}"
+            print(f"   ❌ PDF warm-up failed: {e}")
+
+    _warmup_state.update({"state": "done", "finished_at": time.time(), "seconds": report})
+
+async def watch_model_store(interval):
+    """Polls the store's CURRENT pointers and hot-reloads any model whose active version changed."""
+    print(f"👀 Watching model store every {interval}s")
+    while True:
+        await asyncio.sleep(interval)
+        for key in MODELS_INFO:
+            wanted = model_store.active_version(key)
+            bundle = _bundles.get(key)
+            if wanted is None or (bundle is not None and bundle.version == wanted):
+                continue
+            if _start_reload(key, wanted):
+                print(f"   🔄 New {key} version detected: {wanted}")
 
 class PredictRequest(BaseModel):
     model_name: str
     features: Dict[str, Any]
-    threshold: Optional[float] = 0.5
+    # Decision threshold for "class"; None: the model's "high" cut-off (thresholds.py)
+    threshold: Optional[float] = None
+    # Stored with the result for /patients/{patient_id}/results (see result_store.py)
+    patient_id: Optional[str] = None
 
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
+from starlette.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 
-app = FastAPI(title="Cancer Prediction API", version="3.1", lifespan=lifespan)
+app = FastAPI(title="Cancer Prediction API", version="3.1", lifespan=lifespan,
+              default_response_class=wire_formats.FastJSONResponse)
+
+# 0. ADMISSION CONTROL (innermost, so shed requests are still logged and get CORS headers)
+app.add_middleware(admission.AdmissionMiddleware, controller=_admission)
 
 # 1. ENABLE CORS (Critical for App/Web access)
 app.add_middleware(
@@ -226,15 +355,44 @@ class LogRequestMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(LogRequestMiddleware)
 
+# 3. DEADLINES: work stopped at a stage boundary (see deadlines.py)
+@app.exception_handler(deadlines.Abandoned)
+async def abandoned_handler(request: Request, exc: deadlines.Abandoned):
+    _abandoned.record(request.url.path, exc)
+    print(f"   ⏱️ {exc}")
+    # 499: client closed the request (nginx convention); nobody reads it anyway
+    status_code = 499 if exc.reason == "disconnected" else 504
+    return wire_formats.FastJSONResponse({"detail": str(exc)}, status_code=status_code)
+
 
 
 # ---------------------------------------------------------
 # 🟦 PREDICTION ENDPOINT
 # ---------------------------------------------------------
-@app.post("/predict")
-async def predict(req: PredictRequest):
+def _body_spec(schema, extra_types):
+    content = {wire_formats.JSON: {"schema": schema}}
+    content.update({t: {"schema": {"type": "string", "format": "binary"}} for t in extra_types})
+    return {"requestBody": {"required": True, "content": content}}
+
+async def read_payload(request: Request, decode):
+    """Reads the body and decodes it by Content-Type (415 / 400 on failure)."""
+    body = await request.body()
+    try:
+        return decode(wire_formats.media_type(request.headers.get("content-type")), body)
+    except wire_formats.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except wire_formats.BadPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/predict", openapi_extra=_body_spec(PredictRequest.model_json_schema(), [wire_formats.MSGPACK]))
+async def predict(request: Request):
+    """JSON or MessagePack ({"model_name", "features", "threshold", "patient_id"}); Accept: application/msgpack for a MessagePack reply."""
+    deadline = _abandoned.start(request)
+    # Expired while queued for admission: the client has already given up
+    deadline.check("admission")
+    req = await read_payload(request, wire_formats.decode_record)
     req_id = str(uuid.uuid4())
-    model_key = req.model_name.lower()
+    model_key = req["model_name"].lower()
 
     if model_key not in _loaded_models:
         raise HTTPException(status_code=500, detail=f"Model {model_key} not loaded properly")
@@ -243,31 +401,549 @@ async def predict(req: PredictRequest):
     if _loaded_models.get(model_key) is None:
         raise HTTPException(status_code=500, detail=f"Model {model_key} failed to load at startup")
 
-    model = _loaded_models[model_key]
-    scaler = _loaded_scalers[model_key]
+    # One snapshot per request: a hot reload mid-request cannot mix versions
+    primary = _bundles[model_key]
+    bundle = _shadow.route(model_key, primary)
+    # In the threadpool, so a client that disconnects mid-inference is noticed
+    pred, cached = await deadlines.run_stage(request, deadline, score_features, bundle, req["features"], deadline)
+    # The other side of a shadow / canary pair is scored in the background
+    _shadow.submit(model_key, primary, bundle, req["features"], pred)
 
-    x, received = preprocess_features(model_key, req.features)
-    x_scaled = scaler.transform(x)
-    pred = float(model.predict(x_scaled, verbose=0).ravel()[0])
+    response = {
+        "request_id": req_id,
+        "model": model_key,
+        "model_version": bundle.version,
+        "prediction": risk_summary(pred, bundle.thresholds, req["threshold"]),
+        "cached": cached
+    }
+    _results.submit(req_id, model_key, "predict", response, req["features"], req["patient_id"])
+    return wire_formats.respond(response, request.headers.get("accept"))
 
-    # Colorectal Inversion Logic
-    if model_key == "colorectal":
-        pred = 1.0 - pred
-        
-    # Result Logic
-    risk = "high" if pred >= 0.7 else "medium" if pred >= 0.4 else "low"
-    result = "positive" if risk == "high" else "negative"
+def score_features(bundle, features, deadline=None):
+    """
+    Probability for one request on one bundle: encode into a pooled float32
+    buffer, check the cache, scale in place, traced model call (after the
+    cascade pre-screen, when one is enabled).
+    Returns (probability, cached).
+    """
+    model_key = bundle.key
+    if deadline is not None:
+        deadline.check("preprocess")
+    buf = bundle.buffers.acquire(1)
+    try:
+        x, received = preprocess_features(model_key, features, bundle.pipeline, out=buf, schema=bundle.schema)
+        # Input drift is tracked on every request, cache hits included
+        _drift.record(model_key, x)
+
+        # Identical encoded vectors (re-renders, retries, screen switches) skip inference
+        cache_key = make_cache_key(model_key, bundle.cache_tag, x)
+        pred = _prediction_cache.get(cache_key)
+        if pred is not None:
+            return pred, True
+
+        if deadline is not None:
+            deadline.check("inference")
+        bundle.scaler_inplace(x)
+        # Network (or the cascade's pre-screen) plus the colorectal inversion
+        pred = float(bundle.predict(x)[0])
+
+        _prediction_cache.set(cache_key, pred)
+        return pred, False
+    finally:
+        bundle.buffers.release(buf)
 
+def risk_summary(pred, cutoffs, threshold=None):
+    """risk_level from the model's cut-offs; "class" from the request's threshold if it set one."""
+    risk = cutoffs.level(pred)
+    if threshold is None:
+        result = "positive" if risk == "high" else "negative"
+    else:
+        result = "positive" if pred >= threshold else "negative"
     return {
-        "request_id": req_id,
+        "class": result,
+        "probability": pred,
+        "risk_level": risk
+    }
+
+# ---------------------------------------------------------
+# 🟦 BATCH PREDICTION (JSON / MessagePack / Arrow / .npy)
+# ---------------------------------------------------------
+PREDICT_BATCH_MAX_ROWS = int(os.environ.get("PREDICT_BATCH_MAX_ROWS", "10000"))
+
+def score_batch(bundle, kind, data, track_drift=True, deadline=None):
+    """
+    Probabilities (float64, one per row) for a decoded batch. "encoded"
+    arrays skip the pipeline and are copied straight into the float32 buffer.
+    Shadow scoring passes track_drift=False so its rows are not counted twice.
+    """
+    if deadline is not None:
+        deadline.check("preprocess")
+    n = len(data)
+    buf = bundle.buffers.acquire(n)
+    try:
+        if kind == "encoded":
+            if data.shape[1] != buf.shape[1]:
+                raise HTTPException(status_code=400, detail=f"Expected {buf.shape[1]} columns, got {data.shape[1]}")
+            np.copyto(buf, data, casting="unsafe")
+            x = buf
+        else:
+            try:
+                if kind == "records":
+                    data = bundle.schema.validate_many(data)
+                x = bundle.pipeline.transform(data, out=buf)
+            except FeatureError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        if deadline is not None:
+            deadline.check("inference")
+        if track_drift:
+            _drift.record(bundle.key, x)
+        bundle.scaler_inplace(x)
+        probs = bundle.predict(x)
+    finally:
+        bundle.buffers.release(buf)
+    return probs
+
+def batch_summary(probs, cutoffs, threshold=None):
+    levels = cutoffs.levels(probs)
+    positive = levels == "high" if threshold is None else probs >= threshold
+    return {
+        "probability": probs,
+        "risk_level": levels.tolist(),
+        "class": np.where(positive, "positive", "negative").tolist(),
+    }
+
+@app.post("/predict/batch", openapi_extra=_body_spec(
+    {"type": "object", "properties": {"records": {"type": "array", "items": {"type": "object"}}}},
+    [wire_formats.MSGPACK, wire_formats.ARROW_STREAM, wire_formats.ARROW_FILE, wire_formats.NPY],
+))
+async def predict_batch(model_name: str, request: Request, threshold: Optional[float] = None):
+    """
+    Scores many rows for one model. Arrow IPC columns are the raw request
+    fields (same names as /predict); a .npy body is the already-encoded
+    (n, n_features) matrix. Results are column arrays in input order.
+    `?threshold=` sets the cut-off for "class", as in a /predict body.
+    """
+    deadline = _abandoned.start(request)
+    deadline.check("admission")
+    if threshold is not None and not 0.0 <= threshold <= 1.0:
+        raise HTTPException(status_code=400, detail="'threshold' must be between 0 and 1")
+    model_key = model_name.lower()
+    bundle = _bundles.get(model_key)
+    if bundle is None or _loaded_models.get(model_key) is None:
+        raise HTTPException(status_code=500, detail=f"Model {model_key} not loaded properly")
+
+    kind, data = await read_payload(request, wire_formats.decode_batch)
+    if len(data) == 0:
+        raise HTTPException(status_code=400, detail="Empty batch")
+    if len(data) > PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {PREDICT_BATCH_MAX_ROWS} rows per batch")
+
+    probs = await deadlines.run_stage(request, deadline, score_batch, bundle, kind, data, True, deadline)
+    return wire_formats.respond({
+        "request_id": str(uuid.uuid4()),
+        "model": model_key,
+        "model_version": bundle.version,
+        "count": len(probs),
+        **batch_summary(probs, bundle.thresholds, threshold),
+    }, request.headers.get("accept"))
+
+# ---------------------------------------------------------
+# 🟦 EXPLANATIONS (integrated gradients)
+# ---------------------------------------------------------
+EXPLAIN_MAX_ROWS = int(os.environ.get("EXPLAIN_MAX_ROWS", "64"))
+
+class ExplainRequest(BaseModel):
+    model_name: str
+    # One patient (`features`) or several (`records`), explained in one pass
+    features: Optional[Dict[str, Any]] = None
+    records: Optional[List[Dict[str, Any]]] = None
+    # Only the k largest attributions per row (default: all features)
+    top_k: Optional[int] = Field(None, ge=1)
+
+def explain_batch(bundle, rows, top_k=None, deadline=None):
+    if deadline is not None:
+        deadline.check("preprocess")
+    buf = bundle.buffers.acquire(len(rows))
+    try:
+        try:
+            x = bundle.pipeline.transform(bundle.schema.validate_many(rows), out=buf)
+        except FeatureError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        bundle.scaler_inplace(x)
+        return explain.explain_rows(bundle, x, invert=bundle.key == "colorectal", top_k=top_k, deadline=deadline)
+    finally:
+        bundle.buffers.release(buf)
+
+@app.post("/explain")
+async def explain_endpoint(req: ExplainRequest, request: Request):
+    """
+    Per-feature attributions towards the returned probability, relative to
+    the average training patient (`baseline_probability`).
+    """
+    deadline = _abandoned.start(request)
+    deadline.check("admission")
+    model_key = req.model_name.lower()
+    bundle = _bundles.get(model_key)
+    if bundle is None or _loaded_models.get(model_key) is None:
+        raise HTTPException(status_code=500, detail=f"Model {model_key} not loaded properly")
+
+    rows = req.records if req.records is not None else [req.features] if req.features is not None else []
+    if not rows:
+        raise HTTPException(status_code=400, detail="Provide 'features' or 'records'")
+    if len(rows) > EXPLAIN_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {EXPLAIN_MAX_ROWS} rows per request")
+
+    explanations = await deadlines.run_stage(request, deadline, explain_batch, bundle, rows, req.top_k, deadline)
+    return {
+        "request_id": str(uuid.uuid4()),
         "model": model_key,
-        "prediction": {
-            "class": result,
-            "probability": pred,
-            "risk_level": risk
+        "model_version": bundle.version,
+        "method": "integrated_gradients",
+        "explanations": explanations,
+    }
+
+# ---------------------------------------------------------
+# 🟦 MULTI-CANCER SCREENING
+# ---------------------------------------------------------
+
+class ScreenRequest(BaseModel):
+    # One combined intake: lung ("age", "gender", ...), colorectal ("Age", "Gender", ...)
+    # and breast ("radius_mean", ...) field names do not collide
+    features: Dict[str, Any]
+    # Restrict to these models; default: every model the payload has fields for
+    models: Optional[List[str]] = None
+    patient_id: Optional[str] = None
+
+def applicable_models(features):
+    keys = []
+    for key in MODELS_INFO:
+        bundle = _bundles.get(key)
+        sources = bundle.pipeline.sources if bundle is not None else feature_pipeline.build(key).sources
+        if sources & features.keys():
+            keys.append(key)
+    return keys
+
+# Share of a model's input fields the intake must carry before /screen scores it;
+# below that the probability would come mostly from defaults
+SCREEN_MIN_COVERAGE = float(os.environ.get("SCREEN_MIN_COVERAGE", "0.5"))
+
+def screen_one(model_key, features, deadline=None):
+    """One model's entry in the /screen response; raises only deadlines.Abandoned."""
+    bundle = _bundles.get(model_key)
+    if bundle is None or _loaded_models.get(model_key) is None:
+        return {"status": "unavailable", "error": _load_errors.get(model_key, f"Model {model_key} not loaded")}
+    missing = bundle.pipeline.missing_inputs(features)
+    coverage = 1.0 - len(missing) / len(bundle.pipeline.inputs)
+    if coverage < SCREEN_MIN_COVERAGE:
+        return {"status": "insufficient", "coverage": round(coverage, 3), "missing": missing}
+    try:
+        pred, cached = score_features(bundle, features, deadline)
+    except HTTPException as e:
+        return {"status": "invalid", "error": e.detail}
+    except deadlines.Abandoned:
+        raise
+    except Exception as e:
+        print(f"   ❌ Screening {model_key} failed: {e}")
+        return {"status": "error", "error": str(e)}
+    return {
+        "status": "ok",
+        "model_version": bundle.version,
+        "prediction": risk_summary(pred, bundle.thresholds),
+        "cached": cached,
+        # Fields scored with their defaults (coverage was above SCREEN_MIN_COVERAGE)
+        **({"defaulted": missing} if missing else {}),
+    }
+
+@app.post("/screen")
+async def screen(req: ScreenRequest, request: Request):
+    """
+    Scores every applicable model for one patient in a single call. Models run
+    concurrently in the threadpool; a model that is missing, still failing to
+    load, lacks required fields or gets fewer than SCREEN_MIN_COVERAGE of its
+    input fields ("insufficient", with the missing ones) is reported in its
+    own entry instead of failing the whole response.
+    """
+    deadline = _abandoned.start(request)
+    deadline.check("admission")
+    req_id = str(uuid.uuid4())
+    if req.models:
+        keys = [m.lower() for m in req.models]
+        unknown = [k for k in keys if k not in MODELS_INFO]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown models: {', '.join(unknown)}")
+    else:
+        keys = applicable_models(req.features)
+        if not keys:
+            raise HTTPException(status_code=400, detail="No model applies to the given features")
+
+    # One deadline for the whole call: each model checks it before preprocess and inference
+    entries = await asyncio.gather(*(
+        deadlines.run_stage(request, deadline, screen_one, k, req.features, deadline) for k in keys
+    ))
+    results = dict(zip(keys, entries))
+    for key, entry in results.items():
+        if entry["status"] == "ok":
+            _results.submit(req_id, key, "screen", entry, req.features, req.patient_id)
+    return {
+        "request_id": req_id,
+        "results": results,
+        "complete": all(r["status"] == "ok" for r in entries),
+    }
+
+# ---------------------------------------------------------
+# 🟦 ADMIN: MODEL VERSIONS & HOT RELOAD
+# ---------------------------------------------------------
+def _check_admin(token):
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def _start_reload(model_key, version=None):
+    """Schedules reload_model in the threadpool unless one is already running for this key."""
+    with _reload_lock:
+        if _reload_status.get(model_key, {}).get("state") == "loading":
+            return False
+        _reload_status[model_key] = {"state": "loading", "version": version, "started_at": time.time()}
+    asyncio.get_running_loop().run_in_executor(None, reload_model, model_key, version)
+    return True
+
+@app.get("/admin/models")
+async def list_models(x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    out = {}
+    for key in MODELS_INFO:
+        bundle = _bundles.get(key)
+        out[key] = {
+            "active": bundle.describe() if bundle else None,
+            "store_active_version": model_store.active_version(key),
+            "available_versions": model_store.list_versions(key),
+            "reload": _reload_status.get(key),
         }
+    return out
+
+@app.post("/admin/models/{model_key}/reload", status_code=202)
+async def reload_model_endpoint(model_key: str, version: Optional[str] = None,
+                                x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    model_key = model_key.lower()
+    if model_key not in MODELS_INFO:
+        raise HTTPException(status_code=404, detail=f"Unknown model {model_key}")
+    if version is not None and version not in model_store.list_versions(model_key):
+        raise HTTPException(status_code=404, detail=f"{model_key} has no version {version}")
+
+    if not _start_reload(model_key, version):
+        raise HTTPException(status_code=409, detail=f"A reload of {model_key} is already running")
+    return {"model": model_key, "requested_version": version, "status": _reload_status[model_key]}
+
+# ---------------------------------------------------------
+# 🟦 ADMIN: SHADOW / CANARY CANDIDATES
+# ---------------------------------------------------------
+@app.get("/admin/candidates")
+async def list_candidates(x_admin_token: Optional[str] = Header(None)):
+    """Agreement and probability deltas of each candidate vs. its primary (this worker only)."""
+    _check_admin(x_admin_token)
+    return _shadow.report()
+
+@app.post("/admin/models/{model_key}/candidate")
+async def set_candidate(model_key: str, version: str, mode: str = "shadow", percent: float = CANARY_PERCENT,
+                        x_admin_token: Optional[str] = Header(None)):
+    """
+    Loads `version` next to the serving model as its candidate: mode=shadow
+    scores every request in the background, mode=canary answers `percent`% of
+    requests with it. Replaces (and resets the stats of) any previous candidate.
+    """
+    _check_admin(x_admin_token)
+    model_key = model_key.lower()
+    if model_key not in MODELS_INFO or model_key not in _bundles:
+        raise HTTPException(status_code=404, detail=f"No serving model {model_key}")
+    if version not in model_store.list_versions(model_key):
+        raise HTTPException(status_code=404, detail=f"{model_key} has no version {version}")
+    if mode not in shadow.MODES or (mode == "canary" and not 0 < percent <= 100):
+        raise HTTPException(status_code=400, detail="mode must be 'shadow' or 'canary' with 0 < percent <= 100")
+
+    try:
+        candidate = await run_in_threadpool(load_candidate, model_key, version, mode, percent)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load {model_key} {version}: {e}")
+    print(f"   🔄 {model_key} candidate {version} now in {mode} mode")
+    return {"model": model_key, "candidate": candidate.describe()}
+
+@app.delete("/admin/models/{model_key}/candidate")
+async def clear_candidate(model_key: str, x_admin_token: Optional[str] = Header(None)):
+    """Stops shadowing / canarying and returns the candidate's final stats."""
+    _check_admin(x_admin_token)
+    candidate = _shadow.clear_candidate(model_key.lower())
+    if candidate is None:
+        raise HTTPException(status_code=404, detail=f"No candidate for {model_key}")
+    return {"model": model_key.lower(), "candidate": candidate.describe()}
+
+# ---------------------------------------------------------
+# 🟦 HEALTH & READINESS
+# ---------------------------------------------------------
+def process_rss_bytes():
+    """Current resident set size of this worker (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def model_status(model_key):
+    bundle = _bundles.get(model_key)
+    if bundle is not None:
+        status = {"state": "loaded", **bundle.describe()}
+        if model_key in MAPPING_PATHS:
+            status["mappings_loaded"] = bool(bundle.mappings)
+        return status
+    if model_key in _load_errors:
+        return {"state": "failed", "error": _load_errors[model_key]}
+    return {"state": "not_loaded"}
+
+def readiness():
+    """(ready, reasons): every configured model and mapping loaded, and warm-up finished."""
+    reasons = []
+    for key in MODELS_INFO:
+        status = model_status(key)
+        if status["state"] != "loaded":
+            reasons.append(f"{key}: {status['state']}")
+        elif status.get("mappings_loaded") is False:
+            reasons.append(f"{key}: mappings missing")
+    if _warmup_state.get("state") not in ("done", "skipped"):
+        reasons.append(f"warmup: {_warmup_state.get('state')}")
+    return not reasons, reasons
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness only: the event loop is answering.
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    ready, reasons = readiness()
+    body = {"ready": ready, "reasons": reasons}
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@app.get("/models/{model_key}/schema")
+async def model_schema(model_key: str):
+    """JSON schema of `features` for the active version (field types, required fields, known categories)."""
+    bundle = _bundles.get(model_key.lower())
+    if bundle is None:
+        raise HTTPException(status_code=404, detail=f"Model {model_key} not loaded")
+    return {"model": bundle.key, "model_version": bundle.version, "features": bundle.schema.json_schema()}
+
+@app.get("/models/status")
+async def models_status():
+    return {
+        "ready": readiness()[0],
+        "warmup": _warmup_state,
+        "process_rss_bytes": process_rss_bytes(),
+        "models": {key: model_status(key) for key in MODELS_INFO},
     }
 
+# ---------------------------------------------------------
+# 🟦 METRICS ENDPOINT
+# ---------------------------------------------------------
+@app.get("/metrics")
+async def metrics():
+    return {
+        "prediction_cache": _prediction_cache.stats(),
+        "warmup": _warmup_state,
+        "drift": _drift.summary(),
+        "shadow": _shadow.summary(),
+        "admission": _admission.stats(),
+        "deadlines": _abandoned.stats(),
+        "cascade": {key: b.cascade.stats() for key, b in _bundles.items() if b.cascade is not None},
+        "pdf_triage": _triage_stats.stats(),
+        "pdf_fields": _field_stats.stats(),
+        "results": _results.stats(),
+    }
+
+# ---------------------------------------------------------
+# 🟦 ADMIN: INPUT DRIFT
+# ---------------------------------------------------------
+@app.get("/admin/drift")
+async def drift_report(model_key: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Per-feature PSI / mean shift of served inputs vs. the AI/Dataset profiles (this worker only)."""
+    _check_admin(x_admin_token)
+    report = _drift.report()
+    if model_key is not None:
+        if model_key not in report:
+            raise HTTPException(status_code=404, detail=f"No drift profile for {model_key}")
+        report = {model_key: report[model_key]}
+    return {"enabled": _drift.enabled, "min_samples": drift_monitor.MIN_SAMPLES, "models": report}
+
+@app.post("/admin/drift/reset")
+async def drift_reset(model_key: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    _drift.reset(model_key)
+    return {"reset": model_key or "all"}
+
+# ---------------------------------------------------------
+# 🟦 RESULT HISTORY (pending reports, patient profile)
+# ---------------------------------------------------------
+# Stored results hold patient inputs and extracted report fields: same token as /admin/*
+def _require_results(token):
+    _check_admin(token)
+    if not _results.enabled:
+        raise HTTPException(status_code=503, detail="Result store is disabled (RESULT_STORE=0)")
+
+def read_results(read, *args, **kwargs):
+    """Runs a store read once the rows queued before it are committed (read-your-writes); threadpool only."""
+    _results.sync()
+    try:
+        return read(*args, **kwargs)
+    except result_store.BadCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _check_filters(model, kind):
+    if model is not None and model.lower() not in MODELS_INFO:
+        raise HTTPException(status_code=400, detail=f"Unknown model {model}")
+    if kind is not None and kind not in result_store.KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown kind {kind} (expected one of {', '.join(result_store.KINDS)})")
+    return model.lower() if model is not None else None
+
+@app.get("/results")
+async def results_list(model: Optional[str] = None, kind: Optional[str] = None, pending: bool = False,
+                       limit: int = Query(20, ge=1, le=result_store.MAX_PAGE), cursor: Optional[str] = None,
+                       x_admin_token: Optional[str] = Header(None)):
+    """Newest first; pending=true lists results nobody has reviewed yet. Pass next_cursor back for the next page."""
+    _require_results(x_admin_token)
+    model = _check_filters(model, kind)
+    return await run_in_threadpool(read_results, _results.list, model=model, kind=kind, pending=pending,
+                                   limit=limit, cursor=cursor)
+
+@app.get("/patients/{patient_id}/results")
+async def patient_results(patient_id: str, model: Optional[str] = None, kind: Optional[str] = None,
+                          limit: int = Query(20, ge=1, le=result_store.MAX_PAGE), cursor: Optional[str] = None,
+                          x_admin_token: Optional[str] = Header(None)):
+    _require_results(x_admin_token)
+    model = _check_filters(model, kind)
+    return await run_in_threadpool(read_results, _results.list, patient_id=patient_id, model=model, kind=kind,
+                                   limit=limit, cursor=cursor)
+
+@app.get("/results/{request_id}")
+async def result_detail(request_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Every stored row of one request (one per model for /screen)."""
+    _require_results(x_admin_token)
+    rows = await run_in_threadpool(read_results, _results.get, request_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No stored result {request_id}")
+    return {"request_id": request_id, "items": rows}
+
+@app.post("/results/{request_id}/review")
+async def review_result(request_id: str, reviewed: bool = True, x_admin_token: Optional[str] = Header(None)):
+    """Marks a result as reviewed (reviewed=false puts it back on the pending list)."""
+    _require_results(x_admin_token)
+    changed = await run_in_threadpool(read_results, _results.mark_reviewed, request_id, reviewed)
+    if not changed:
+        raise HTTPException(status_code=404, detail=f"No stored result {request_id}")
+    return {"request_id": request_id, "reviewed": reviewed, "rows": changed}
+
 # ---------------------------------------------------------
 # 🟦 PDF EXTRACTION ENDPOINT
 # ---------------------------------------------------------
@@ -275,31 +951,79 @@ async def predict(req: PredictRequest):
 # 🟦 PDF EXTRACTION ENDPOINT
 # ---------------------------------------------------------
 from fastapi import UploadFile, File, Form
-from fastapi.concurrency import run_in_threadpool
-from pypdf import PdfReader
-from thefuzz import fuzz
-import io
-import re
+
+# Metadata + first-page triage before full extraction (see pdf_triage.py)
+PDF_TRIAGE = os.environ.get("PDF_TRIAGE", "1") != "0"
+_triage_stats = pdf_triage.TriageStats()
+
+def open_pdf(file_bytes):
+    """pypdf reader for the upload, or None if it cannot be parsed."""
+    from pypdf import PdfReader
+
+    try:
+        return PdfReader(io.BytesIO(file_bytes))
+    except Exception as e:
+        print(f"   ❌ PDF Read Error: {e}")
+        return None
+
+def extract_pages(reader, start=0, deadline=None):
+    """Text of pages[start:], one line break after each page."""
+    text = ""
+    for page in reader.pages[start:]:
+        if deadline is not None:
+            deadline.check("pages")
+        text += page.extract_text() + "\n"
+    return text
 
 # NOTE: This must be SYNC to run in threadpool efficiently
-def extract_text_from_pdf_sync(file_bytes):
+def extract_text_from_pdf_sync(file_bytes, deadline=None):
+    from pypdf import PdfReader
+
     try:
         print("   Starting PDF text extraction...")
         reader = PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for i, page in enumerate(reader.pages):
-            text += page.extract_text() + "\n"
+        text = extract_pages(reader, 0, deadline)
         print(f"   Extracted {len(text)} chars from {len(reader.pages)} pages.")
         return text
+    except deadlines.Abandoned:
+        raise
     except Exception as e:
         print(f"   ❌ PDF Read Error: {e}")
         return ""
 
+def triaged_text(type, file_bytes, deadline=None, record_stats=True):
+    """
+    Runs the triage; rejected uploads stop here with a 422 before any further
+    page is extracted. Returns (full text, triage) for accepted ones, reusing
+    the pages the triage already read.
+    """
+    triage = pdf_triage.triage(open_pdf(file_bytes), deadline=deadline)
+    if record_stats:
+        _triage_stats.record(triage)
+    if not triage.accepted:
+        print(f"   ⚠️ PDF rejected by triage: {triage.decision}")
+        raise HTTPException(status_code=422, detail={"reason": triage.decision, "triage": triage.summary()})
+    likely = triage.likely_types()
+    if likely and type not in likely:
+        print(f"   ⚠️ Uploaded for {type}, but the first pages look like {', '.join(likely)}")
+
+    text = "".join(page + "\n" for page in triage.page_texts)
+    try:
+        text += extract_pages(triage.reader, len(triage.page_texts), deadline)
+    except deadlines.Abandoned:
+        raise
+    except Exception as e:
+        print(f"   ❌ PDF Read Error: {e}")
+    print(f"   Extracted {len(text)} chars from {triage.pages} pages.")
+    return text, triage
+
 def fuzzy_extract(text, keys, is_numeric=True):
     """
     Finds a line containing one of the 'keys' with high fuzzy ratio,
     then regex-extracts the number value from that line.
     """
+    from thefuzz import fuzz
+
     lines = text.split('\n')
     best_score = 0
     best_val = None
@@ -327,6 +1051,8 @@ def fuzzy_extract_category(text, keys, options_map):
     options_map: Dict of { "Text in Report": "Value to Return" }
                  e.g. { "Male": "Male", "M": "Male", "Female": "Female", "F": "Female" }
     """
+    from thefuzz import fuzz
+
     lines = text.split('\n')
     
     # Improved strategy: 
@@ -361,48 +1087,85 @@ def fuzzy_extract_category(text, keys, options_map):
                     
     return None
 
-def process_pdf_logic(type: str, file_bytes: bytes):
-    text = extract_text_from_pdf_sync(file_bytes)
-    
-    # 1. Validation
-    valid_keywords = ["report", "lab", "analysis", "patient", "medical", "blood", "scan", "diagnosis"]
-    valid_score = 0
-    for kw in valid_keywords:
-        if kw in text.lower():
-            valid_score += 1
-            
-    if valid_score < 2:
-        print("   ⚠️ Low confidence that this is a medical report")
+# Structured fast path: AcroForm fields + key/value rows (see pdf_fields.py)
+PDF_FAST_PATH = os.environ.get("PDF_FAST_PATH", "1") != "0"
+_field_stats = pdf_fields.FieldStats()
+
+def extract_number(index, text, keys, sources):
+    """O(1) lookup in the document's field index, else the fuzzy line scan; records which one answered."""
+    value, source = index.number(keys) if index is not None else (None, None)
+    if value is None:
+        value = fuzzy_extract(text, keys)
+        source = "fuzzy" if value is not None else "missing"
+    sources.append(source)
+    return value
+
+def extract_category(index, text, keys, options_map, sources):
+    value, source = index.category(keys, options_map) if index is not None else (None, None)
+    if value is None:
+        value = fuzzy_extract_category(text, keys, options_map)
+        source = "fuzzy" if value is not None else "missing"
+    sources.append(source)
+    return value
+
+def process_pdf_logic(type: str, file_bytes: bytes, deadline=None, record_stats=True):
+    """record_stats=False keeps the document out of the /metrics counters (warm-up)."""
+    triage = None
+    if PDF_TRIAGE:
+        # 1. Validation on metadata + first pages; rejects before the expensive work
+        text, triage = triaged_text(type, file_bytes, deadline, record_stats)
+        reader = triage.reader
+    else:
+        text = extract_text_from_pdf_sync(file_bytes, deadline)
+        reader = open_pdf(file_bytes) if PDF_FAST_PATH else None
+    if deadline is not None:
+        deadline.check("fields")
+
+    if triage is None:
+        # 1. Validation
+        valid_score = 0
+        for kw in pdf_triage.VALID_KEYWORDS:
+            if kw in text.lower():
+                valid_score += 1
+
+        if valid_score < 2:
+            print("   ⚠️ Low confidence that this is a medical report")
 
     extracted_data = {}
 
+    # Form fields / table rows answer what they can; the fuzzy scan only the rest
+    index = pdf_fields.build_index(reader, text) if PDF_FAST_PATH else None
+    sources = []
+    number = lambda keys: extract_number(index, text, keys, sources)
+    category = lambda keys, options: extract_category(index, text, keys, options, sources)
+
     print(f"   Extracting features for {type}...")
     
     if type == "lung":
         # Numerical
-        extracted_data["age"] = fuzzy_extract(text, ["Age", "Patient Age", "DOB", "Years old"])
-        extracted_data["packYears"] = fuzzy_extract(text, ["Pack Years", "Smoking History", "Packs per day"])
+        extracted_data["age"] = number(["Age", "Patient Age", "DOB", "Years old"])
+        extracted_data["packYears"] = number(["Pack Years", "Smoking History", "Packs per day"])
         
         # Categorical
-        extracted_data["gender"] = fuzzy_extract_category(text, ["Gender", "Sex"], {
+        extracted_data["gender"] = category(["Gender", "Sex"], {
             "Male": "Male", "M": "Male", "Man": "Male",
             "Female": "Female", "F": "Female", "Woman": "Female"
         })
         
-        extracted_data["radon_exposure"] = fuzzy_extract_category(text, ["Radon"], {
+        extracted_data["radon_exposure"] = category(["Radon"], {
             "High": "High", "Elevated": "High",
             "Medium": "Medium", "Moderate": "Medium",
             "Low": "Low", "Normal": "Low", "Safe": "Low"
         })
 
-        extracted_data["alcohol_consumption"] = fuzzy_extract_category(text, ["Alcohol"], {
+        extracted_data["alcohol_consumption"] = category(["Alcohol"], {
             "Heavy": "High", "High": "High",
             "Moderate": "Moderate", "Occasional": "Moderate",
             "None": "None", "No": "None", "Non-drinker": "None"
         })
 
         # Boolean
-        family_hist = fuzzy_extract_category(text, ["Family History", "History of Cancer"], {
+        family_hist = category(["Family History", "History of Cancer"], {
             "Yes": True, "Positive": True, "Present": True,
             "No": False, "Negative": False, "Absent": False,
             # Implicit Positive Keywords
@@ -415,37 +1178,37 @@ def process_pdf_logic(type: str, file_bytes: bytes):
             extracted_data["family_history"] = family_hist
         
         # Others (defaults to false usually, but try extract)
-        extracted_data["asbestos_exposure"] = fuzzy_extract_category(text, ["Asbestos"], {
+        extracted_data["asbestos_exposure"] = category(["Asbestos"], {
             "Yes": True, "Positive": True, "Exposed": True,
             "No": False, "Negative": False
         })
         
-        extracted_data["secondhand_smoke_exposure"] = fuzzy_extract_category(text, ["Secondhand Smoke", "Passive Smoking", "Second-hand"], {
+        extracted_data["secondhand_smoke_exposure"] = category(["Secondhand Smoke", "Passive Smoking", "Second-hand"], {
             "Yes": True, "Positive": True, "Exposed": True,
             "No": False, "Negative": False, "None": False
         })
 
-        extracted_data["copd_diagnosis"] = fuzzy_extract_category(text, ["COPD", "Chronic Obstructive", "Lung Disease"], {
+        extracted_data["copd_diagnosis"] = category(["COPD", "Chronic Obstructive", "Lung Disease"], {
             "Yes": True, "Positive": True, "Diagnosed": True,
             "No": False, "Negative": False, "None": False
         })
 
     elif type == "colorectal":
-        extracted_data["age"] = fuzzy_extract(text, ["Age", "Years old"])
-        extracted_data["bmi"] = fuzzy_extract(text, ["BMI", "Body Mass Index"])
+        extracted_data["age"] = number(["Age", "Years old"])
+        extracted_data["bmi"] = number(["BMI", "Body Mass Index"])
         
-        extracted_data["gender"] = fuzzy_extract_category(text, ["Gender", "Sex"], {
+        extracted_data["gender"] = category(["Gender", "Sex"], {
             "Male": "Male", "Female": "Female"
         })
 
-        extracted_data["lifestyle"] = fuzzy_extract_category(text, ["Lifestyle", "Activity", "Exercise"], {
+        extracted_data["lifestyle"] = category(["Lifestyle", "Activity", "Exercise"], {
             "Very Active": "Very Active", "Athlete": "Very Active",
             "Active": "Active", "Moderate": "Active", 
             "Sedentary": "Sedentary", "Low": "Sedentary", "Inactive": "Sedentary",
             "Smoker": "Smoker", "Smoking": "Smoker"
         })
         
-        extracted_data["family_history"] = fuzzy_extract_category(text, ["Family History", "History of CRC"], {
+        extracted_data["family_history"] = category(["Family History", "History of CRC"], {
             "Yes": True, "Positive": True,
             "No": False, "Negative": False,
             # Implicit Positive Keywords
@@ -456,33 +1219,44 @@ def process_pdf_logic(type: str, file_bytes: bytes):
         })
 
         # Basic nutritional info if present
-        extracted_data["carbs"] = fuzzy_extract(text, ["Carbohydrates", "Carbs"])
-        extracted_data["proteins"] = fuzzy_extract(text, ["Proteins", "Protein"])
-        extracted_data["fats"] = fuzzy_extract(text, ["Fats", "Fat"])
-        extracted_data["vitA"] = fuzzy_extract(text, ["Vitamin A", "Vit A"])
-        extracted_data["vitC"] = fuzzy_extract(text, ["Vitamin C", "Vit C", "Ascorbic Acid"])
-        extracted_data["iron"] = fuzzy_extract(text, ["Iron", "Fe", "Ferritin"])
+        extracted_data["carbs"] = number(["Carbohydrates", "Carbs"])
+        extracted_data["proteins"] = number(["Proteins", "Protein"])
+        extracted_data["fats"] = number(["Fats", "Fat"])
+        extracted_data["vitA"] = number(["Vitamin A", "Vit A"])
+        extracted_data["vitC"] = number(["Vitamin C", "Vit C", "Ascorbic Acid"])
+        extracted_data["iron"] = number(["Iron", "Fe", "Ferritin"])
         
     elif type == "breast":
         features = MODELS_INFO["breast"]["features"]
         for f in features:
             human_name = f.replace("_", " ")
-            val = fuzzy_extract(text, [human_name])
+            val = number([human_name])
             if val is not None:
                 extracted_data[f] = val
 
+    if record_stats:
+        _field_stats.record(sources)
     print(f"   ✅ Extraction Complete: {extracted_data}")
-    return {"status": "success", "data": extracted_data, "text_preview": text[:200]}
+    result = {"status": "success", "data": extracted_data, "text_preview": text[:200]}
+    if triage is not None:
+        result["triage"] = triage.summary()
+    return result
 
 @app.post("/extract-pdf")
-async def extract_pdf(type: str = Form(...), file: UploadFile = File(...)):
+async def extract_pdf(request: Request, type: str = Form(...), file: UploadFile = File(...),
+                      patient_id: Optional[str] = Form(None)):
     print(f"📄 Processing PDF Upload for {type}...")
+    deadline = _abandoned.start(request)
+    deadline.check("admission")
     
     # Read content asynchronously (IO bound)
     content = await file.read()
     
-    # Run CPU-bound extraction in a separate thread to avoid blocking server
-    result = await run_in_threadpool(process_pdf_logic, type, content)
+    # Run CPU-bound extraction in a separate thread to avoid blocking server;
+    # it stops between pages once the client is gone or the deadline passed
+    result = await deadlines.run_stage(request, deadline, process_pdf_logic, type, content, deadline)
+    result["request_id"] = str(uuid.uuid4())
+    _results.submit(result["request_id"], type.lower(), "extract", result, patient_id=patient_id)
     
     return result
 
@@ -0,0 +1,216 @@
+"""
+Shadow and canary evaluation of a candidate model version on live /predict
+traffic, before it is promoted with /admin/models/{key}/reload.
+
+    shadow   the primary answers every request; the request's features are
+             queued and a background thread scores them on the candidate
+    canary   CANARY_PERCENT of requests are answered by the candidate; the
+             primary is scored in the background for the comparison
+
+Either way the request only pays for a dict lookup and a non-blocking put on
+a bounded queue. The background thread drains up to SHADOW_BATCH_MAX queued
+requests at a time and scores each model's rows in one batch. When the queue
+is full the shadow work is dropped (and counted), never the request.
+
+Per candidate the scorer records how often risk_level and class agree with
+the primary (each side on its own cut-offs, as a client would see them) and
+the candidate - primary probability deltas. Stats are per
+worker process and start over whenever a candidate is (re)installed.
+"""
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+MODES = ("shadow", "canary")
+QUEUE_SIZE = int(os.environ.get("SHADOW_QUEUE_SIZE", "2048"))
+BATCH_MAX = int(os.environ.get("SHADOW_BATCH_MAX", "64"))
+
+
+class Comparison:
+    """Running candidate-vs-primary agreement for one candidate; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compared = 0
+        self.level_agree = 0
+        self.class_agree = 0
+        self.sum_delta = 0.0
+        self.sum_abs_delta = 0.0
+        self.max_abs_delta = 0.0
+        self.errors = 0
+
+    def record(self, primary, candidate, primary_cutoffs, candidate_cutoffs):
+        primary_levels = primary_cutoffs.codes(primary)
+        candidate_levels = candidate_cutoffs.codes(candidate)
+        delta = candidate - primary
+        with self._lock:
+            self.compared += len(delta)
+            self.level_agree += int(np.sum(primary_levels == candidate_levels))
+            # class is "positive" exactly when risk_level is high
+            self.class_agree += int(np.sum((primary_levels == 2) == (candidate_levels == 2)))
+            self.sum_delta += float(delta.sum())
+            self.sum_abs_delta += float(np.abs(delta).sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(delta).max()))
+
+    def record_errors(self, n):
+        with self._lock:
+            self.errors += n
+
+    def snapshot(self):
+        with self._lock:
+            n = self.compared
+            return {
+                "compared": n,
+                "errors": self.errors,
+                "risk_level_agreement": self.level_agree / n if n else None,
+                "class_agreement": self.class_agree / n if n else None,
+                "mean_delta": self.sum_delta / n if n else None,
+                "mean_abs_delta": self.sum_abs_delta / n if n else None,
+                "max_abs_delta": self.max_abs_delta if n else None,
+            }
+
+
+class Candidate:
+    def __init__(self, bundle, mode="shadow", percent=0.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode} (expected one of {', '.join(MODES)})")
+        if mode == "canary" and not 0 < percent <= 100:
+            raise ValueError("Canary percent must be in (0, 100]")
+        self.bundle = bundle
+        self.mode = mode
+        self.percent = float(percent) if mode == "canary" else 0.0
+        self.comparison = Comparison()
+        self.served = 0          # requests answered by the candidate (canary)
+        self.since = time.time()
+
+    def describe(self):
+        return {
+            "version": self.bundle.version,
+            "variant": self.bundle.variant,
+            "mode": self.mode,
+            "percent": self.percent,
+            "served": self.served,
+            "since": self.since,
+            **self.comparison.snapshot(),
+        }
+
+
+class ShadowScorer:
+    """
+    Candidates per model key plus the bounded queue and background thread
+    that scores the side of each request the client did not wait for.
+    `score(bundle, rows)` returns served probabilities (one per raw feature dict).
+    """
+
+    def __init__(self, score, queue_size=QUEUE_SIZE, batch_max=BATCH_MAX):
+        self._score = score
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.batch_max = batch_max
+        self.candidates = {}     # model_key -> Candidate
+        self.submitted = 0
+        self.dropped = 0
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    # ---- request path -------------------------------------------------
+    def route(self, model_key, primary):
+        """The bundle that should answer this request: the candidate for a canary draw, else `primary`."""
+        candidate = self.candidates.get(model_key)
+        if candidate is None or candidate.mode != "canary" or random.random() * 100 >= candidate.percent:
+            return primary
+        candidate.served += 1
+        return candidate.bundle
+
+    def submit(self, model_key, primary, served, features, probability):
+        """Queues the comparison for one answered request; never blocks."""
+        candidate = self.candidates.get(model_key)
+        if candidate is None:
+            return
+        other = primary if served is candidate.bundle else candidate.bundle
+        try:
+            self._queue.put_nowait((candidate, other, served is candidate.bundle, features, probability, primary))
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    # ---- candidates ---------------------------------------------------
+    def set_candidate(self, model_key, bundle, mode="shadow", percent=0.0):
+        self.candidates[model_key] = Candidate(bundle, mode, percent)
+        self._ensure_thread()
+        return self.candidates[model_key]
+
+    def clear_candidate(self, model_key):
+        return self.candidates.pop(model_key, None)
+
+    # ---- background scoring -------------------------------------------
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.batch_max:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # One batch per (candidate, bundle to score)
+            groups = {}
+            for job in jobs:
+                groups.setdefault((id(job[0]), id(job[1])), []).append(job)
+            for group in groups.values():
+                try:
+                    self._score_group(group)
+                except Exception as e:
+                    print(f"   ❌ Shadow scoring failed: {e}")
+                    group[0][0].comparison.record_errors(len(group))
+
+    def _score_group(self, group):
+        candidate, other, primary_bundle = group[0][0], group[0][1], group[0][5]
+        rows = [job[3] for job in group]
+        served_probs = np.array([job[4] for job in group], dtype=np.float64)
+        served_is_candidate = np.array([job[2] for job in group])
+        try:
+            other_probs = np.asarray(self._score(other, rows), dtype=np.float64)
+        except Exception:
+            # A row the other model rejects must not sink the rest of the batch
+            other_probs = np.full(len(rows), np.nan)
+            for i, row in enumerate(rows):
+                try:
+                    other_probs[i] = self._score(other, [row])[0]
+                except Exception:
+                    pass
+        ok = ~np.isnan(other_probs)
+        if not ok.all():
+            candidate.comparison.record_errors(int((~ok).sum()))
+        if ok.any():
+            primary = np.where(served_is_candidate, other_probs, served_probs)[ok]
+            cand = np.where(served_is_candidate, served_probs, other_probs)[ok]
+            candidate.comparison.record(primary, cand, primary_bundle.thresholds, candidate.bundle.thresholds)
+
+    # ---- reporting ----------------------------------------------------
+    def stats(self):
+        return {"queued": self._queue.qsize(), "capacity": self._queue.maxsize,
+                "submitted": self.submitted, "dropped": self.dropped}
+
+    def report(self):
+        return {
+            **self.stats(),
+            "candidates": {key: c.describe() for key, c in self.candidates.items()},
+        }
+
+    def summary(self):
+        """Compact view for /metrics."""
+        out = self.stats()
+        for key, c in self.candidates.items():
+            snap = c.comparison.snapshot()
+            out[key] = {"version": c.bundle.version, "mode": c.mode, "compared": snap["compared"],
+                        "risk_level_agreement": snap["risk_level_agreement"]}
+        return out
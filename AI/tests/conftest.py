@@ -0,0 +1,9 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.dirname(TESTS_DIR)
+BENCH_DIR = os.path.join(AI_DIR, "benchmarks")
+for path in (AI_DIR, BENCH_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from admission import BULK, INTERACTIVE, AdmissionController, AdmissionMiddleware, Pool, Rejected
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def fill(pool, n):
+    for _ in range(n):
+        await pool.acquire()
+
+
+def test_admits_up_to_the_limit_without_queueing():
+    async def scenario():
+        pool = Pool("inference", limit=2, queue_depth=4)
+        await fill(pool, 2)
+        return pool
+
+    pool = run(scenario())
+    assert pool.running == 2
+    assert pool.queued_total == 0
+
+
+def test_full_queue_is_shed_with_503():
+    async def scenario():
+        pool = Pool("inference", limit=1, queue_depth=1, queue_timeout=5)
+        await fill(pool, 1)
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(Rejected) as info:
+                await pool.acquire()
+        finally:
+            waiter.cancel()
+        return pool, info.value
+
+    pool, rejected = run(scenario())
+    assert (rejected.status_code, rejected.reason) == (503, "queue_full")
+    assert rejected.retry_after >= 1
+    assert pool.shed["queue_full"] == 1
+
+
+def test_bulk_is_shed_with_429_past_its_queue_share():
+    async def scenario():
+        pool = Pool("inference", limit=1, queue_depth=4, queue_timeout=5, bulk_share=0.5)
+        await fill(pool, 1)
+        waiters = [asyncio.create_task(pool.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(Rejected) as info:
+                await pool.acquire(BULK)
+            # Interactive requests may still use the rest of the queue
+            interactive = asyncio.create_task(pool.acquire(INTERACTIVE))
+            await asyncio.sleep(0)
+            queued = pool.queued
+            interactive.cancel()
+        finally:
+            for w in waiters:
+                w.cancel()
+        return pool, info.value, queued
+
+    pool, rejected, queued = run(scenario())
+    assert (rejected.status_code, rejected.reason) == (429, "bulk_limit")
+    assert queued == 3
+    assert pool.shed["bulk_limit"] == 1
+
+
+def test_queue_timeout_is_shed_with_503():
+    async def scenario():
+        pool = Pool("inference", limit=1, queue_depth=4, queue_timeout=0.01)
+        await fill(pool, 1)
+        with pytest.raises(Rejected) as info:
+            await pool.acquire()
+        return pool, info.value
+
+    pool, rejected = run(scenario())
+    assert (rejected.status_code, rejected.reason) == (503, "timeout")
+    assert pool.queued == 0
+
+
+def test_release_hands_the_slot_to_interactive_first():
+    async def scenario():
+        pool = Pool("inference", limit=1, queue_depth=4, queue_timeout=5)
+        await fill(pool, 1)
+        order = []
+
+        async def wait(name, priority):
+            await pool.acquire(priority)
+            order.append(name)
+
+        bulk = asyncio.create_task(wait("bulk", BULK))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait("interactive", INTERACTIVE))
+        await asyncio.sleep(0)
+        pool.release(0.01)
+        await asyncio.sleep(0)
+        pool.release(0.01)
+        await asyncio.gather(bulk, interactive)
+        return pool, order
+
+    pool, order = run(scenario())
+    assert order == ["interactive", "bulk"]
+    assert pool.running == 1
+
+
+def test_retry_after_grows_with_the_backlog():
+    pool = Pool("inference", limit=2, queue_depth=100)
+    pool._service_ewma = 0.5
+    pool.running = 2
+    assert pool.retry_after() == 1
+    pool._waiters = [(INTERACTIVE, i, None) for i in range(20)]
+    assert pool.retry_after() == 6
+
+
+# ---- middleware -------------------------------------------------------
+def scope(path="/predict", method="POST", headers=()):
+    return {"type": "http", "path": path, "method": method, "headers": list(headers)}
+
+
+def call(middleware, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    run(middleware(scope, receive, send))
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"])
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def controller(limit, queue_depth):
+    pools = {"inference": Pool("inference", limit, queue_depth, queue_timeout=0.01),
+             "document": Pool("document", limit, queue_depth, queue_timeout=0.01)}
+    return AdmissionController(pools)
+
+
+def test_middleware_admits_and_releases():
+    ctl = controller(limit=1, queue_depth=1)
+    assert call(AdmissionMiddleware(ok_app, ctl), scope())[0] == 200
+    assert ctl.pools["inference"].running == 0
+    assert ctl.pools["inference"].admitted["interactive"] == 1
+
+
+@pytest.mark.parametrize("queue_depth, headers, status", [
+    (1, (), 503),
+    (2, ((b"x-priority", b"bulk"),), 429),
+])
+def test_middleware_sheds_with_retry_after(queue_depth, headers, status):
+    ctl = controller(limit=1, queue_depth=queue_depth)
+    pool = ctl.pools["inference"]
+    pool.running = 1
+    pool._waiters = [(INTERACTIVE, -1, None)]    # one request already queued
+    got, response_headers = call(AdmissionMiddleware(ok_app, ctl), scope(headers=headers))
+    assert got == status
+    assert int(response_headers["retry-after"]) >= 1
+
+
+def test_middleware_ignores_uncontrolled_routes():
+    ctl = controller(limit=0, queue_depth=0)
+    assert call(AdmissionMiddleware(ok_app, ctl), scope("/metrics", "GET"))[0] == 200
+    assert call(AdmissionMiddleware(ok_app, ctl), scope("/predict", "GET"))[0] == 200
+
+
+def test_classify():
+    ctl = controller(limit=1, queue_depth=1)
+    assert ctl.classify(scope("/predict/batch")) == (ctl.pools["inference"], BULK)
+    assert ctl.classify(scope("/extract-pdf/")) == (ctl.pools["document"], INTERACTIVE)
+    assert ctl.classify(scope("/predict", headers=[(b"x-priority", b"Bulk")])) == (ctl.pools["inference"], BULK)
+    assert ctl.classify(scope("/results")) == (None, None)
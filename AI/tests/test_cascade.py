@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+import pytest
+
+import cascade
+import inference
+from thresholds import Thresholds
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "model.keras"
+    path.write_bytes(b"weights")
+    return str(path)
+
+
+def write_config(model_path, cutoffs):
+    config = {"source_sha256": inference.file_sha256(model_path), "weights": [1.0, -1.0], "bias": 0.0,
+              "band": {"low": 0.2, "high": 0.8}, "policy": {"cutoffs": cutoffs}}
+    with open(cascade.config_path(model_path), "w") as f:
+        json.dump(config, f)
+
+
+def test_loads_under_the_same_cutoffs(model_path):
+    write_config(model_path, {"high": 0.6, "medium": 0.4, "source": "model.thresholds.json"})
+    prescreen = cascade.load(model_path, Thresholds(0.6, 0.4))
+    assert (prescreen.low, prescreen.high) == (0.2, 0.8)
+
+
+@pytest.mark.parametrize("cutoffs", [{"high": 0.6, "medium": 0.6}, {"high": 0.7, "medium": 0.4}, None])
+def test_other_cutoffs_disable_the_cascade(model_path, cutoffs):
+    write_config(model_path, cutoffs)
+    assert cascade.load(model_path, Thresholds(0.6, 0.4)) is None
+
+
+def test_split_escalates_the_band(model_path):
+    write_config(model_path, {"high": 0.6, "medium": 0.4})
+    prescreen = cascade.load(model_path, Thresholds(0.6, 0.4))
+    x = np.array([[4.0, 0.0], [0.0, 0.0], [-4.0, 0.0]], dtype=np.float32)
+    probs, escalate = prescreen.split(x)
+    assert escalate.tolist() == [False, True, False]
+    assert probs[0] > 0.8 and probs[2] < 0.2
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import deadlines
+from deadlines import Abandoned, Deadline
+
+
+def test_check_passes_before_the_deadline():
+    Deadline(5).check("preprocess")
+
+
+def test_check_raises_once_expired():
+    deadline = Deadline(5, started=time.monotonic() - 6)
+    with pytest.raises(Abandoned) as info:
+        deadline.check("inference")
+    assert (info.value.reason, info.value.stage) == ("deadline", "inference")
+    assert info.value.elapsed >= 6
+
+
+def test_cancel_wins_over_time_left():
+    deadline = Deadline(60)
+    deadline.cancel()
+    with pytest.raises(Abandoned) as info:
+        deadline.check("page")
+    assert info.value.reason == "disconnected"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, deadlines.DEFAULT_SECONDS),
+    ("abc", deadlines.DEFAULT_SECONDS),
+    ("-1", deadlines.DEFAULT_SECONDS),
+    ("nan", deadlines.DEFAULT_SECONDS),
+    ("2.5", 2.5),
+    ("100000", deadlines.MAX_SECONDS),
+])
+def test_parse_timeout(value, expected):
+    assert deadlines.parse_timeout(value) == expected
+
+
+class GoneRequest:
+    """Stands in for a Request whose client disconnects after `after` polls."""
+
+    def __init__(self, after=0):
+        self.polls = 0
+        self.after = after
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.polls > self.after
+
+
+def test_run_stage_stops_work_when_the_client_leaves():
+    deadline = Deadline(60)
+    started = threading.Event()
+
+    def work():
+        started.set()
+        while True:
+            deadline.check("chunk")
+            time.sleep(0.005)
+
+    async def scenario():
+        return await deadlines.run_stage(GoneRequest(after=1), deadline, work)
+
+    with pytest.raises(Abandoned) as info:
+        asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert started.is_set()
+    assert info.value.reason == "disconnected"
+
+
+def test_abandoned_work_counts_per_reason_and_stage():
+    work = deadlines.AbandonedWork()
+    work.record("/predict", Abandoned("deadline", "inference", 1.5))
+    work.record("/predict", Abandoned("deadline", "inference", 0.5))
+    work.record("/extract-pdf", Abandoned("disconnected", "page", 1.0))
+    stats = work.stats()
+    assert stats["by_reason"] == {"deadline": {"inference": 2}, "disconnected": {"page": 1}}
+    assert stats["by_endpoint"] == {"/predict": 2, "/extract-pdf": 1}
+    assert stats["abandoned_work_seconds"] == 3.0
+
+
+# ---- server responses -------------------------------------------------
+@pytest.fixture(scope="module")
+def server():
+    import server
+
+    return server
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/predict", {"model_name": "lung", "features": {}}),
+    ("/screen", {"features": {"age": 61}}),
+])
+def test_expired_request_gets_504(server, path, body):
+    # No lifespan: the request must stop at admission, before any model is needed
+    client = TestClient(server.app)
+    before = server._abandoned.stats()["by_endpoint"].get(path, 0)
+    response = client.post(path, json=body, headers={"X-Request-Timeout": "0.000001"})
+    assert response.status_code == 504
+    assert "admission (deadline)" in response.json()["detail"]
+    assert server._abandoned.stats()["by_endpoint"][path] == before + 1
+
+
+@pytest.mark.parametrize("reason, status", [("deadline", 504), ("disconnected", 499)])
+def test_abandoned_status_codes(server, reason, status):
+    request = Request({"type": "http", "method": "POST", "path": "/explain", "headers": [],
+                       "query_string": b"", "server": ("test", 80), "scheme": "http"})
+    response = asyncio.run(server.abandoned_handler(request, Abandoned(reason, "explain", 0.2)))
+    assert response.status_code == status
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import explain
+import inference
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "model.keras"
+    path.write_bytes(b"weights")
+    return str(path)
+
+
+def write_config(model_path, **overrides):
+    config = {"source_sha256": inference.file_sha256(model_path), "size": 2,
+              "rows": [[1.0, 2.0], [3.0, 4.0]]}
+    config.update(overrides)
+    with open(explain.config_path(model_path), "w") as f:
+        json.dump(config, f)
+
+
+def test_checked_in_rows(model_path):
+    write_config(model_path)
+    rows = explain.load_background(model_path, 2, size=2)
+    assert rows.dtype.name == "float32"
+    assert rows.tolist() == [[1.0, 2.0], [3.0, 4.0]]
+
+
+def test_missing_config(model_path):
+    assert explain.load_background(model_path, 2, size=2) is None
+
+
+@pytest.mark.parametrize("overrides", [
+    {"source_sha256": "0" * 64},
+    {"size": 16},
+    {"rows": None},
+    {"rows": []},
+    {"rows": [[1.0, 2.0, 3.0]]},
+])
+def test_unusable_config_falls_back(model_path, overrides):
+    write_config(model_path, **overrides)
+    assert explain.load_background(model_path, 2, size=2) is None
@@ -0,0 +1,55 @@
+"""
+FeaturePipeline.transform must reproduce the original row-wise
+preprocess_features output (benchmarks/pipeline_parity.py) for every model
+key, for request dicts (raw and schema-validated) and DataFrames, and must
+declare its columns in the order each scaler was fitted on.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_pipeline
+import feature_schemas
+from model_config import MODELS_INFO
+from pipeline_parity import legacy_preprocess, load_mappings, sample_payloads, scaler_columns
+
+N_ROWS = 500
+SEED = 415
+MODEL_KEYS = list(MODELS_INFO)
+
+
+@pytest.fixture(scope="module")
+def mappings():
+    return load_mappings()
+
+
+@pytest.mark.parametrize("label", ["records", "validated", "frame"])
+@pytest.mark.parametrize("model_key", MODEL_KEYS)
+def test_transform_matches_row_wise_encoding(model_key, label, mappings):
+    rows = sample_payloads(model_key, N_ROWS, SEED)
+    expected = np.vstack([legacy_preprocess(model_key, r, mappings[model_key]) for r in rows])
+    pipeline = feature_pipeline.build(model_key, mappings[model_key])
+    if label == "validated":
+        # What /predict and /predict/batch encode must not change the result
+        data = feature_schemas.build(model_key, pipeline).validate_many(rows)
+    elif label == "frame":
+        data = pd.DataFrame(rows)
+    else:
+        data = rows
+
+    got = pipeline.transform(data)
+
+    assert got.shape == expected.shape
+    # Pipeline output is float32; compare at float32 precision
+    mismatched = ~np.isclose(got, expected.astype(np.float32), rtol=1e-6, atol=0).all(axis=0)
+    assert [c for c, bad in zip(pipeline.columns, mismatched) if bad] == []
+
+
+@pytest.mark.parametrize("model_key", MODEL_KEYS)
+def test_columns_follow_scaler_order(model_key, mappings):
+    trained = scaler_columns(model_key)
+    if trained is None:
+        pytest.skip(f"no fitted feature names for {model_key}")
+    # Breast dataset headers say "concave points_*"; the API uses underscores
+    normalized = [c.replace("concave points", "concave_points") for c in trained]
+    assert feature_pipeline.build(model_key, mappings[model_key]).columns == normalized
@@ -0,0 +1,42 @@
+import time
+
+import numpy as np
+
+from prediction_cache import LocalLRUBackend, make_cache_key
+
+
+def test_inputs_that_encode_alike_share_a_key():
+    a = make_cache_key("lung", "v1:float32", np.array([[60, 1]], dtype=np.int64))
+    b = make_cache_key("lung", "v1:float32", np.array([[60.0, 1.0]], dtype=np.float64))
+    assert a == b
+
+
+def test_key_depends_on_model_tag_and_input():
+    x = np.array([[60.0, 1.0]], dtype=np.float32)
+    keys = {
+        make_cache_key("lung", "v1:float32", x),
+        make_cache_key("colorectal", "v1:float32", x),
+        make_cache_key("lung", "v2:float32", x),
+        make_cache_key("lung", "v1:int8", x),
+        make_cache_key("lung", "v1:float32:cascade[0.26,0.75]", x),
+        make_cache_key("lung", "v1:float32", x + 1),
+    }
+    assert len(keys) == 6
+
+
+def test_lru_evicts_the_oldest():
+    cache = LocalLRUBackend(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.evictions == 1
+
+
+def test_lru_expires_entries():
+    cache = LocalLRUBackend(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
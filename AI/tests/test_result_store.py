@@ -0,0 +1,148 @@
+import pytest
+
+import result_store
+from result_store import BadCursor, ResultStore
+
+
+def entry(probability, risk_level="Low"):
+    return {"model_version": "v1",
+            "prediction": {"probability": probability, "risk_level": risk_level, "class": "Negative"}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ResultStore(path=str(tmp_path / "results.db"), flush_seconds=0.01)
+    s.open()
+    yield s
+    s.close()
+
+
+def fill(store, n, **kwargs):
+    for i in range(n):
+        store.submit(f"req-{i}", kwargs.get("model", "lung"), "predict", entry(i / n),
+                     inputs={"age": i}, patient_id=kwargs.get("patient_id", "p1"))
+    assert store.sync()
+
+
+def test_pages_cover_every_row_newest_first(store):
+    fill(store, 7)
+    seen, cursor = [], None
+    while True:
+        page = store.list(limit=3, cursor=cursor)
+        seen += [item["request_id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"req-{i}" for i in reversed(range(7))]
+
+
+def test_last_full_page_has_no_cursor(store):
+    fill(store, 4)
+    first = store.list(limit=2)
+    second = store.list(limit=2, cursor=first["next_cursor"])
+    assert len(second["items"]) == 2
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"patient_id": "p2"}, ["b-0"]),
+    ({"model": "colorectal"}, ["b-0"]),
+    ({"model": "lung", "patient_id": "p1"}, ["a-1", "a-0"]),
+    ({"kind": "screen"}, []),
+])
+def test_filters(store, filters, expected):
+    store.submit("a-0", "lung", "predict", entry(0.1), patient_id="p1")
+    store.submit("a-1", "lung", "predict", entry(0.2), patient_id="p1")
+    store.submit("b-0", "colorectal", "predict", entry(0.3), patient_id="p2")
+    assert store.sync()
+    assert [item["request_id"] for item in store.list(**filters)["items"]] == expected
+
+
+def test_page_size_is_capped(store):
+    fill(store, result_store.MAX_PAGE + 5)
+    page = store.list(limit=10_000)
+    assert len(page["items"]) == result_store.MAX_PAGE
+    assert page["next_cursor"] is not None
+
+
+def test_cursor_round_trip():
+    cursor = result_store.encode_cursor({"created_at": 1760000000.123456, "rowid": 42})
+    assert result_store.decode_cursor(cursor) == (1760000000.123456, 42)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "1.5", "abc:1", "1.5:x", 7])
+def test_bad_cursor(store, cursor):
+    with pytest.raises(BadCursor):
+        store.list(cursor=cursor)
+
+
+def test_row_carries_response_and_input(store):
+    store.submit("r1", "lung", "predict", entry(0.8, "High"), inputs={"age": 61}, patient_id="p9")
+    assert store.sync()
+    (row,) = store.get("r1")
+    assert row["probability"] == 0.8
+    assert row["risk_level"] == "High"
+    assert row["patient_id"] == "p9"
+    assert row["reviewed_at"] is None
+    assert row["result"] == {"response": entry(0.8, "High"), "input": {"age": 61}}
+    assert store.get("missing") == []
+
+
+def test_full_queue_drops_rows_not_requests(tmp_path):
+    # Never opened: no writer drains the queue
+    s = ResultStore(path=str(tmp_path / "results.db"), queue_size=2)
+    for i in range(5):
+        s.submit(f"req-{i}", "lung", "predict", entry(0.5))
+    assert (s.submitted, s.dropped) == (2, 3)
+    assert s.stats()["queued"] == 2
+
+
+def test_sync_without_writer_returns_at_once(tmp_path):
+    s = ResultStore(path=str(tmp_path / "results.db"))
+    assert s.sync(timeout=0.1) is False
+
+
+def test_sync_waits_for_the_write(tmp_path):
+    # A long flush interval: only the sync marker ends the batch early
+    s = ResultStore(path=str(tmp_path / "results.db"), flush_seconds=30)
+    s.open()
+    try:
+        s.submit("r1", "lung", "predict", entry(0.4))
+        assert s.sync(timeout=5)
+        assert s.written == 1
+        assert [row["request_id"] for row in s.get("r1")] == ["r1"]
+    finally:
+        s.close()
+
+
+def test_close_flushes_queued_rows(tmp_path):
+    path = str(tmp_path / "results.db")
+    s = ResultStore(path=path, flush_seconds=30)
+    s.open()
+    s.submit("r1", "lung", "predict", entry(0.4))
+    s.close()
+    reopened = ResultStore(path=path)
+    assert len(reopened.get("r1")) == 1
+
+
+def test_disabled_store_ignores_results(tmp_path):
+    s = ResultStore(path=str(tmp_path / "results.db"), enabled=False)
+    s.open()
+    s.submit("r1", "lung", "predict", entry(0.4))
+    assert s.submitted == 0
+    assert not (tmp_path / "results.db").exists()
+
+
+def test_mark_reviewed(store):
+    store.submit("screen-1", "lung", "screen", entry(0.2))
+    store.submit("screen-1", "colorectal", "screen", entry(0.3))
+    store.submit("other", "lung", "predict", entry(0.4))
+    assert store.sync()
+
+    assert store.mark_reviewed("screen-1") == 2
+    assert all(row["reviewed_at"] is not None for row in store.get("screen-1"))
+    assert [item["request_id"] for item in store.list(pending=True)["items"]] == ["other"]
+
+    assert store.mark_reviewed("screen-1", reviewed=False) == 2
+    assert len(store.list(pending=True)["items"]) == 3
+    assert store.mark_reviewed("missing") == 0
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+import thresholds
+from thresholds import Thresholds
+
+
+@pytest.fixture
+def scored():
+    rng = np.random.default_rng(415)
+    y = rng.integers(0, 2, 2000)
+    # Rounded so many rows share a score, like a model's float32 outputs
+    probs = np.round(np.clip(0.35 * y + rng.normal(0.35, 0.2, len(y)), 0, 1), 2)
+    return y, probs
+
+
+def test_curve_areas_match_sklearn(scored):
+    y, probs = scored
+    c = thresholds.curves(y, probs)
+    assert c["roc_auc"] == pytest.approx(roc_auc_score(y, probs), abs=1e-12)
+    assert c["average_precision"] == pytest.approx(average_precision_score(y, probs), abs=1e-12)
+
+
+def test_medium_stays_below_high(scored):
+    y, probs = scored
+    cut = thresholds.evaluate(y, probs, medium_recall=0.9, high_precision=0.8)["thresholds"]
+    assert 0.0 <= cut["medium"] < cut["high"] <= 1.0
+
+
+def test_levels_and_codes_agree():
+    cutoffs = Thresholds(0.6, 0.4)
+    probs = np.array([0.0, 0.39, 0.4, 0.59, 0.6, 1.0])
+    assert cutoffs.levels(probs).tolist() == [cutoffs.level(p) for p in probs]
+    assert cutoffs.codes(probs).tolist() == [0, 0, 1, 1, 2, 2]
+
+
+def test_matches():
+    cutoffs = Thresholds(0.6, 0.4)
+    assert cutoffs.matches({"high": 0.6, "medium": 0.4, "source": "elsewhere"})
+    assert not cutoffs.matches({"high": 0.6, "medium": 0.6})
+    assert not cutoffs.matches(None)
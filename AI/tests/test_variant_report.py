@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import inference
+from thresholds import Thresholds
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "model.keras"
+    path.write_bytes(b"weights")
+    return str(path)
+
+
+def write_variant(model_path, variant="int8", **overrides):
+    tflite_path, report_path = inference.variant_paths(model_path, variant)
+    with open(tflite_path, "wb") as f:
+        f.write(b"flatbuffer")
+    report = {"source_sha256": inference.file_sha256(model_path), "passed": True,
+              "cutoffs": {"high": 0.6, "medium": 0.4, "source": "model.thresholds.json"}}
+    report.update(overrides)
+    with open(report_path, "w") as f:
+        json.dump(report, f)
+
+
+def test_report_under_the_same_cutoffs_is_served(model_path):
+    write_variant(model_path)
+    report = inference.load_variant_report(model_path, "int8", Thresholds(0.6, 0.4))
+    assert report["passed"]
+
+
+@pytest.mark.parametrize("cutoffs", [
+    {"high": 0.7, "medium": 0.4},
+    {"high": 0.6, "medium": 0.3},
+    None,
+])
+def test_report_under_other_cutoffs_is_rejected(model_path, cutoffs):
+    write_variant(model_path, cutoffs=cutoffs)
+    with pytest.raises(ValueError, match="cut-offs"):
+        inference.load_variant_report(model_path, "int8", Thresholds(0.6, 0.4))
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"passed": False}, "gates"),
+    ({"source_sha256": "0" * 64}, "different"),
+])
+def test_unusable_report_is_rejected(model_path, overrides, message):
+    write_variant(model_path, **overrides)
+    with pytest.raises(ValueError, match=message):
+        inference.load_variant_report(model_path, "int8", Thresholds(0.6, 0.4))
+
+
+def test_missing_variant(model_path):
+    with pytest.raises(ValueError, match="quantize.py"):
+        inference.load_variant_report(model_path, "float16")
@@ -0,0 +1,152 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+import wire_formats
+from wire_formats import ARROW_FILE, ARROW_STREAM, JSON, MSGPACK, NPY, BadPayload, UnsupportedFormat
+
+RECORD = {"model_name": "lung", "features": {"age": 61, "gender": "Male"}, "threshold": 0.4,
+          "patient_id": "p1"}
+
+
+def dumps(doc):
+    return json.dumps(doc).encode("utf-8")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, JSON),
+    ("", JSON),
+    ("application/json; charset=utf-8", JSON),
+    ("Application/MsgPack", MSGPACK),
+    ("application/x-msgpack", MSGPACK),
+    ("application/octet-stream+npy", NPY),
+    ("text/csv", "text/csv"),
+])
+def test_media_type(header, expected):
+    assert wire_formats.media_type(header) == expected
+
+
+def test_decode_record_json():
+    assert wire_formats.decode_record(JSON, dumps(RECORD)) == RECORD
+
+
+def test_decode_record_defaults():
+    doc = {"model_name": "lung", "features": {}}
+    assert wire_formats.decode_record(JSON, dumps(doc)) == {**doc, "threshold": None, "patient_id": None}
+
+
+def test_decode_record_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    assert wire_formats.decode_record(MSGPACK, msgpack.packb(RECORD)) == RECORD
+
+
+@pytest.mark.parametrize("doc", [
+    [RECORD],
+    {"model_name": "lung"},
+    {"model_name": "lung", "features": [1, 2]},
+    {"model_name": 3, "features": {}},
+    {**RECORD, "threshold": "0.5"},
+    {**RECORD, "threshold": True},
+    {**RECORD, "threshold": 1.5},
+    {**RECORD, "patient_id": 7},
+])
+def test_decode_record_rejects(doc):
+    with pytest.raises(BadPayload):
+        wire_formats.decode_record(JSON, dumps(doc))
+
+
+def test_invalid_json():
+    with pytest.raises(BadPayload):
+        wire_formats.decode_record(JSON, b"{not json")
+
+
+def test_invalid_msgpack():
+    pytest.importorskip("msgpack")
+    with pytest.raises(BadPayload):
+        wire_formats.decode_record(MSGPACK, b"\xc1")
+
+
+@pytest.mark.parametrize("decode", [wire_formats.decode_record, wire_formats.decode_batch])
+def test_unsupported_content_type(decode):
+    with pytest.raises(UnsupportedFormat):
+        decode("text/csv", b"age\n61")
+
+
+def test_arrow_is_batch_only():
+    with pytest.raises(UnsupportedFormat):
+        wire_formats.decode_record(ARROW_STREAM, b"")
+
+
+@pytest.mark.parametrize("doc", [
+    {"records": [{"age": 61}, {"age": 40}]},
+    [{"age": 61}, {"age": 40}],
+])
+def test_decode_batch_records(doc):
+    assert wire_formats.decode_batch(JSON, dumps(doc)) == ("records", [{"age": 61}, {"age": 40}])
+
+
+def test_decode_batch_columns():
+    kind, frame = wire_formats.decode_batch(JSON, dumps({"columns": {"age": [61, 40], "gender": ["Male", "Female"]}}))
+    assert kind == "frame"
+    assert frame.to_dict("list") == {"age": [61, 40], "gender": ["Male", "Female"]}
+
+
+@pytest.mark.parametrize("doc", [
+    "records",
+    {"records": [{"age": 61}, 3]},
+    {"columns": {"age": [1, 2], "bmi": [1]}},
+    {"rows": []},
+])
+def test_decode_batch_rejects(doc):
+    with pytest.raises(BadPayload):
+        wire_formats.decode_batch(JSON, dumps(doc))
+
+
+@pytest.mark.parametrize("content_type", [ARROW_STREAM, ARROW_FILE])
+def test_decode_batch_arrow(content_type):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"age": [61, 40], "gender": ["Male", "Female"]})
+    sink = pa.BufferOutputStream()
+    new = pa.ipc.new_stream if content_type == ARROW_STREAM else pa.ipc.new_file
+    with new(sink, table.schema) as writer:
+        writer.write_table(table)
+    kind, frame = wire_formats.decode_batch(content_type, sink.getvalue().to_pybytes())
+    assert kind == "frame"
+    assert frame.to_dict("list") == {"age": [61, 40], "gender": ["Male", "Female"]}
+
+
+def test_decode_batch_invalid_arrow():
+    pytest.importorskip("pyarrow")
+    with pytest.raises(BadPayload):
+        wire_formats.decode_batch(ARROW_STREAM, b"not arrow")
+
+
+def npy(array):
+    buf = io.BytesIO()
+    np.save(buf, array)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64, np.int64])
+def test_decode_batch_npy(dtype):
+    x = np.arange(6, dtype=dtype).reshape(2, 3)
+    kind, got = wire_formats.decode_batch(NPY, npy(x))
+    assert kind == "encoded"
+    np.testing.assert_array_equal(got, x)
+
+
+@pytest.mark.parametrize("body", [
+    npy(np.arange(3.0)),
+    npy(np.array([["a", "b"]])),
+    b"not npy",
+])
+def test_decode_batch_rejects_npy(body):
+    with pytest.raises(BadPayload):
+        wire_formats.decode_batch(NPY, body)
+
+
+def test_object_npy_is_not_unpickled():
+    with pytest.raises(BadPayload):
+        wire_formats.decode_batch(NPY, npy(np.array([[{"age": 1}]], dtype=object)))
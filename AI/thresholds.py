@@ -0,0 +1,339 @@
+"""
+Data-driven risk cut-offs: ROC / PR / calibration evaluation of a model over
+its whole dataset, and the per-model threshold configs the server loads.
+
+    python thresholds.py lung
+    python thresholds.py all --medium-recall 0.95 --high-precision 0.8
+    python thresholds.py colorectal --version 20250101-120000 --dry-run
+
+The dataset in AI/Dataset is encoded and scored in one batched pass (served
+probability, so colorectal is already 1 - p). Every curve comes from one
+sort of the scores: cumulative true / false positives at each distinct
+score give the confusion counts for all thresholds at once (O(n log n)).
+Cut-offs are chosen on the held-out split (--rows test, the rows the model
+never saw), or on every row with --rows all:
+
+    medium   highest score that still flags --medium-recall of the positives
+             (below it is "low": at most 1 - recall of cancers land there)
+    high     best-F1 score among those whose precision reaches
+             --high-precision (best F1 overall when none does); "positive" == high
+
+medium always ends up strictly below high. When the recall target lands on
+or above the high cut-off (well separated scores: breast), medium falls
+back to MEDIUM_RISK if that is lower ("default_band"), else to the next
+lower score ("next_score"); the config's medium_rule says which applied.
+
+The config is written next to the model as <model>.thresholds.json. Like a
+quantize.py report it carries the model's sha256; a config built for another
+model file is ignored and the bundle falls back to HIGH_RISK / MEDIUM_RISK.
+quantize.py reports and cascade.py configs record the cut-offs they were
+built under, so re-run both after changing a model's thresholds.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import inference
+from model_config import HIGH_RISK, MEDIUM_RISK
+
+RISK_LEVELS = np.array(["low", "medium", "high"])
+CURVE_POINTS = 200
+# np.trapz was renamed in NumPy 2.0
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+# ---------------------------------------------------------
+# 🟦 CUT-OFFS USED AT SERVING TIME
+# ---------------------------------------------------------
+class Thresholds:
+    """risk_level cut-offs for one model: high >= `high`, medium >= `medium`."""
+
+    def __init__(self, high=HIGH_RISK, medium=MEDIUM_RISK, source="default"):
+        if not 0.0 <= medium <= high <= 1.0:
+            raise ValueError(f"Expected 0 <= medium <= high <= 1, got medium={medium}, high={high}")
+        self.high = float(high)
+        self.medium = float(medium)
+        self.source = source
+        self._bins = np.array([self.medium, self.high])
+
+    def level(self, prob):
+        return "high" if prob >= self.high else "medium" if prob >= self.medium else "low"
+
+    def levels(self, probs):
+        """Vectorized level(): array of "low" / "medium" / "high"."""
+        return RISK_LEVELS[np.digitize(probs, self._bins)]
+
+    def codes(self, probs):
+        """0 / 1 / 2 per probability (low / medium / high)."""
+        return np.digitize(probs, self._bins)
+
+    def describe(self):
+        return {"high": self.high, "medium": self.medium, "source": self.source}
+
+    def matches(self, recorded):
+        """True if `recorded` (a config's {"high", "medium"}) are these cut-offs."""
+        try:
+            return (abs(float(recorded["high"]) - self.high) <= 1e-9
+                    and abs(float(recorded["medium"]) - self.medium) <= 1e-9)
+        except (KeyError, TypeError, ValueError):
+            return False
+
+
+DEFAULT = Thresholds()
+
+
+def config_path(model_path):
+    """<model>.thresholds.json next to the model file."""
+    return f"{os.path.splitext(model_path)[0]}.thresholds.json"
+
+
+def load(model_path):
+    """Thresholds from the model's config, or DEFAULT (with a warning if the config is unusable)."""
+    path = config_path(model_path)
+    if not os.path.isfile(path):
+        return DEFAULT
+    try:
+        with open(path, "r") as f:
+            config = json.load(f)
+        # Content hash rather than mtime, so checked-in configs survive a fresh clone
+        if config.get("source_sha256") != inference.file_sha256(model_path):
+            raise ValueError(f"built for a different {os.path.basename(model_path)}")
+        cut = config["thresholds"]
+        return Thresholds(cut["high"], cut["medium"], source=os.path.basename(path))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"   ⚠️ Ignoring {os.path.basename(path)} ({e}), using {HIGH_RISK}/{MEDIUM_RISK}")
+        return DEFAULT
+
+
+# ---------------------------------------------------------
+# 🟦 SORT-BASED SWEEPS
+# ---------------------------------------------------------
+def sweep(y, probs):
+    """
+    (thresholds, tp, fp, positives, negatives) for every distinct score,
+    highest first: predicting positive for probs >= thresholds[i] gives
+    tp[i] true and fp[i] false positives.
+    """
+    y = np.asarray(y, dtype=np.int64)
+    probs = np.asarray(probs, dtype=np.float64)
+    order = np.argsort(-probs, kind="mergesort")
+    scores, labels = probs[order], y[order]
+    # Last index of each run of equal scores: ties are all in or all out
+    last = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tp = np.cumsum(labels)[last]
+    fp = (last + 1) - tp
+    positives = int(labels.sum())
+    return scores[last], tp, fp, positives, len(labels) - positives
+
+
+def curves(y, probs):
+    """ROC and PR curves plus their areas, from one sweep."""
+    thr, tp, fp, pos, neg = sweep(y, probs)
+    tpr = tp / max(pos, 1)
+    fpr = fp / max(neg, 1)
+    precision = tp / (tp + fp)
+    roc_auc = float(_trapezoid(np.r_[0.0, tpr], np.r_[0.0, fpr]))
+    # Average precision: precision weighted by each step in recall
+    average_precision = float(np.sum(np.diff(np.r_[0.0, tpr]) * precision))
+    return {
+        "thresholds": thr, "tpr": tpr, "fpr": fpr, "precision": precision, "recall": tpr,
+        "roc_auc": roc_auc, "average_precision": average_precision,
+        "positives": pos, "negatives": neg,
+    }
+
+
+def calibration(y, probs, bins=10):
+    """Reliability table over equal-width bins, expected calibration error and Brier score."""
+    y = np.asarray(y, dtype=np.float64)
+    probs = np.asarray(probs, dtype=np.float64)
+    index = np.minimum((probs * bins).astype(np.int64), bins - 1)
+    count = np.bincount(index, minlength=bins)
+    sum_prob = np.bincount(index, weights=probs, minlength=bins)
+    sum_pos = np.bincount(index, weights=y, minlength=bins)
+    used = count > 0
+    mean_prob = np.divide(sum_prob, count, out=np.zeros(bins), where=used)
+    observed = np.divide(sum_pos, count, out=np.zeros(bins), where=used)
+    return {
+        "bins": [
+            {"lower": i / bins, "upper": (i + 1) / bins, "count": int(count[i]),
+             "mean_probability": float(mean_prob[i]) if used[i] else None,
+             "observed_rate": float(observed[i]) if used[i] else None}
+            for i in range(bins)
+        ],
+        "ece": float(np.sum(count * np.abs(mean_prob - observed)) / max(len(y), 1)),
+        "brier": float(np.mean((probs - y) ** 2)),
+    }
+
+
+def operating_point(c, i):
+    """Metrics of cut-off index `i` of a curves() result."""
+    tpr, fpr, prec = float(c["tpr"][i]), float(c["fpr"][i]), float(c["precision"][i])
+    return {
+        "threshold": float(c["thresholds"][i]),
+        "recall": tpr,
+        "specificity": 1.0 - fpr,
+        "precision": prec,
+        "f1": 2 * prec * tpr / (prec + tpr) if prec + tpr else 0.0,
+        "flagged": float((c["tpr"][i] * c["positives"] + c["fpr"][i] * c["negatives"])
+                         / max(c["positives"] + c["negatives"], 1)),
+    }
+
+
+def at_threshold(c, threshold):
+    """Index of the operating point for "probs >= threshold" (thresholds are descending)."""
+    i = np.searchsorted(-c["thresholds"], -threshold, side="right") - 1
+    return max(int(i), 0)
+
+
+def choose(c, medium_recall, high_precision):
+    """
+    (medium index, medium cut-off, how medium was picked, high index, how
+    high was picked) per the module docstring policy.
+    """
+    f1 = 2 * c["precision"] * c["tpr"] / np.maximum(c["precision"] + c["tpr"], 1e-12)
+    precise = c["precision"] >= high_precision
+    if precise.any():
+        high, rule = int(np.argmax(np.where(precise, f1, -1.0))), "precision"
+    else:
+        high, rule = int(np.argmax(f1)), "max_f1"
+    high_cut = float(c["thresholds"][high])
+
+    # Thresholds are descending: a larger index is a lower cut-off
+    medium = int(np.argmax(c["tpr"] >= medium_recall))
+    if medium > high:
+        return medium, float(c["thresholds"][medium]), "recall", high, rule
+    if MEDIUM_RISK < high_cut:
+        return at_threshold(c, MEDIUM_RISK), MEDIUM_RISK, "default_band", high, rule
+    if high + 1 < len(c["thresholds"]):
+        return high + 1, float(c["thresholds"][high + 1]), "next_score", high, rule
+    # Every score is at or above high: nothing left to call medium
+    return high, high_cut, "collapsed", high, rule
+
+
+def downsample(c, points=CURVE_POINTS):
+    idx = np.unique(np.linspace(0, len(c["thresholds"]) - 1, min(points, len(c["thresholds"]))).astype(np.int64))
+    return {name: [round(float(v), 6) for v in c[name][idx]]
+            for name in ("thresholds", "fpr", "tpr", "precision")}
+
+
+def evaluate(y, probs, medium_recall, high_precision):
+    """Everything the threshold config records about one set of scored rows."""
+    c = curves(y, probs)
+    medium, medium_cut, medium_rule, high, rule = choose(c, medium_recall, high_precision)
+    f1 = 2 * c["precision"] * c["tpr"] / np.maximum(c["precision"] + c["tpr"], 1e-12)
+    return {
+        "thresholds": {"high": float(c["thresholds"][high]), "medium": medium_cut},
+        "medium_rule": medium_rule,
+        "high_rule": rule,
+        "samples": int(len(y)),
+        "positives": c["positives"],
+        "roc_auc": c["roc_auc"],
+        "average_precision": c["average_precision"],
+        "operating_points": {
+            # Same counts as the index's score; the reported threshold is the cut-off actually served
+            "medium": {**operating_point(c, medium), "threshold": medium_cut},
+            "high": operating_point(c, high),
+            "max_f1": operating_point(c, int(np.argmax(f1))),
+            "youden": operating_point(c, int(np.argmax(c["tpr"] - c["fpr"]))),
+            "default_medium": operating_point(c, at_threshold(c, MEDIUM_RISK)),
+            "default_high": operating_point(c, at_threshold(c, HIGH_RISK)),
+        },
+        "calibration": calibration(y, probs),
+        "curves": downsample(c),
+    }
+
+
+# ---------------------------------------------------------
+# 🟦 DATASET EVALUATION
+# ---------------------------------------------------------
+def score_dataset(bundle):
+    """(served probabilities, labels, test mask) for every dataset row, in one batched pass."""
+    from dataset_io import load_labeled, split
+    from model_config import SPLIT_SEED
+
+    x, y = load_labeled(bundle.key, bundle.mappings)
+    bundle.scaler_inplace(x)
+    probs = bundle.runner(x).astype(np.float64)
+    if bundle.key == "colorectal":
+        # Same post-processing as /predict
+        probs = 1.0 - probs
+    # split() on the row index gives the notebooks' held-out rows
+    _, test_rows, _, _ = split(np.arange(len(y)), y)
+    test = np.zeros(len(y), dtype=bool)
+    test[test_rows] = True
+    return probs, y, test
+
+
+def build_config(model_key, version=None, rows="test", medium_recall=0.9, high_precision=0.8,
+                 dry_run=False):
+    """Scores the dataset, picks the cut-offs and (unless dry_run) writes the config. Returns it."""
+    import joblib
+    import tensorflow as tf
+
+    import model_store
+    from model_config import MAPPING_PATHS, MODELS_INFO
+
+    spec = model_store.resolve(model_key, MODELS_INFO[model_key], MAPPING_PATHS.get(model_key), version)
+    bundle = model_store.load_bundle(
+        model_key, spec, lambda p: tf.keras.models.load_model(p, compile=False), joblib.load
+    )
+
+    start = time.perf_counter()
+    probs, y, test = score_dataset(bundle)
+    chosen = test if rows == "test" else np.ones(len(y), dtype=bool)
+    result = evaluate(y[chosen], probs[chosen], medium_recall, high_precision)
+    config = {
+        "model_key": model_key,
+        "model_version": spec["version"],
+        "source_sha256": inference.file_sha256(spec["model_path"]),
+        "created_at": time.time(),
+        "rows": rows,
+        "policy": {"medium_recall": medium_recall, "high_precision": high_precision},
+        **result,
+        "all_rows": {"samples": int(len(y)), "roc_auc": curves(y, probs)["roc_auc"],
+                     "calibration": calibration(y, probs)},
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+    cut, points = config["thresholds"], config["operating_points"]
+    print(f"{'🧪' if dry_run else '✅'} {model_key} ({spec['version']}): AUC {config['roc_auc']:.4f}, "
+          f"AP {config['average_precision']:.4f}, ECE {config['calibration']['ece']:.4f} on {rows} rows")
+    print(f"   medium >= {cut['medium']:.4f} (recall {points['medium']['recall']:.3f}, {config['medium_rule']}), "
+          f"high >= {cut['high']:.4f} (precision {points['high']['precision']:.3f}, {config['high_rule']}) "
+          f"- was {MEDIUM_RISK}/{HIGH_RISK}")
+    if not dry_run:
+        path = config_path(spec["model_path"])
+        with open(path, "w") as f:
+            json.dump(config, f, indent=2)
+        print(f"   -> {path}")
+    return config
+
+
+def main(argv=None):
+    from model_config import MODELS_INFO
+
+    parser = argparse.ArgumentParser(description="Evaluate models over their datasets and write risk cut-offs")
+    parser.add_argument("model_key", choices=sorted(MODELS_INFO) + ["all"])
+    parser.add_argument("--version", help="Model store version (default: active)")
+    parser.add_argument("--rows", choices=("test", "all"), default="test",
+                        help="Rows the cut-offs are chosen on (default: held-out split)")
+    parser.add_argument("--medium-recall", type=float, default=0.9)
+    parser.add_argument("--high-precision", type=float, default=0.8)
+    parser.add_argument("--dry-run", action="store_true", help="Print the evaluation, write nothing")
+    args = parser.parse_args(argv)
+
+    keys = sorted(MODELS_INFO) if args.model_key == "all" else [args.model_key]
+    for key in keys:
+        build_config(key, args.version, args.rows, args.medium_recall, args.high_precision, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Scripted training for the serving models. One command per model key
+produces a versioned model-store bundle (model.keras, scaler.pkl,
+mappings.json, manifest.json) that the server can load or hot-reload.
+
+    python train.py lung                                  # default grid, 5-fold CV, publish
+    python train.py colorectal --workers 8 --activate
+    python train.py breast --grid '{"units": [[32, 16], [64, 32]], "learning_rate": [0.001]}'
+    python train.py lung --grid '{}' --folds 3 --epochs 20  # notebook architecture only
+
+Steps:
+  1. mappings from generate_mappings (the notebooks' LabelEncoder codes)
+  2. AI/Dataset encoded with the serving FeaturePipeline and split like the
+     notebooks (80/20, stratified, random_state=42)
+  3. every (config, fold) pair of a stratified k-fold CV over the training
+     rows is fitted in a spawn process pool, one TF thread per process
+  4. the config with the best mean validation AUC is refitted on all
+     training rows for the median of its folds' best epochs
+  5. held-out metrics, CV results and the config go into the manifest
+
+Inputs are fed through tf.data (seeded shuffle, batch, prefetch). Seeds per
+task, single-threaded ops and TF op determinism make a rerun with the same
+--seed reproduce the weights.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import model_store
+from model_config import DATASETS, MAPPING_PATHS, MODELS_INFO, SPLIT_SEED
+
+# Notebook architectures and training settings; every grid entry overrides these
+DEFAULTS = {
+    "breast": {"units": [32, 16], "dropout": 0.0, "learning_rate": 1e-3, "batch_size": 8,
+               "epochs": 50, "patience": 10, "class_weight": False},
+    "lung": {"units": [128, 64, 32], "dropout": 0.1, "learning_rate": 1e-3, "batch_size": 64,
+             "epochs": 100, "patience": 10, "class_weight": True},
+    "colorectal": {"units": [16, 8], "dropout": 0.4, "learning_rate": 1e-3, "batch_size": 16,
+                   "epochs": 50, "patience": 8, "class_weight": True},
+}
+GRIDS = {
+    "breast": {"units": [[32, 16], [64, 32]], "learning_rate": [1e-3, 3e-3]},
+    "lung": {"dropout": [0.1, 0.2], "learning_rate": [1e-3, 3e-3]},
+    "colorectal": {"dropout": [0.2, 0.4], "learning_rate": [1e-3, 3e-3]},
+}
+
+# /predict serves 1 - p for colorectal, so its model learns P(CRC_Risk == 0)
+INVERTED_TARGET = {"colorectal"}
+
+
+def expand_grid(model_key, grid):
+    """Grid {param: [values]} -> list of full configs (defaults + one combination each)."""
+    names = sorted(grid)
+    configs = []
+    for values in itertools.product(*(grid[n] for n in names)):
+        config = dict(DEFAULTS[model_key])
+        config.update(zip(names, values))
+        configs.append(config)
+    return configs
+
+
+# ---------------------------------------------------------
+# 🟦 MODEL & INPUT PIPELINE
+# ---------------------------------------------------------
+def build_model(n_features, config):
+    """Dense ReLU stack, dropout after every hidden layer but the last (as in the notebooks)."""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    stack = [tf.keras.Input(shape=(n_features,))]
+    for i, units in enumerate(config["units"]):
+        stack.append(layers.Dense(units, activation="relu"))
+        if config["dropout"] and i < len(config["units"]) - 1:
+            stack.append(layers.Dropout(config["dropout"]))
+    stack.append(layers.Dense(1, activation="sigmoid"))
+    model = tf.keras.Sequential(stack)
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(config["learning_rate"]),
+        loss="binary_crossentropy",
+        metrics=["accuracy", tf.keras.metrics.AUC(name="auc")],
+    )
+    return model
+
+
+def make_dataset(x, y, batch_size, shuffle_seed=None):
+    import tensorflow as tf
+
+    ds = tf.data.Dataset.from_tensor_slices((x, y.astype(np.float32)))
+    if shuffle_seed is not None:
+        ds = ds.shuffle(len(x), seed=shuffle_seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def class_weights(y):
+    from sklearn.utils import class_weight
+
+    weights = class_weight.compute_class_weight(class_weight="balanced", classes=np.unique(y), y=y)
+    return dict(enumerate(float(w) for w in weights))
+
+
+def fit(config, x_train, y_train, x_val=None, y_val=None, epochs=None, seed=0):
+    """Scaler + model fitted on one split. Early stopping only with validation rows."""
+    import tensorflow as tf
+    from sklearn.preprocessing import StandardScaler
+
+    tf.keras.utils.set_random_seed(seed)
+    scaler = StandardScaler().fit(x_train)
+    x_train = scaler.transform(x_train).astype(np.float32)
+    model = build_model(x_train.shape[1], config)
+
+    kwargs = {}
+    if x_val is not None:
+        x_val = scaler.transform(x_val).astype(np.float32)
+        kwargs["validation_data"] = make_dataset(x_val, y_val, config["batch_size"])
+        kwargs["callbacks"] = [tf.keras.callbacks.EarlyStopping(
+            monitor="val_loss", patience=config["patience"], restore_best_weights=True)]
+    if config["class_weight"]:
+        kwargs["class_weight"] = class_weights(y_train)
+
+    history = model.fit(make_dataset(x_train, y_train, config["batch_size"], shuffle_seed=seed),
+                        epochs=epochs or config["epochs"], shuffle=False, verbose=0, **kwargs)
+    best_epoch = int(np.argmin(history.history["val_loss"])) + 1 if x_val is not None else len(history.history["loss"])
+    return model, scaler, best_epoch
+
+
+# ---------------------------------------------------------
+# 🟦 WORKER PROCESS
+# ---------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(model_key, mappings, n_folds, seed, threads):
+    import tensorflow as tf
+
+    from dataset_io import load_labeled, split
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.config.experimental.enable_op_determinism()
+
+    x, y = load_labeled(model_key, mappings)
+    # Dataset labels throughout; only the fitted target is flipped (see INVERTED_TARGET)
+    x_train, x_test, y_train, y_test = split(x, y)
+    _worker.update(model_key=model_key, seed=seed, x_train=x_train, y_train=y_train,
+                   x_test=x_test, y_test=y_test, folds=[])
+    if n_folds > 1:
+        from sklearn.model_selection import StratifiedKFold
+
+        folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+        _worker["folds"] = list(folds.split(x_train, y_train))
+
+
+def target(model_key, y):
+    return 1 - y if model_key in INVERTED_TARGET else y
+
+
+def served(model_key, probs):
+    return 1.0 - probs if model_key in INVERTED_TARGET else probs
+
+
+def fit_fold(config_index, config, fold):
+    """Validation metrics of one (config, fold) pair."""
+    from quantize import metrics
+
+    w = _worker
+    key, x, y = w["model_key"], w["x_train"], w["y_train"]
+    train_idx, val_idx = w["folds"][fold]
+    seed = w["seed"] + 1000 * config_index + fold
+    model, scaler, best_epoch = fit(config, x[train_idx], target(key, y[train_idx]),
+                                    x[val_idx], target(key, y[val_idx]), seed=seed)
+    probs = model.predict(scaler.transform(x[val_idx]).astype(np.float32), verbose=0)[:, 0]
+    result = metrics(y[val_idx], served(key, probs))
+    result.update(config_index=config_index, fold=fold, best_epoch=best_epoch)
+    return result
+
+
+def fit_final(config, epochs, out_dir):
+    """Refit on all training rows, save model.keras + scaler.pkl, score the held-out rows."""
+    import joblib
+
+    from quantize import metrics
+
+    w = _worker
+    key = w["model_key"]
+    model, scaler, _ = fit(config, w["x_train"], target(key, w["y_train"]), epochs=epochs, seed=w["seed"])
+    model.save(os.path.join(out_dir, "model.keras"))
+    joblib.dump(scaler, os.path.join(out_dir, "scaler.pkl"))
+    probs = model.predict(scaler.transform(w["x_test"]).astype(np.float32), verbose=0)[:, 0]
+    # Dataset labels vs. the probability /predict serves
+    return metrics(w["y_test"], served(key, probs))
+
+
+# ---------------------------------------------------------
+# 🟦 MAIN
+# ---------------------------------------------------------
+def summarize_cv(configs, results):
+    summary = []
+    for i, config in enumerate(configs):
+        folds = [r for r in results if r["config_index"] == i]
+        aucs = [r["auc"] for r in folds]
+        summary.append({
+            "config": config,
+            "mean_auc": float(np.mean(aucs)),
+            "std_auc": float(np.std(aucs)),
+            "best_epochs": [r["best_epoch"] for r in folds],
+        })
+    return summary
+
+
+def pick_best(configs, results):
+    """(cv summary, winning entry, refit epochs = median best epoch of its folds)."""
+    cv = summarize_cv(configs, results)
+    best = max(cv, key=lambda s: s["mean_auc"])
+    return cv, best, int(np.median(best["best_epochs"]))
+
+
+def train(model_key, grid=None, n_folds=5, workers=1, seed=SPLIT_SEED, max_epochs=None,
+          version=None, activate=False):
+    """Runs CV + grid search, refits the winner and publishes it. Returns the version dir."""
+    import generate_mappings
+    from inference import file_sha256
+
+    start = time.perf_counter()
+    configs = expand_grid(model_key, GRIDS[model_key] if grid is None else grid)
+    if max_epochs:
+        for config in configs:
+            config["epochs"] = min(config["epochs"], max_epochs)
+    mappings = generate_mappings.build(model_key) if model_key in MAPPING_PATHS else {}
+
+    tasks = [(i, config, fold) for i, config in enumerate(configs) for fold in range(n_folds)]
+    print(f"⏳ {model_key}: {len(configs)} config(s) x {n_folds} folds = {len(tasks)} fits on {workers} worker(s)")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        if workers <= 1:
+            _init_worker(model_key, mappings, n_folds, seed, threads=0)
+            results = [fit_fold(*task) for task in tasks]
+            cv, best, epochs = pick_best(configs, results)
+            test = fit_final(best["config"], epochs, out_dir)
+        else:
+            # spawn: TensorFlow is not fork-safe
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(model_key, mappings, n_folds, seed, 1)) as pool:
+                results = list(pool.map(fit_fold, *zip(*tasks)))
+                cv, best, epochs = pick_best(configs, results)
+                test = pool.submit(fit_final, best["config"], epochs, out_dir).result()
+
+        for s in cv:
+            marker = "👉" if s is best else "  "
+            print(f"   {marker} AUC {s['mean_auc']:.4f} ± {s['std_auc']:.4f}  {json.dumps(s['config'])}")
+
+        mappings_path = None
+        if mappings:
+            mappings_path = os.path.join(out_dir, "mappings.json")
+            with open(mappings_path, "w") as f:
+                json.dump(mappings, f, indent=4)
+
+        training = {
+            "config": best["config"],
+            "epochs": epochs,
+            "folds": n_folds,
+            "seed": seed,
+            "cv": cv,
+            "test": test,
+            "dataset": os.path.relpath(DATASETS[model_key]["path"], ROOT),
+            "dataset_sha256": file_sha256(DATASETS[model_key]["path"]),
+            "seconds": round(time.perf_counter() - start, 1),
+        }
+        version_dir = model_store.publish(
+            model_key, os.path.join(out_dir, "model.keras"), os.path.join(out_dir, "scaler.pkl"),
+            mappings_path, version=version, activate=activate, extra={"training": training},
+        )
+
+    print(f"   Held-out AUC {test['auc']:.4f}, accuracy {test['accuracy']:.4f} ({training['seconds']}s)")
+    print(f"✅ Published {model_key} -> {version_dir}{' (active)' if activate else ''}")
+    return version_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train a serving model into the model store")
+    parser.add_argument("model_key", choices=sorted(MODELS_INFO))
+    parser.add_argument("--grid", type=json.loads, help='JSON {param: [values]} (default: per-model grid, "{}" for none)')
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=SPLIT_SEED)
+    parser.add_argument("--epochs", type=int, help="Cap on epochs per fit (default: per-model)")
+    parser.add_argument("--version", help="Store version name (default: timestamp)")
+    parser.add_argument("--activate", action="store_true", help="Point CURRENT at the new version")
+    args = parser.parse_args(argv)
+    if args.folds < 2:
+        parser.error("--folds must be at least 2")
+
+    train(args.model_key, args.grid, args.folds, args.workers, args.seed, args.epochs,
+          args.version, args.activate)
+
+
+if __name__ == "__main__":
+    main()
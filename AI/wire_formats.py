@@ -0,0 +1,194 @@
+"""
+Request / response encodings for the predict endpoints.
+
+    Content-Type                           /predict          /predict/batch
+    application/json (default)             one record        {"records": [...]} or {"columns": {...}}
+    application/msgpack                    one record        same shapes as JSON
+    application/vnd.apache.arrow.stream    -                 Arrow IPC stream, one column per raw field
+    application/vnd.apache.arrow.file      -                 Arrow IPC file
+    application/x-npy                      -                 float array (n, n_features), model order
+
+Arrow tables are handed to the FeaturePipeline as a DataFrame, so each column
+is encoded in one vectorized pass. A .npy body is already encoded (the same
+columns /predict would produce) and only needs a dtype check.
+
+Responses are JSON via orjson (numpy arrays serialized natively), or
+MessagePack when the client sends Accept: application/msgpack.
+"""
+import io
+import json
+
+import numpy as np
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+NPY = "application/x-npy"
+
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/octet-stream+npy": NPY,
+}
+
+
+class UnsupportedFormat(ValueError):
+    """Content type not accepted here, or its optional decoder is not installed (-> 415)."""
+
+
+class BadPayload(ValueError):
+    """Body does not decode to the expected shape (-> 400)."""
+
+
+def media_type(header):
+    """'application/msgpack; charset=...' -> 'application/msgpack' (default JSON)."""
+    if not header:
+        return JSON
+    mt = header.split(";", 1)[0].strip().lower()
+    return _ALIASES.get(mt, mt)
+
+
+# ---------------------------------------------------------
+# 🟦 DECODING
+# ---------------------------------------------------------
+def _loads_json(body):
+    try:
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError as e:
+        raise BadPayload(f"Invalid JSON: {e}")
+
+
+def _loads_msgpack(body):
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedFormat("MessagePack support is not installed (pip install msgpack)")
+    try:
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    except Exception as e:
+        raise BadPayload(f"Invalid MessagePack: {e}")
+
+
+def decode_document(content_type, body):
+    """JSON or MessagePack body -> Python object."""
+    if content_type == JSON:
+        return _loads_json(body)
+    if content_type == MSGPACK:
+        return _loads_msgpack(body)
+    raise UnsupportedFormat(f"Unsupported content type {content_type}")
+
+
+def decode_record(content_type, body):
+    """
+    A single /predict body -> {"model_name", "features", "threshold", "patient_id"}; the same
+    checks PredictRequest declares, without building a pydantic model.
+    """
+    doc = decode_document(content_type, body)
+    if not isinstance(doc, dict) or not isinstance(doc.get("features"), dict):
+        raise BadPayload("Expected an object with 'model_name' and 'features'")
+    model_name = doc.get("model_name")
+    if not isinstance(model_name, str):
+        raise BadPayload("'model_name' must be a string")
+    threshold = doc.get("threshold")
+    if threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, float))):
+        raise BadPayload("'threshold' must be a number")
+    if threshold is not None and not 0.0 <= threshold <= 1.0:
+        raise BadPayload("'threshold' must be between 0 and 1")
+    patient_id = doc.get("patient_id")
+    if patient_id is not None and not isinstance(patient_id, str):
+        raise BadPayload("'patient_id' must be a string")
+    return {"model_name": model_name, "features": doc["features"], "threshold": threshold,
+            "patient_id": patient_id}
+
+
+def decode_batch(content_type, body):
+    """
+    A /predict/batch body -> ("frame", DataFrame) | ("records", list[dict]) | ("encoded", ndarray).
+    """
+    if content_type in (ARROW_STREAM, ARROW_FILE):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise UnsupportedFormat("Arrow support is not installed (pip install pyarrow)")
+        try:
+            reader = pa.ipc.open_stream if content_type == ARROW_STREAM else pa.ipc.open_file
+            table = reader(pa.py_buffer(body)).read_all()
+        except Exception as e:
+            raise BadPayload(f"Invalid Arrow IPC payload: {e}")
+        return "frame", table.to_pandas()
+
+    if content_type == NPY:
+        try:
+            x = np.load(io.BytesIO(body), allow_pickle=False)
+        except Exception as e:
+            raise BadPayload(f"Invalid .npy payload: {e}")
+        if x.ndim != 2 or x.dtype.kind not in "fiu":
+            raise BadPayload("Expected a 2-D numeric array")
+        return "encoded", x
+
+    doc = decode_document(content_type, body)
+    if isinstance(doc, list):
+        doc = {"records": doc}
+    if not isinstance(doc, dict):
+        raise BadPayload("Expected {'records': [...]} or {'columns': {...}}")
+    if isinstance(doc.get("records"), list):
+        if not all(isinstance(r, dict) for r in doc["records"]):
+            raise BadPayload("Every record must be an object")
+        return "records", doc["records"]
+    if isinstance(doc.get("columns"), dict):
+        import pandas as pd
+
+        try:
+            return "frame", pd.DataFrame(doc["columns"])
+        except ValueError as e:
+            raise BadPayload(f"Invalid columns: {e}")
+    raise BadPayload("Expected {'records': [...]} or {'columns': {...}}")
+
+
+# ---------------------------------------------------------
+# 🟦 ENCODING
+# ---------------------------------------------------------
+class FastJSONResponse(Response):
+    """orjson-rendered JSON (NumPy arrays and scalars included); stdlib json without orjson."""
+
+    media_type = JSON
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_to_builtin).encode("utf-8")
+
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content):
+        import msgpack
+
+        return msgpack.packb(content, default=_to_builtin, use_bin_type=True)
+
+
+def respond(content, accept=None, status_code=200):
+    """MessagePack if the client asked for it (and it is installed), JSON otherwise."""
+    if accept and any(m in accept for m in (MSGPACK, "application/x-msgpack")):
+        try:
+            import msgpack  # noqa: F401
+            return MsgpackResponse(content, status_code=status_code)
+        except ImportError:
+            pass
+    return FastJSONResponse(content, status_code=status_code)